@@ -0,0 +1,384 @@
+"""
+Resident agent: audits this machine once, then watches the checked files
+and re-evaluates only the rules that depend on what changed, pushing just
+the result changes to a collector.
+
+    python auditor.py agent --collector unix:/run/sca/collector.sock
+    python auditor.py agent --collector http://collector:8080/deltas --polling
+"""
+import argparse
+import collections
+import ctypes
+import ctypes.util
+import datetime
+import glob
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+import urllib.request
+
+from catalog import GLOB_CHARS, CheckCatalog, load_catalog
+from common import Utils
+from drift import change_record
+from filetree import iter_local_entries
+from local_backend import collect_local, local_facts
+from sinks import ResultSink
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event bits, watched on the parent directories so replaced files are seen too
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+# one save is often a burst (write, chmod, rename): events are coalesced for this long
+SETTLE = 0.1
+# reported as changed when the kernel dropped events, everything is re-evaluated
+OVERFLOW = "<overflow>"
+
+
+def _static_prefix(pattern):
+    cut = min((pattern.index(c) for c in GLOB_CHARS if c in pattern), default=len(pattern))
+    return pattern[:cut]
+
+
+def watch_directories(catalog):
+    """Directories whose events can change a result: parents of the checked files and tree roots."""
+    directories = {os.path.dirname(path) for path in catalog.by_file}
+    for rule in catalog.tree_rules:
+        static = _static_prefix(rule.file)
+        directories.add(os.path.dirname(static) if static != rule.file else rule.file)
+        if rule.recursive:
+            # one level below each matched root, the periodic full audit covers deeper changes
+            directories.update(path for path in glob.glob(rule.file) if os.path.isdir(path))
+    return sorted(d for d in directories if d)
+
+
+def _matches(rule, path):
+    return path == rule.file or (rule.pattern is not None and rule.pattern.match(path) is not None)
+
+
+def _covers(rule, path):
+    if _matches(rule, path):
+        return True
+    if not (rule.tree and rule.recursive):
+        return False
+    parent = os.path.dirname(path)
+    while parent and parent != os.path.dirname(parent):
+        if _matches(rule, parent):
+            return True
+        parent = os.path.dirname(parent)
+    return False
+
+
+def affected_rules(catalog, paths):
+    """The rules whose target is one of paths, or whose glob / tree covers one of them."""
+    if OVERFLOW in paths:
+        return list(catalog.rules)
+    return [
+        rule
+        for rule in catalog.rules
+        if (rule.file in paths if not rule.tree else any(_covers(rule, path) for path in paths))
+    ]
+
+
+class InotifyWatcher:
+    """inotify(7) directory watches through ctypes, no extra dependency. Linux only."""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories = {}
+        self.watch(directories)
+
+    def watch(self, directories):
+        """Add watches, directories already watched are kept as they are."""
+        for directory in directories:
+            wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                logger.warning(f"cannot watch {directory}: {os.strerror(ctypes.get_errno())}")
+            else:
+                self._directories[wd] = directory
+
+    def wait(self, timeout):
+        """Paths changed within timeout seconds, once SETTLE passes without further events."""
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            self._read(changed)
+            ready, _, _ = select.select([self.fd], [], [], SETTLE)
+        return changed
+
+    def _read(self, changed):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.add(OVERFLOW)
+            directory = self._directories.get(wd)
+            if directory is not None and name:
+                changed.add(os.path.join(directory, os.fsdecode(name)))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_mode, st.st_uid, st.st_gid
+
+
+class PollingWatcher:
+    """Fallback without inotify: compares stat signatures every interval seconds."""
+
+    def __init__(self, catalog, interval=2.0):
+        self.catalog = catalog
+        self.interval = interval
+        self._signatures = self._scan()
+        self._next = time.monotonic() + interval
+
+    def _scan(self):
+        signatures = {path: _signature(path) for path in self.catalog.by_file}
+        # tree rules only look at mode and ownership, exactly what the entries carry
+        for pattern, recursive in self.catalog.tree_specs:
+            signatures[pattern] = tuple(iter_local_entries(pattern, recursive))
+        return signatures
+
+    def watch(self, directories):
+        pass
+
+    def wait(self, timeout):
+        delay = self._next - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(delay, 0))
+        self._next = time.monotonic() + self.interval
+        signatures = self._scan()
+        changed = {path for path, sig in signatures.items() if sig != self._signatures.get(path)}
+        self._signatures = signatures
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(catalog, poll_interval=2.0, polling=False):
+    if not polling:
+        try:
+            return InotifyWatcher(watch_directories(catalog))
+        except (OSError, AttributeError) as exc:  # no inotify on this kernel / libc
+            logger.info(f"inotify unavailable ({exc}), polling every {poll_interval}s")
+    return PollingWatcher(catalog, poll_interval)
+
+
+class CollectorSink(ResultSink):
+    """
+    Pushes agent records to a collector: "unix:/path" writes one JSON line
+    per record to a Unix stream socket, "http://..." POSTs each record as
+    JSON. Records that can't be delivered are kept (up to max_pending) and
+    sent first on the next write.
+    """
+
+    def __init__(self, url, timeout=5, max_pending=1000):
+        self.url = url
+        self.timeout = timeout
+        self.pending = collections.deque(maxlen=max_pending)
+        self._sock = None
+        self._failing = False
+
+    def write(self, record):
+        self.pending.append(record)
+        while self.pending:
+            try:
+                self._send(self.pending[0])
+            except OSError as exc:
+                if not self._failing:
+                    logger.warning(f"collector {self.url} unreachable ({exc}), {len(self.pending)} record(s) queued")
+                self._failing = True
+                self._disconnect()
+                return
+            self.pending.popleft()
+        self._failing = False
+
+    def _send(self, record):
+        body = json.dumps(record, default=str).encode()
+        if self.url.startswith("unix:"):
+            if self._sock is None:
+                self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self._sock.settimeout(self.timeout)
+                self._sock.connect(self.url[len("unix:"):])
+            self._sock.sendall(body + b"\n")
+        else:
+            request = urllib.request.Request(
+                self.url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self):
+        self._disconnect()
+
+
+class StdoutSink(ResultSink):
+    """Agent records as JSON Lines on stdout, when no collector is configured."""
+
+    def write(self, record):
+        print(json.dumps(record, default=str), flush=True)
+
+
+def _kind(was, now):
+    if was is None:
+        return "check_added"
+    if was["status"] != now["status"]:
+        return "newly_passing" if now["status"] == "PASS" else "newly_failing"
+    if was["actual_value"] != now["actual_value"]:
+        return "value_changed"
+    return None
+
+
+class Agent:
+    """
+    One full audit, then event driven: every batch of changed paths
+    re-evaluates only the rules depending on them, and only results that
+    changed are pushed (as drift.py-style change records).
+
+    sink         where snapshot / delta records go (CollectorSink, StdoutSink, ...)
+    watcher      InotifyWatcher or PollingWatcher, make_watcher() by default
+                 (polling=True skips inotify)
+    full_every   seconds between full re-audits, catching what watches miss
+    """
+
+    def __init__(self, catalog, sink, watcher=None, poll_interval=2.0, full_every=3600, host=None, polling=False):
+        self.catalog = catalog.for_facts(local_facts())
+        self.sink = sink
+        self.watcher = watcher or make_watcher(self.catalog, poll_interval, polling)
+        self.full_every = full_every
+        self.host = host or socket.gethostname()
+        self.util = Utils("localhost", None, None)
+        self.results = {}
+        self.stats = {"batches": 0, "reevaluated": 0, "deltas": 0, "full_audits": 0, "cpu_s": 0.0}
+
+    def evaluate(self, rules):
+        subset = CheckCatalog(rules, self.catalog.profile, self.catalog.digest)
+        results = self.util.evaluate_rules(subset, collect_local(subset))
+        return {rule.id: result for rule, result in zip(rules, results)}
+
+    def _record(self, kind, **fields):
+        return {"type": kind, "host": self.host, "timestamp": datetime.datetime.now().isoformat(), **fields}
+
+    def audit(self):
+        """Full audit, pushed whole as a snapshot the collector can diff against."""
+        self.results = self.evaluate(self.catalog.rules)
+        self.stats["full_audits"] += 1
+        self.sink.write(self._record("snapshot", result=list(self.results.values())))
+
+    def refresh(self, rules, paths=()):
+        """Re-evaluate rules and push a delta of the results that changed, returns the changes."""
+        fresh = self.evaluate(rules)
+        self.stats["reevaluated"] += len(rules)
+        changes = []
+        for rule in rules:
+            was, now = self.results.get(rule.id), fresh[rule.id]
+            kind = _kind(was, now)
+            if kind is not None:
+                changes.append(
+                    change_record(
+                        self.host,
+                        rule.name,
+                        kind,
+                        (was["status"], was["actual_value"]) if was else None,
+                        (now["status"], now["actual_value"]),
+                    )
+                )
+        self.results.update(fresh)
+        if changes:
+            self.stats["deltas"] += 1
+            self.sink.write(self._record("delta", paths=sorted(paths), changes=changes))
+        return changes
+
+    def run(self, stop=None):
+        """Audit, then watch until stop (a threading.Event) is set."""
+        stop = stop or threading.Event()
+        cpu = time.thread_time()
+        self.audit()
+        next_full = time.monotonic() + self.full_every
+        try:
+            while not stop.is_set():
+                remaining = next_full - time.monotonic()
+                if remaining <= 0:
+                    self.refresh(list(self.catalog.rules))
+                    self.stats["full_audits"] += 1
+                    next_full = time.monotonic() + self.full_every
+                    continue
+                changed = self.watcher.wait(min(remaining, 1.0))
+                if not changed:
+                    continue
+                self.stats["batches"] += 1
+                rules = affected_rules(self.catalog, changed)
+                if rules:
+                    # watched directories also report unrelated files, only the relevant ones are named
+                    paths = {path for path in changed if affected_rules(self.catalog, {path})}
+                    changes = self.refresh(rules, paths)
+                    logger.info(f"{len(rules)} rule(s) re-evaluated for {sorted(paths)}, {len(changes)} changed")
+                # directories created since (a new cron.* dir, ...) get watched too
+                self.watcher.watch(watch_directories(self.catalog))
+                self.stats["cpu_s"] = time.thread_time() - cpu
+        finally:
+            self.stats["cpu_s"] = time.thread_time() - cpu
+            self.watcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="watch this machine and push compliance changes")
+    parser.add_argument("--collector", metavar="URL", help="unix:/path or http(s)://..., JSON Lines on stdout without")
+    parser.add_argument("--catalog", help="check catalog, default checks/cis_default.json")
+    parser.add_argument("--polling", action="store_true", help="poll file signatures instead of inotify")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between polls")
+    parser.add_argument("--full-every", type=float, default=3600, help="seconds between full re-audits")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s", stream=sys.stderr)
+    catalog = load_catalog(args.catalog) if args.catalog else load_catalog()
+    sink = CollectorSink(args.collector) if args.collector else StdoutSink()
+    agent = Agent(catalog, sink, None, args.poll_interval, args.full_every, polling=args.polling)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        agent.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.close()
+        logger.info(f"agent stopped: {agent.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import uuid
+
+import asyncssh
+
+from bastion import JUMP_CHANNELS
+from catalog import load_catalog
+from common import Utils, build_batch_script, parse_batch_output
+from drift import RunIndex, diff, latest_backup, write_drift
+from evalcache import EvalCache
+from facts import FactsCache
+from filetree import TreeScan
+from instrumentation import NO_TIMINGS, ScanTimings
+from results_matrix import ResultMatrix, tally
+from sharding import UNRESOLVED, subnet_of
+from sinks import make_sink
+from templates.fleet_report_template import generate_fleet_report
+
+report_folder = "Reports"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)s | %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+class AsyncScanner:
+    """
+    asyncio scan engine. Every host is one asyncssh connection running the
+    batched check script from common.Utils, so thousands of hosts can be in
+    flight without a thread each.
+
+    concurrency      global cap on hosts in flight
+    per_subnet       cap on hosts in flight inside one subnet_prefix network (IP literals only)
+    host_timeout     seconds for connect + checks of one host
+    sink             optional sinks.ResultSink, per-host JSON files otherwise
+    timings          optional instrumentation.ScanTimings, adds a "wait" phase
+                     for the time a host spends queued on the semaphores
+    facts_cache      optional facts.FactsCache; hosts with fresh facts skip
+                     the facts command and rules that don't apply to them
+    probe            run the generated python probe (probe.build_probe) and
+                     only send the shell script to hosts without python
+    eval_cache       optional evalcache.EvalCache; config files whose hash was
+                     seen on an earlier host are neither sent nor re-parsed
+    jump             default jump host ([user@]host[:port]), an inventory
+                     "jump" field overrides it; every host behind a bastion
+                     is a direct-tcpip tunnel over one shared connection
+    jump_channels    cap on tunnels in flight per bastion
+    """
+
+    def __init__(
+        self,
+        concurrency=500,
+        per_subnet=64,
+        subnet_prefix=24,
+        host_timeout=60,
+        connect_timeout=10,
+        report_folder=report_folder,
+        fetch_configs=True,
+        catalog=None,
+        sink=None,
+        timings=None,
+        facts_cache=None,
+        probe=False,
+        eval_cache=None,
+        jump=None,
+        jump_channels=JUMP_CHANNELS,
+    ):
+        self.concurrency = concurrency
+        self.per_subnet = per_subnet
+        self.subnet_prefix = subnet_prefix
+        self.host_timeout = host_timeout
+        self.connect_timeout = connect_timeout
+        self.report_folder = report_folder
+        self.fetch_configs = fetch_configs
+        self.catalog = catalog or load_catalog()
+        self.sink = sink
+        self.timings = timings or NO_TIMINGS
+        self.facts_cache = facts_cache
+        self.probe = probe
+        self.eval_cache = eval_cache
+        self.jump = jump
+        self.jump_channels = jump_channels
+        self._global = None
+        self._subnets = {}
+        self._bastions = {}
+
+    def _subnet_semaphore(self, hostname):
+        """The host's per-subnet limit, None for DNS names (only the global limit applies)."""
+        key = subnet_of(hostname, self.subnet_prefix)
+        if key == UNRESOLVED:
+            return None
+        if key not in self._subnets:
+            self._subnets[key] = asyncio.BoundedSemaphore(self.per_subnet)
+        return self._subnets[key]
+
+    async def _bastion(self, jump, stack):
+        """Shared connection to a jump host, with one of its tunnel slots held on stack."""
+        host, username, password, port = jump
+        key = (host, username, port)
+        if key not in self._bastions:
+            self._bastions[key] = {
+                "lock": asyncio.Lock(),
+                "slots": asyncio.BoundedSemaphore(self.jump_channels),
+                "conn": None,
+            }
+        bastion = self._bastions[key]
+        await stack.enter_async_context(bastion["slots"])
+        async with bastion["lock"]:
+            if bastion["conn"] is None or bastion["conn"].is_closed():
+                bastion["conn"] = await asyncssh.connect(
+                    host,
+                    port=port,
+                    username=username,
+                    password=password,
+                    known_hosts=None,
+                    connect_timeout=self.connect_timeout,
+                    keepalive_interval=30,
+                )
+        return bastion["conn"]
+
+    async def _close_bastions(self):
+        for bastion in self._bastions.values():
+            if bastion["conn"] is not None:
+                bastion["conn"].close()
+                await bastion["conn"].wait_closed()
+        self._bastions = {}
+
+    async def _audit(self, machine, util):
+        async with contextlib.AsyncExitStack() as stack:
+            tunnel = {}
+            if util.jump is not None:
+                tunnel["tunnel"] = await self._bastion(util.jump, stack)
+            return await self._audit_over(machine, util, tunnel)
+
+    async def _audit_over(self, machine, util, tunnel):
+        hostname = machine.get("Hostname")
+        with self.timings.phase(hostname, "connect"):
+            conn = await asyncssh.connect(
+                hostname,
+                port=machine.get("port", 22),
+                username=machine.get("username"),
+                password=machine.get("password"),
+                known_hosts=None,
+                connect_timeout=self.connect_timeout,
+                **tunnel,
+            )
+        async with conn:
+            # with cached facts only the applicable rules are sent, otherwise
+            # the facts ride along in the same script and filter the results
+            catalog = self.catalog.for_facts(util.load_cached_facts())
+            if self.probe:
+                commands = util.compile_probe(catalog)
+                outputs = await self._run(conn, hostname, commands)
+                if outputs[-1][0] == 0:
+                    trees = await self._trees(conn, hostname, catalog)
+                    with self.timings.phase(hostname, "parse"):
+                        probed = util.evaluate_probe(catalog, commands, outputs, trees)
+                    if probed is not None:
+                        return probed
+                else:
+                    # no python on the host, this also logs why and keeps the facts
+                    util.evaluate_probe(catalog, commands, outputs)
+                catalog = catalog.for_facts(util.facts)
+            commands = util.compile_batch(catalog, self.fetch_configs)
+            outputs = await self._run(conn, hostname, commands)
+            trees = await self._trees(conn, hostname, catalog)
+        with self.timings.phase(hostname, "parse"):
+            return util.evaluate_batch(
+                catalog, commands, outputs, self.fetch_configs, trees
+            )
+
+    async def _run(self, conn, hostname, commands):
+        marker = f"__SCA_{uuid.uuid4().hex[:12]}__"
+        with self.timings.phase(hostname, "exec"):
+            completed = await conn.run(build_batch_script(commands, marker))
+        return parse_batch_output(completed.stdout or "", marker, len(commands))
+
+    async def _trees(self, conn, hostname, catalog):
+        """Glob / recursive permission rules, evaluated line by line off the find stream."""
+        if not catalog.tree_rules:
+            return {}
+        scan = TreeScan(catalog.tree_rules)
+        with self.timings.phase(hostname, "exec"):
+            async with conn.create_process(scan.command()) as process:
+                async for line in process.stdout:
+                    scan.feed(line)
+        return scan.results()
+
+    async def scan_single_machine(self, machine) -> dict:
+        hostname = machine.get("Hostname")
+        util = Utils(
+            hostname,
+            machine.get("username"),
+            machine.get("password"),
+            machine.get("port", 22),
+            timings=self.timings,
+            facts_cache=self.facts_cache,
+            eval_cache=self.eval_cache,
+            jump=machine.get("jump") or self.jump,
+        )
+        summary = {
+            "hostname": hostname,
+            "pass_cnt": 0,
+            "fail_cnt": 0,
+            "score": 0,
+            "results": [],
+        }
+
+        return await self._scan(machine, util, summary)
+
+    async def _scan(self, machine, util, summary):
+        hostname = summary["hostname"]
+        with self.timings.phase(hostname, "wait"):
+            await self._global.acquire()
+            subnet = self._subnet_semaphore(hostname)
+            try:
+                if subnet is not None:
+                    await subnet.acquire()
+            except BaseException:
+                self._global.release()
+                raise
+        try:
+            try:
+                # "host" starts once the semaphores are held: queue time is the "wait" phase,
+                # so the slowest hosts are real stragglers, not the ones dispatched last
+                with self.timings.phase(hostname, "host"):
+                    result, machine_name, ip = await asyncio.wait_for(
+                        self._audit(machine, util), self.host_timeout
+                    )
+            except asyncio.TimeoutError:
+                logger.error(f"[{hostname}] timed out after {self.host_timeout}s")
+                summary.update(status="timeout", error="timeout")
+                return summary
+            except (asyncssh.Error, OSError) as exc:
+                logger.error(f"[{hostname}] SSH scan failed: {exc}")
+                summary.update(status="unreachable", error=str(exc))
+                return summary
+            except Exception as exc:
+                # a parse / evaluate failure on one host must not abort the whole sweep
+                logger.error(f"[{hostname}] scan failed: {exc!r}")
+                summary.update(status="error", error=str(exc))
+                return summary
+        finally:
+            if subnet is not None:
+                subnet.release()
+            self._global.release()
+
+        if self.report_folder or self.sink:
+            await asyncio.to_thread(
+                util.write_report,
+                self.report_folder,
+                result,
+                machine_name,
+                ip,
+                self.sink,
+            )
+
+        pass_cnt, fail_cnt, score = tally(result)
+        summary.update(
+            pass_cnt=pass_cnt,
+            fail_cnt=fail_cnt,
+            score=score,
+            results=result,
+            status="ok",
+        )
+        logger.info(f"[{hostname}] {pass_cnt}/{len(result)} checks passed")
+        return summary
+
+    async def scan(self, machines):
+        """Scan every machine and return the per-host summaries in completion order."""
+        self._global = asyncio.Semaphore(self.concurrency)
+        self._subnets = {}
+        tasks = [asyncio.create_task(self.scan_single_machine(m)) for m in machines]
+        results = []
+        try:
+            for task in asyncio.as_completed(tasks):
+                results.append(await task)
+        finally:
+            await self._close_bastions()
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="asyncio fleet scanner")
+    parser.add_argument("--hosts", default="hosts.json")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--per-subnet", type=int, default=64)
+    parser.add_argument("--subnet-prefix", type=int, default=24)
+    parser.add_argument("--host-timeout", type=float, default=60)
+    parser.add_argument("--sink", choices=["json", "jsonl"], default="json")
+    parser.add_argument("--compress", choices=["gzip", "zstd"])
+    parser.add_argument("--history", metavar="DB", help="also record results in this SQLite database")
+    parser.add_argument("--open-report", action="store_true")
+    parser.add_argument("--jump", metavar="[USER@]HOST[:PORT]", help="reach hosts through this bastion, an inventory 'jump' field overrides it")
+    parser.add_argument("--jump-channels", type=int, default=JUMP_CHANNELS, help="concurrent tunnels per bastion")
+    parser.add_argument("--probe", action="store_true", help="run one generated python probe per host, shell checks where python is missing")
+    parser.add_argument("--eval-cache", type=int, default=256, help="config indexes / verdicts cached by content hash, 0 disables")
+    parser.add_argument("--facts-ttl", type=float, default=3600, help="seconds host facts are cached, 0 disables")
+    parser.add_argument("--drift", action="store_true", help="write Reports/drift.jsonl with the changes since the last run")
+    parser.add_argument("--parquet", metavar="FILE", help="also write the host x check results as Parquet (needs pyarrow)")
+    parser.add_argument("--timings", metavar="FILE", help="write per-phase timing histograms as JSON")
+    parser.add_argument("--prometheus", metavar="FILE", help="write timing histograms in Prometheus text format")
+    args = parser.parse_args()
+
+    Utils.rotate_reports()
+    try:
+        with open(args.hosts, "r") as f:
+            machines = json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load {args.hosts}: {e}")
+        machines = []
+
+    timings = ScanTimings() if (args.timings or args.prometheus) else None
+    with make_sink(
+        args.sink, report_folder, args.compress, args.history, run_index=args.drift
+    ) as sink:
+        scanner = AsyncScanner(
+            concurrency=args.concurrency,
+            per_subnet=args.per_subnet,
+            subnet_prefix=args.subnet_prefix,
+            host_timeout=args.host_timeout,
+            sink=sink,
+            timings=timings,
+            facts_cache=FactsCache(args.facts_ttl) if args.facts_ttl > 0 else None,
+            probe=args.probe,
+            eval_cache=EvalCache(args.eval_cache) if args.eval_cache > 0 else None,
+            jump=args.jump,
+            jump_channels=args.jump_channels,
+        )
+        results = asyncio.run(scanner.scan(machines))
+    failed = sum(1 for r in results if "error" in r)
+    logger.info(f"Scanned {len(results)} hosts, {failed} unreachable")
+    if scanner.eval_cache is not None:
+        logger.info(f"Eval cache: {scanner.eval_cache.stats()}")
+    matrix = ResultMatrix.from_summaries(results, scanner.catalog)
+    report = generate_fleet_report(
+        matrix, os.path.join(report_folder, "fleet_report.html"), args.open_report
+    )
+    logger.info(f"Fleet report written to {report}")
+    if args.parquet:
+        logger.info(f"Results written to {matrix.write_parquet(args.parquet)}")
+    baseline = latest_backup(report_folder) if args.drift else None
+    if baseline is not None:
+        counts = write_drift(
+            diff(RunIndex.load(baseline), RunIndex.load(report_folder)),
+            os.path.join(report_folder, "drift.jsonl"),
+        )
+        logger.info(f"Drift vs {baseline}: {counts or 'no changes'}")
+    if timings is not None:
+        print(timings.format_report())
+        if args.timings:
+            timings.export_json(args.timings)
+        if args.prometheus:
+            timings.export_prometheus(args.prometheus)
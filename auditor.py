@@ -1,122 +1,113 @@
-import subprocess,json,socket,datetime,os
-from templates.report_template import generate_html_report
+"""
+Single entry point: python auditor.py [local|remote|fleet|report|diff|agent] ...
+
+Only what the chosen subcommand needs is imported, so the local audit run
+from cron never loads paramiko, asyncssh or the report templates it skips.
+"""
+import argparse,json,socket,datetime,os,sys
+from catalog import load_catalog
+from common import Utils
+from local_backend import collect_local, local_facts, os_release_name
+from results_matrix import tally
 
 report_folder = "Reports"
 
-def check_file_permissions(file_path,expected_permissions):
-    """Check the permissions of a file with better error handling."""
-    
-    result = subprocess.run(["stat","-c","%a",f"{file_path}"], capture_output=True, text=True)
-    permissions = result.stdout.strip()
-    return permissions in expected_permissions, permissions
-
-def check_config(search_string, file_path, expected_comparison, operator):
-    try:
-        result = subprocess.run(
-            ["grep", search_string, file_path],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        config_value = result.stdout.split()[1]
-        try:
-            if config_value.lower() == "no" or config_value.lower() == "yes":
-                if operator == "equal":
-                    return (config_value.lower() == expected_comparison.lower()), config_value
-                else:
-                    return False, f"Operator {operator} not supported for string comparison."
-            numeric_value = int(config_value)
-            if operator == "max":
-                return numeric_value <= expected_comparison, numeric_value
-            elif operator == "min":
-                return numeric_value >= expected_comparison, numeric_value
-            elif operator == "equal":
-                return numeric_value == expected_comparison, numeric_value
-            else:
-                return False, f"Unknown operator: {operator}"
-        except ValueError:
-            return False, f"Non-numeric value found for {search_string}: {config_value}"
-
-    except FileNotFoundError:
-        return False, f"{file_path} not found."
-    except subprocess.CalledProcessError as e:
-        if e.returncode == 1:
-            return False, f"{search_string} not found in {file_path}."
-        else:
-            return False, f"Grep failed with return code {e.returncode}: {e}"
-
-def run_security_checks():
-    """Run all security checks and return formatted results."""
-
-    CHECKS = [
-        {"name":"Shadow File Permissions","type":"file_permission","file":"/etc/shadow","expected": ["640","600"]},
-        {"name":"SSH MaxAuthTries","type":"config_value","file":"/etc/ssh/sshd_config","search_string":"MaxAuthTries","expected": 4,"operator":"max"},
-        {"name":"Password Maximum Days","type":"config_value","file":"/etc/login.defs","search_string":"^PASS_MAX_DAYS","expected": 90,"operator":"max"},
-        {"name":"Password Minimum Days","type":"config_value","file":"/etc/login.defs","search_string":"^PASS_MIN_DAYS", "expected": 1,"operator":"min"},
-        {"name":"Password Warning Age","type":"config_value","file":"/etc/login.defs","search_string":"^PASS_WARN_AGE", "expected": 7,"operator":"min"},
-        {
-            "name": "SSH Root Login Disabled",
-            "type": "config_value",  # NEW type - checking for string, not number
-            "file": "/etc/ssh/sshd_config",
-            "search_string": "^PermitRootLogin",
-            "expected": "no",
-            "operator": "equal"
-        },
-        {"name":"Passwd File Permissions","type":"file_permission","file":"/etc/passwd","expected":["644"]},
-        {"name":"Group File Permissions","type":"file_permission","file":"/etc/group","expected":["644"]},
-        {"name":"SSH Empty Passwords Disabled","type":"config_value","file":"/etc/ssh/sshd_config","search_string":"^PermitEmptyPasswords","expected":"no","operator":"equal"},
-        {"name":"Password Minimum Length","type":"config_value","file":"/etc/login.defs","search_string":"^PASS_MIN_LEN","expected":14,"operator":"min"}
-
-    ]
-
-    results = []
-    for check in CHECKS:
-        if check["type"] == "file_permission":
-            status,value = check_file_permissions(check["file"],check["expected"])
-        elif check["type"] == "config_value":
-            status,value = check_config(
-                check["search_string"],
-                check["file"],
-                check["expected"],
-                check["operator"]
-            )
-        results.append({
-            "name":check["name"],
-            "status":"PASS" if status else "FAIL",
-            "expected":check["expected"],
-            "actual_value":value,
-        })
+def run_security_checks(catalog=None):
+    """
+    Run all security checks against this machine and return formatted results.
+    Uses the same rule engine as the remote scanner, fed by os.stat and a single
+    buffered read per config file instead of a stat/grep subprocess per check.
+    """
+
+    if catalog is None:
+        catalog = load_catalog()
+
+    catalog = catalog.for_facts(local_facts())
+    results = Utils("localhost",None,None).evaluate_rules(catalog,collect_local(catalog))
 
     report_metadata = {
         "timestamp": datetime.datetime.now().isoformat(),
         "tool": "Automated Security Compliance Script",
         "host": socket.gethostname(),
-        "Machine": subprocess.run(["grep", "^NAME=", "/etc/os-release"], capture_output=True, text=True).stdout.split("=")[1].strip().strip('"'),
+        "Machine": os_release_name(),
         "result": results
     }
+    os.makedirs(report_folder,exist_ok=True)
     full_path = os.path.join(report_folder, 'security_audit_report.json')   
     with open(full_path,"w") as f:
         json.dump(report_metadata,f,indent=2)
 
     return results
 
-if __name__ == "__main__":
-    result = run_security_checks()
+def audit_local(args):
+    catalog = load_catalog(args.catalog) if args.catalog else None
+    result = run_security_checks(catalog)
     for r in result:
         status = "✅ PASS" if r["status"]=="PASS" else "❌ FAIL"
         print(f"{r['name']:<30} {status} (Actual: {r['actual_value']}, Expected: {r['expected']})")
 
-    pass_cnt = sum(1 for r in result if r["status"] == "PASS")
-    fail_cnt = sum(1 for r in result if r["status"] == "FAIL")
-    total_checks = len(result)
-    compliance_score = (pass_cnt / total_checks) * 100 if total_checks > 0 else 0
+    pass_cnt, fail_cnt, compliance_score = tally(result)
     print("="*50)
     print(f"SUMMARY: {pass_cnt} Passed, {fail_cnt} Failed")
     print(f"COMPLIANCE SCORE: {compliance_score:.1f}%")
     print("="*50)
 
-    # Generate HTML report
-    with open("security_audit_report.json","r") as f:
+    if not args.no_report:
+        render_report(os.path.join(report_folder,"security_audit_report.json"),"security_audit_report.html",args.open_report)
+
+def render_report(json_path,output_path,open_browser=False):
+    """HTML report from a security_audit_report.json written by a local or remote scan."""
+    from templates.report_template import generate_html_report
+
+    with open(json_path,"r") as f:
         report_data = json.load(f)
+    generate_html_report(report_data['result'],report_data['host'],report_data['timestamp'],report_data['Machine'],output_path=output_path,open_browser=open_browser)
+
+def report(args):
+    render_report(args.input,args.output,args.open_report)
 
-    generate_html_report(report_data['result'],report_data['host'],report_data['timestamp'],report_data['Machine'])
\ No newline at end of file
+def delegate(module_name):
+    """Subcommand that hands its arguments to another script's main(), imported on use."""
+    def run(args):
+        return __import__(module_name).main(args.forwarded)
+    return run
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="auditor", description="security configuration auditor")
+    sub = parser.add_subparsers(dest="command")
+
+    local = sub.add_parser("local", help="audit this machine (the default)")
+    local.add_argument('--catalog', help="check catalog, default checks/cis_default.json")
+    local.add_argument('--no-report', action='store_true', help="skip the HTML report, JSON only")
+    local.add_argument('--open-report', action='store_true', help="open the HTML report in a browser")
+    local.set_defaults(func=audit_local)
+
+    rendered = sub.add_parser("report", help="render the HTML report of a JSON audit report")
+    rendered.add_argument('--input', default=os.path.join(report_folder,"security_audit_report.json"))
+    rendered.add_argument('--output', default="security_audit_report.html")
+    rendered.add_argument('--open-report', action='store_true', help="open the HTML report in a browser")
+    rendered.set_defaults(func=report)
+
+    # the rest belong to their own scripts: their options are parsed there (try "fleet -h")
+    for name, module_name, help_text in (
+        ("remote", "remote_scanner", "scan the inventory one host at a time"),
+        ("fleet", "parallel_remote_scanner", "scan the inventory in parallel, with sweeps and sharding"),
+        ("diff", "drift", "changes between two scan runs"),
+        ("agent", "agent", "stay resident, re-check on file changes and push the deltas"),
+    ):
+        sub.add_parser(name, help=help_text, add_help=False).set_defaults(func=delegate(module_name))
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["local", *argv]  # bare "python auditor.py" keeps auditing this machine
+    args, forwarded = parser.parse_known_args(argv)
+    if forwarded and args.func in (audit_local, report):
+        parser.error(f"unrecognized arguments: {' '.join(forwarded)}")
+    args.forwarded = forwarded
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
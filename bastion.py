@@ -0,0 +1,149 @@
+import collections
+import threading
+
+# concurrent direct-tcpip tunnels per bastion transport
+JUMP_CHANNELS = 32
+
+
+def parse_jump(spec, username=None, password=None):
+    """
+    (host, username, password, port) of a jump host written as
+    "user@host:port" (user and port optional, "[v6]:port" for IPv6) or as an
+    inventory-style dict with Hostname / username / password / port.
+    Credentials not given default to the target's.
+    """
+    if isinstance(spec, dict):
+        return (
+            spec.get("Hostname") or spec.get("hostname") or spec.get("host"),
+            spec.get("username", username),
+            spec.get("password", password),
+            int(spec.get("port") or 22),
+        )
+    user, _, address = str(spec).rpartition("@")
+    if address.startswith("["):
+        host, _, port = address[1:].partition("]")
+        port = port.lstrip(":")
+    else:
+        host, _, port = address.partition(":")
+    return host, user or username, password, int(port or 22)
+
+
+class Tunnel:
+    """
+    A direct-tcpip channel handed to paramiko as the target's socket. Closing
+    it, which the target's transport does when it shuts down, frees the slot
+    it held on the bastion.
+    """
+
+    def __init__(self, channel, release):
+        self._channel = channel
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+    def close(self):
+        try:
+            self._channel.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class BastionPool:
+    """
+    One authenticated transport per jump host, shared by every target behind
+    it: each target's SSH session runs inside a direct-tcpip channel of that
+    transport, so reaching a host costs a channel open instead of another
+    TCP connect and SSH handshake through a ProxyCommand.
+
+    max_channels    concurrent tunnels per bastion, further hosts wait for a slot
+    keepalive       seconds between keepalives on the bastion transports
+    """
+
+    def __init__(self, max_channels=JUMP_CHANNELS, keepalive=30):
+        self.max_channels = max_channels
+        self.keepalive = keepalive
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._key_locks = collections.defaultdict(threading.Lock)
+        # kept across reconnects: tunnels of a dead transport still hold their slots until closed
+        self._slots = collections.defaultdict(
+            lambda: threading.BoundedSemaphore(self.max_channels)
+        )
+        self.stats = {"connects": 0, "tunnels": 0, "slot_timeouts": 0, "peak_tunnels": 0}
+        self._open = 0
+
+    def _transport(self, key, password, timeout):
+        import paramiko  # deferred like in common.Utils.create_ssh_connection
+
+        with self._key_locks[key]:
+            client = self._clients.get(key)
+            transport = client.get_transport() if client is not None else None
+            if transport is not None and transport.is_active():
+                return transport
+            if client is not None:
+                client.close()
+            host, username, port = key
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                client.connect(
+                    host,
+                    port,
+                    username,
+                    password,
+                    timeout=timeout,
+                    banner_timeout=timeout,
+                    auth_timeout=timeout,
+                )
+            except BaseException:
+                client.close()
+                raise
+            transport = client.get_transport()
+            transport.set_keepalive(self.keepalive)
+            with self._lock:
+                self._clients[key] = client
+                self.stats["connects"] += 1
+            return transport
+
+    def open(self, jump, hostname, port=22, timeout=None):
+        """
+        Tunnel to hostname:port through the jump host, a parse_jump() tuple.
+        Waits up to timeout seconds for a free channel slot on the bastion.
+        """
+        host, username, password, jump_port = jump
+        key = (host, username, jump_port)
+        with self._lock:
+            slots = self._slots[key]
+        if not slots.acquire(timeout=timeout):
+            with self._lock:
+                self.stats["slot_timeouts"] += 1
+            raise TimeoutError(f"no free channel on bastion {host} after {timeout}s")
+        try:
+            channel = self._transport(key, password, timeout).open_channel(
+                "direct-tcpip", (hostname, port), ("127.0.0.1", 0), timeout=timeout
+            )
+        except BaseException:
+            slots.release()
+            raise
+        with self._lock:
+            self.stats["tunnels"] += 1
+            self._open += 1
+            self.stats["peak_tunnels"] = max(self.stats["peak_tunnels"], self._open)
+        return Tunnel(channel, lambda: self._closed(slots))
+
+    def _closed(self, slots):
+        with self._lock:
+            self._open -= 1
+        slots.release()
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    def metrics(self):
+        return dict(self.stats, bastions=len(self._clients), open_tunnels=self._open)
@@ -0,0 +1,157 @@
+"""
+Resident agent against a synthetic /etc tree: time from a file change to the
+delta arriving at the stand-in collector (inotify over a Unix socket, and
+polling over HTTP), rules re-evaluated per change, idle CPU, and the cost of
+a targeted re-evaluation versus a full audit.
+
+    python benchmarks/bench_agent.py --changes 20 --poll-interval 1
+"""
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import Agent, CollectorSink, affected_rules  # noqa: E402
+from catalog import DEFAULT_CATALOG, load_catalog  # noqa: E402
+from collector_standin import CollectorStandIn  # noqa: E402
+from instrumentation import percentile  # noqa: E402
+from ssh_fleet import IMAGES, write_etc  # noqa: E402
+
+
+def local_catalog(root):
+    """The default catalog with every /etc/ path moved below root."""
+    with open(DEFAULT_CATALOG) as f:
+        document = json.load(f)
+    for check in document["checks"]:
+        check["file"] = check["file"].replace("/etc/", f"{root}/etc/", 1)
+    path = os.path.join(root, "catalog.json")
+    with open(path, "w") as f:
+        json.dump(document, f)
+    return load_catalog(path)
+
+
+def mutations(root):
+    """(path the delta names, change) pairs cycling over a permission, a config value and a glob rule."""
+    shadow = f"{root}/etc/shadow"
+    sshd = f"{root}/etc/ssh/sshd_config"
+    key = f"{root}/etc/ssh/ssh_host_rsa_key"
+
+    def rewrite(value):
+        with open(sshd) as f:
+            text = f.read()
+        text = "\n".join(
+            f"MaxAuthTries {value}" if line.startswith("MaxAuthTries") else line for line in text.split("\n")
+        )
+        with open(sshd + ".tmp", "w") as f:
+            f.write(text)
+        os.replace(sshd + ".tmp", sshd)  # editors and config management swap the file in
+
+    step = 0
+    while True:
+        flip = step % 2
+        yield shadow, lambda: os.chmod(shadow, 0o644 if not flip else 0o640)
+        yield sshd, lambda: rewrite(6 if not flip else 4)
+        yield key, lambda: os.chmod(key, 0o644 if not flip else 0o600)
+        step += 1
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_mode(label, catalog, root, collector, url, polling, args):
+    sink = CollectorSink(url)
+    agent = Agent(catalog, sink, poll_interval=args.poll_interval, polling=polling)
+    stop = threading.Event()
+    start = len(collector.records)
+    thread = threading.Thread(target=agent.run, args=(stop,), daemon=True)
+    thread.start()
+    if collector.wait_for(lambda r: r["type"] == "snapshot", 10, start) is None:
+        raise RuntimeError(f"{label}: no snapshot")
+
+    latencies, missed = [], 0
+    changes = mutations(root)
+    for _ in range(args.changes):
+        path, change = next(changes)
+        seen = len(collector.records)
+        changed_at = time.time()
+        change()
+        # polling names a glob rule by its pattern, inotify by the file
+        got = collector.wait_for(
+            lambda r: r["type"] == "delta" and any(fnmatch.fnmatch(path, p) for p in r["paths"]), 10, seen
+        )
+        if got is None:
+            missed += 1
+        else:
+            latencies.append(got[0] - changed_at)
+        time.sleep(0.05)
+
+    cpu = time.process_time()
+    time.sleep(args.idle)
+    idle_cpu = (time.process_time() - cpu) / args.idle
+    stop.set()
+    thread.join(5)
+    sink.close()
+    latencies.sort()
+    return {
+        "label": label,
+        "p50": percentile(latencies, 50),
+        "max": latencies[-1] if latencies else 0.0,
+        "missed": missed,
+        "rules_per_change": agent.stats["reevaluated"] / max(agent.stats["batches"], 1),
+        "idle_cpu": idle_cpu,
+        "agent": agent,
+    }
+
+
+def timed(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--changes", type=int, default=12)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds of idle CPU measured per mode")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as root:
+        write_etc(root, IMAGES[0], 0)
+        catalog = local_catalog(root)
+        unix_path = os.path.join(root, "collector.sock")
+        port = free_port()
+        collector = CollectorStandIn(unix_path, ("127.0.0.1", port)).start()
+        try:
+            rows = [
+                run_mode("inotify + unix", catalog, root, collector, f"unix:{unix_path}", False, args),
+                run_mode("polling + http", catalog, root, collector, f"http://127.0.0.1:{port}/", True, args),
+            ]
+        finally:
+            collector.stop()
+
+        agent = rows[0]["agent"]
+        full = timed(lambda: agent.evaluate(list(agent.catalog.rules)))
+        shadow_rules = affected_rules(agent.catalog, {f"{root}/etc/shadow"})
+        targeted = timed(lambda: agent.evaluate(shadow_rules))
+
+    print(f"{len(catalog)} rules, {args.changes} changes per mode")
+    for row in rows:
+        print(
+            f"{row['label']:<16} detect->collector p50: {row['p50'] * 1000:7.1f} ms  max: {row['max'] * 1000:7.1f} ms  "
+            f"missed: {row['missed']}  rules/change: {row['rules_per_change']:4.1f}  idle CPU: {row['idle_cpu']:.2%}"
+        )
+    print(f"full audit: {full * 1e6:8.1f} us   re-evaluate /etc/shadow rules: {targeted * 1e6:8.1f} us")
@@ -0,0 +1,107 @@
+"""
+Scan a few hundred simulated hosts with the asyncio engine.
+
+Every simulated host is an asyncssh server bound to its own 127.x.y.z
+loopback address, so the per-subnet limits see a realistic spread. Commands
+are executed by the local /bin/sh after an artificial link latency.
+
+    python benchmarks/bench_async_scanner.py --hosts 300 --latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import asyncssh
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_scanner import AsyncScanner  # noqa: E402
+
+
+class _AcceptAll(asyncssh.SSHServer):
+    def begin_auth(self, username):
+        return True
+
+    def password_auth_supported(self):
+        return True
+
+    def validate_password(self, username, password):
+        return True
+
+
+def _handler(latency):
+    async def handle(process):
+        await asyncio.sleep(latency)
+        proc = await asyncio.create_subprocess_exec(
+            "/bin/sh",
+            "-c",
+            process.command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        out, err = await proc.communicate()
+        process.stdout.write(out.decode(errors="ignore"))
+        process.stderr.write(err.decode(errors="ignore"))
+        process.exit(proc.returncode)
+
+    return handle
+
+
+def simulated_addresses(count):
+    # 50 hosts per /24 so subnet semaphores are exercised
+    for i in range(count):
+        yield f"127.0.{1 + i // 50}.{1 + i % 50}"
+
+
+async def main(args):
+    host_key = asyncssh.generate_private_key("ssh-ed25519")
+    addresses = list(simulated_addresses(args.hosts))
+    servers = [
+        await asyncssh.create_server(
+            _AcceptAll,
+            address,
+            args.port,
+            server_host_keys=[host_key],
+            process_factory=_handler(args.latency),
+        )
+        for address in addresses
+    ]
+    machines = [
+        {"Hostname": address, "port": args.port, "username": "bench", "password": "x"}
+        for address in addresses
+    ]
+
+    scanner = AsyncScanner(
+        concurrency=args.concurrency,
+        per_subnet=args.per_subnet,
+        host_timeout=args.host_timeout,
+        report_folder=None,
+    )
+    start = time.perf_counter()
+    results = await scanner.scan(machines)
+    elapsed = time.perf_counter() - start
+
+    for server in servers:
+        server.close()
+
+    failed = sum(1 for r in results if "error" in r)
+    print(f"hosts: {len(results)}  failed: {failed}")
+    print(f"elapsed: {elapsed:.2f}s  throughput: {len(results) / elapsed:.1f} hosts/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=300)
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--per-subnet", type=int, default=64)
+    parser.add_argument("--host-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("asyncssh").setLevel(logging.WARNING)
+    asyncio.run(main(args))
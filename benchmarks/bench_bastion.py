@@ -0,0 +1,112 @@
+"""
+Hosts behind a bastion: every target reached through one shared bastion
+transport (bastion.BastionPool, direct-tcpip channels) versus a fresh
+bastion connection per target, as a per-host ProxyCommand would do.
+
+Runs against two kinds of local stand-ins from benchmarks/ssh_fleet.py: the
+simulated fleet as targets and one forwarding host as the bastion. Reports
+wall time, bastion TCP connections, peak tunnels in flight through the
+shared pool (which must stay within --jump-channels) and whether both modes
+produce the same results. --jump-channels defaults to --workers, so both
+modes run at the same concurrency and only the bastion handshakes differ.
+
+The first --bad-auth hosts get a wrong password. Their failed logins must
+hand their tunnel slots back: with more of them than --jump-channels, a
+leaked slot would make every other host behind the bastion time out.
+
+    python benchmarks/bench_bastion.py --hosts 40 --workers 16 --bad-auth 12
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel_remote_scanner  # noqa: E402
+from bastion import BastionPool  # noqa: E402
+from scheduler import FleetScheduler  # noqa: E402
+from ssh_fleet import SimulatedFleet, SimulatedHost  # noqa: E402
+
+BASTION = "127.0.250.1"
+
+
+def scan(machines, workers, bastions, jump):
+    scheduler = FleetScheduler(workers, host_timeout=120)
+    start = time.perf_counter()
+    results = parallel_remote_scanner.scan_fleet(
+        machines, scheduler=scheduler, bastions=bastions, jump=jump
+    )
+    return time.perf_counter() - start, results
+
+
+def verdicts(results):
+    return {
+        summary["hostname"]: [(r["name"], r["status"]) for r in summary.get("results") or ()]
+        for summary in results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=40)
+    parser.add_argument("--port", type=int, default=2240)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--jump-channels", type=int, help="tunnel cap of the shared pool, default --workers")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds added to every command")
+    parser.add_argument("--connect-latency", type=float, default=0.05, help="seconds before every SSH handshake")
+    parser.add_argument("--bad-auth", type=int, default=12, help="hosts scanned with a wrong password")
+    args = parser.parse_args()
+    if args.jump_channels is None:
+        args.jump_channels = args.workers
+    logging.disable(logging.CRITICAL)
+
+    fleet = SimulatedFleet(
+        args.hosts, args.port, args.latency, connect_latency=args.connect_latency
+    ).start()
+    with tempfile.TemporaryDirectory() as root:
+        bastion = SimulatedHost(
+            BASTION, args.port, root, fleet.host_key, 0, 0, 0, 0, args.connect_latency, forwarding=True
+        )
+        bastion.start()
+        jump = f"bench@{BASTION}:{args.port}"
+        machines = fleet.machines()
+        for machine in machines[: args.bad_auth]:
+            machine["password"] = "wrong"
+        previous_cwd = os.getcwd()
+        os.chdir(root)  # per-host reports and caches stay out of the checkout
+        parallel_remote_scanner.report_folder = os.path.join(root, "Reports")
+        os.makedirs(parallel_remote_scanner.report_folder)
+        try:
+            rows = []
+            for label, bastions in (
+                ("bastion per host", None),
+                ("shared bastion", BastionPool(args.jump_channels)),
+            ):
+                connections, tunnels = bastion.connections, bastion.tunnels
+                wall, results = scan(machines, args.workers, bastions, jump)
+                metrics = bastions.metrics() if bastions is not None else None
+                if bastions is not None:
+                    bastions.close()
+                rows.append((label, wall, results, bastion.connections - connections, bastion.tunnels - tunnels, metrics))
+        finally:
+            os.chdir(previous_cwd)
+            bastion.stop()
+            fleet.stop()
+
+    for label, wall, results, connections, tunnels, metrics in rows:
+        ok = sum(1 for r in results if r.get("results"))
+        print(
+            f"{label:<18} {wall:6.2f}s  hosts ok: {ok:>4}/{len(results)}  "
+            f"bastion connections: {connections:>4}  tunnels: {tunnels:>4}"
+            + (f"  peak tunnels: {metrics['peak_tunnels']}" if metrics is not None else "")
+        )
+    shared = rows[1][5]
+    print(f"tunnel cap {args.jump_channels} respected: {shared['peak_tunnels'] <= args.jump_channels}")
+    print(
+        f"{min(args.bad_auth, args.hosts)} failed logins: tunnels left open {shared['open_tunnels']}, "
+        f"slot timeouts {shared['slot_timeouts']}"
+    )
+    print("same results:", verdicts(rows[0][2]) == verdicts(rows[1][2]))
@@ -0,0 +1,96 @@
+"""
+Per-host evaluation cost of the compiled catalog as it grows from the
+12 shipped rules to a few hundred synthetic CIS-style rules, plus the
+start-up cost of loading and compiling the synthetic catalog.
+
+    python benchmarks/bench_catalog.py --rules 300 --hosts 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import compile_catalog, load_catalog  # noqa: E402
+from common import Utils  # noqa: E402
+
+
+def synthetic_document(count):
+    checks = []
+    for i in range(count):
+        if i % 3 == 0:
+            checks.append(
+                {
+                    "id": f"X.{i}",
+                    "name": f"Synthetic permission {i}",
+                    "type": "file_permission",
+                    "file": f"/etc/synthetic/{i % 40}",
+                    "expected": ["600", "640"],
+                }
+            )
+        else:
+            checks.append(
+                {
+                    "id": f"X.{i}",
+                    "name": f"Synthetic key {i}",
+                    "type": "config_value",
+                    "file": "/etc/ssh/sshd_config" if i % 2 else "/etc/login.defs",
+                    "search_string": f"^Key{i}",
+                    "operator": "max",
+                    "expected": 10,
+                }
+            )
+    return {"profile": "synthetic", "checks": checks}
+
+
+def fake_outputs(util, catalog):
+    commands = util.compile_batch(catalog)
+    outputs = []
+    for command in commands:
+        if command.startswith("cat "):
+            body = "\n".join(f"Key{i} {i % 20}" for i in range(len(catalog)))
+            outputs.append((0, "# synthetic\n" + body, ""))
+        elif command.startswith("stat "):
+            outputs.append((0, "600", ""))
+        else:
+            outputs.append((0, "Linux", ""))
+    return commands, outputs
+
+
+def per_host_cost(catalog, hosts):
+    util = Utils("bench", "bench", "")
+    commands, outputs = fake_outputs(util, catalog)
+    trees = {rule.id: (True, "1 files checked") for rule in catalog.tree_rules}
+    start = time.perf_counter()
+    for _ in range(hosts):
+        util.evaluate_batch(catalog, commands, outputs, trees=trees)
+    return (time.perf_counter() - start) / hosts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--hosts", type=int, default=2000)
+    args = parser.parse_args()
+
+    shipped = load_catalog()
+    large = compile_catalog(synthetic_document(args.rules))
+    for label, catalog in (("shipped", shipped), ("synthetic", large)):
+        cost = per_host_cost(catalog, args.hosts)
+        print(
+            f"{label:<10} rules: {len(catalog):>4}  per host: {cost * 1e6:8.1f} us  "
+            f"per rule: {cost / len(catalog) * 1e6:6.2f} us"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.json")
+        with open(path, "w") as f:
+            json.dump(synthetic_document(args.rules), f)
+
+        start = time.perf_counter()
+        load_catalog(path)
+        compiled = time.perf_counter() - start
+    print(f"load + compile {args.rules} rules: {compiled * 1000:.2f} ms")
@@ -0,0 +1,87 @@
+"""
+Compare two simulated 10k-host runs where about 1% of hosts drifted.
+
+Times loading each run from per-host JSON reports versus from the compact
+RunIndexSink index, and the diff itself.
+
+    python benchmarks/bench_drift.py --hosts 10000 --drifted 100
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog  # noqa: E402
+from drift import INDEX_SUFFIX, RunIndex, RunIndexSink, diff  # noqa: E402
+from sinks import PerHostJsonSink, TeeSink  # noqa: E402
+
+
+def records(count, drifted, seed):
+    catalog = load_catalog()
+    changed = set(random.Random(seed).sample(range(count), drifted)) if seed else set()
+    for i in range(count):
+        ip = f"10.{i // 65536}.{i // 256 % 256}.{i % 256}"
+        result = []
+        for rule in catalog.rules:
+            value = "4" if rule.key == "MaxAuthTries" else "600"
+            status = "PASS"
+            if i in changed and rule.key == "MaxAuthTries":
+                value, status = "6", "FAIL"
+            result.append(
+                {"name": rule.name, "status": status, "expected": "4", "actual_value": value}
+            )
+        yield {"target": ip, "ip": ip, "Machine": "Linux", "result": result}
+
+
+def write_run(folder, count, drifted, seed):
+    os.makedirs(folder)
+    with TeeSink(
+        [PerHostJsonSink(folder), RunIndexSink(os.path.join(folder, "audit" + INDEX_SUFFIX))]
+    ) as sink:
+        for record in records(count, drifted, seed):
+            sink.write(record)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10000)
+    parser.add_argument("--drifted", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline_dir = os.path.join(directory, "baseline")
+        current_dir = os.path.join(directory, "current")
+        write_run(baseline_dir, args.hosts, 0, None)
+        write_run(current_dir, args.hosts, args.drifted, 7)
+
+        index_loads = []
+        for folder in (baseline_dir, current_dir):
+            index, seconds = timed(lambda: RunIndex.load(folder))
+            index_loads.append((index, seconds))
+
+        for folder in (baseline_dir, current_dir):
+            os.remove(os.path.join(folder, "audit" + INDEX_SUFFIX))
+        _, raw_seconds = timed(
+            lambda: (RunIndex.load(baseline_dir), RunIndex.load(current_dir))
+        )
+
+        changes, diff_seconds = timed(
+            lambda: list(diff(index_loads[0][0], index_loads[1][0]))
+        )
+        load_seconds = index_loads[0][1] + index_loads[1][1]
+        print(f"hosts: {args.hosts}  drifted: {args.drifted}  changes: {len(changes)}")
+        print(f"load from per-host reports: {raw_seconds * 1000:8.1f} ms")
+        print(f"load from run index:        {load_seconds * 1000:8.1f} ms")
+        print(f"diff:                       {diff_seconds * 1000:8.1f} ms")
+        print(f"index load + diff:          {(load_seconds + diff_seconds) * 1000:8.1f} ms")
+        print(f"sample: {changes[0] if changes else None}")
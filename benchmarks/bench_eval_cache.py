@@ -0,0 +1,78 @@
+"""
+Per-host evaluation cost and config bytes transferred for a fleet built
+from a few golden images, with and without the content-hash EvalCache.
+
+    python benchmarks/bench_eval_cache.py --hosts 5000 --images 3
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog  # noqa: E402
+from common import Utils  # noqa: E402
+from evalcache import EvalCache  # noqa: E402
+from facts import FACTS_COMMAND  # noqa: E402
+
+
+def image_files(image):
+    filler = "\n".join(f"# padding comment line {i} of image {image}" for i in range(120))
+    return {
+        "/etc/ssh/sshd_config": (
+            f"{filler}\nPermitRootLogin no\nMaxAuthTries {3 + image}\n"
+            "PermitEmptyPasswords no\nMatch User backup\n    PermitRootLogin yes\n"
+        ),
+        "/etc/login.defs": (
+            f"{filler}\nPASS_MAX_DAYS 90\nPASS_MIN_DAYS 1\nPASS_WARN_AGE 7\nPASS_MIN_LEN {12 + image}\n"
+        ),
+    }
+
+
+def remote_output(command, files, known):
+    """What the host would answer for one compile_batch() command."""
+    if command == FACTS_COMMAND:
+        return (0, "machine=Linux\nips=10.0.0.1", "")
+    for path, content in files.items():
+        if path in command:
+            if command.startswith("cat "):
+                return (0, content.strip(), "")
+            digest = hashlib.sha256(content.encode()).hexdigest()
+            body = "" if digest in known.get(path, ()) else "\n" + content
+            return (0, (digest + body).strip(), "")
+    return (0, "600", "")
+
+
+def run(hosts, images, cache):
+    catalog = load_catalog()
+    fleet = [image_files(i) for i in range(images)]
+    transferred = 0
+    start = time.perf_counter()
+    results = []
+    for host in range(hosts):
+        files = fleet[host % images]
+        util = Utils(f"10.0.{host // 256}.{host % 256}", "bench", "", eval_cache=cache)
+        commands = util.compile_batch(catalog)
+        outputs = [remote_output(c, files, util._known) for c in commands]
+        transferred += sum(len(out) for _, out, _ in outputs)
+        results.append(util.evaluate_batch(catalog, commands, outputs, trees={
+            rule.id: (True, "0 files checked") for rule in catalog.tree_rules
+        })[0])
+    return (time.perf_counter() - start) / hosts, transferred / hosts, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--images", type=int, default=3)
+    args = parser.parse_args()
+
+    plain = run(args.hosts, args.images, None)
+    cache = EvalCache()
+    cached = run(args.hosts, args.images, cache)
+    for label, (seconds, size, _) in (("no cache", plain), ("eval cache", cached)):
+        print(f"{label:<12} per host: {seconds * 1e6:8.1f} us  config bytes/host: {size:8.0f}")
+    print(f"speedup: {plain[0] / cached[0]:.1f}x  cache: {cache.stats()}")
+    print("same results:", plain[2] == cached[2])
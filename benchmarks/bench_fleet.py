@@ -0,0 +1,214 @@
+"""
+Scanner throughput against a simulated SSH fleet (benchmarks/ssh_fleet.py).
+
+Each engine runs in its own forked process against the same fleet, which
+is served from another process, so CPU and peak RSS belong to the scanner
+alone. Reports hosts/s, p50/p99 host latency, CPU per host and peak RSS.
+
+    python benchmarks/bench_fleet.py --hosts 200 --latency 0.05 --jitter 0.02 --failure-rate 0.01
+    python benchmarks/bench_fleet.py --save baseline.json
+    python benchmarks/bench_fleet.py --compare baseline.json --tolerance 0.2   # exit 1 on regression
+
+New engines only need an entry in ENGINES: a function (machines, folder, args)
+returning (host summaries, per-host latencies in seconds).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import ScanTimings, percentile  # noqa: E402
+from ssh_fleet import serve_fleet  # noqa: E402
+
+
+def engine_remote(machines, folder, args):
+    import remote_scanner
+
+    remote_scanner.report_folder = folder
+    results, latencies = [], []
+    for machine in machines:
+        start = time.perf_counter()
+        results.append(remote_scanner.scan_single_machine(machine))
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+
+def _parallel(extra):
+    def run(machines, folder, args):
+        import parallel_remote_scanner
+
+        parallel_remote_scanner.report_folder = folder
+        scan_args = parallel_remote_scanner.build_parser().parse_args(
+            ["--workers", str(args.workers), "--timings", os.path.join(folder, "timings.json"), *extra]
+        )
+        context = parallel_remote_scanner.ScanContext(scan_args)
+        try:
+            results = context.sweep(machines)
+        finally:
+            context.close()
+        return results, context.timings.samples["host"]
+
+    return run
+
+
+def engine_async(machines, folder, args):
+    from async_scanner import AsyncScanner
+
+    timings = ScanTimings()
+    scanner = AsyncScanner(
+        concurrency=args.workers * 8, report_folder=folder, timings=timings, host_timeout=120
+    )
+    results = asyncio.run(scanner.scan(machines))
+    return results, timings.samples["host"]
+
+
+ENGINES = {
+    "remote": engine_remote,
+    "parallel": _parallel([]),
+    "parallel-probe": _parallel(["--probe"]),
+    "async": engine_async,
+}
+
+
+def ok(summary):
+    return "error" not in summary and summary.get("status", "ok") == "ok"
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    # the scanners print per-host progress
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def measure(name, machines, args, queue):
+    logging.disable(logging.CRITICAL)
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            os.chdir(folder)  # .state/ stays per run
+            before = resource.getrusage(resource.RUSAGE_SELF)
+            start = time.perf_counter()
+            with quiet_stdout():
+                results, latencies = ENGINES[name](machines, folder, args)
+            wall = time.perf_counter() - start
+            after = resource.getrusage(resource.RUSAGE_SELF)
+    except ImportError as exc:
+        queue.put({"engine": name, "skipped": str(exc)})
+        return
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    latencies = sorted(latencies)
+    queue.put(
+        {
+            "engine": name,
+            "hosts": len(results),
+            "ok": sum(1 for r in results if ok(r)),
+            "wall_s": wall,
+            "hosts_per_s": len(results) / wall if wall else 0.0,
+            "p50_s": percentile(latencies, 50),
+            "p99_s": percentile(latencies, 99),
+            "cpu_s": cpu,
+            "cpu_ms_per_host": cpu * 1000 / max(len(results), 1),
+            "peak_rss_mb": after.ru_maxrss / 1024,
+        }
+    )
+
+
+def run_engine(name, machines, args):
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(name, machines, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def regressions(current, baseline, tolerance):
+    found = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if not before or "skipped" in now or "skipped" in before:
+            continue
+        if now["hosts_per_s"] < before["hosts_per_s"] * (1 - tolerance):
+            found.append(f"{name}: {before['hosts_per_s']:.1f} -> {now['hosts_per_s']:.1f} hosts/s")
+        if now["p99_s"] > before["p99_s"] * (1 + tolerance):
+            found.append(f"{name}: p99 {before['p99_s']:.3f}s -> {now['p99_s']:.3f}s")
+    return found
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark scan engines against a simulated SSH fleet")
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--port", type=int, default=2230)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every command")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random seconds per command")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of connections dropped")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--save", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="baseline written by --save, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    fleet_options = {
+        "hosts": args.hosts,
+        "port": args.port,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "failure_rate": args.failure_rate,
+    }
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    server = multiprocessing.Process(target=serve_fleet, args=(fleet_options, ready, stop), daemon=True)
+    server.start()
+    ready.wait()
+
+    from ssh_fleet import simulated_addresses
+
+    machines = [
+        {"Hostname": address, "port": args.port, "username": "bench", "password": "bench"}
+        for address in simulated_addresses(args.hosts)
+    ]
+    current = {}
+    try:
+        for name in args.engines:
+            result = current[name] = run_engine(name, machines, args)
+            if "skipped" in result:
+                print(f"{name:<15} skipped: {result['skipped']}")
+                continue
+            print(
+                f"{name:<15} hosts: {result['hosts']:>5} ok: {result['ok']:>5}  "
+                f"{result['hosts_per_s']:7.1f} hosts/s  p50: {result['p50_s']:6.3f}s  "
+                f"p99: {result['p99_s']:6.3f}s  cpu/host: {result['cpu_ms_per_host']:6.1f} ms  "
+                f"peak RSS: {result['peak_rss_mb']:6.1f} MB"
+            )
+    finally:
+        stop.set()
+        server.join(5)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"fleet": fleet_options, "engines": current}, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            found = regressions(current, json.load(f)["engines"], args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if found else 0)
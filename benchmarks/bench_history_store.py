@@ -0,0 +1,65 @@
+"""
+Bulk insert throughput of the SQLite history store for one large run,
+plus the latency of the indexed "who failed check X" query afterwards.
+
+    python benchmarks/bench_history_store.py --hosts 10000
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog  # noqa: E402
+from history_store import HistorySink, HistoryStore  # noqa: E402
+
+
+def synthetic_record(i, rules):
+    return {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "target": f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}",
+        "ip": f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}",
+        "Machine": "Linux",
+        "result": [
+            {
+                "name": rule.name,
+                "status": "FAIL" if (i + n) % 7 == 0 else "PASS",
+                "expected": rule.expected,
+                "actual_value": "6",
+            }
+            for n, rule in enumerate(rules)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10000)
+    args = parser.parse_args()
+
+    rules = load_catalog().rules
+    records = [synthetic_record(i, rules) for i in range(args.hosts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        start = time.perf_counter()
+        sink = HistorySink(store, label="bench")
+        for record in records:
+            sink.write(record)
+        sink.close()
+        elapsed = time.perf_counter() - start
+        rows = args.hosts * len(rules)
+        print(
+            f"inserted {args.hosts} hosts / {rows} results in {elapsed:.2f}s "
+            f"({rows / elapsed:,.0f} rows/s)"
+        )
+
+        start = time.perf_counter()
+        failing = store.failing_hosts(rules[1].name, days=30)
+        print(
+            f"failing_hosts({rules[1].name!r}): {len(failing)} hosts in "
+            f"{(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        store.close()
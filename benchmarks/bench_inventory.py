@@ -0,0 +1,93 @@
+"""
+Memory and speed of loading a large inventory: json.load of the whole file
+versus the streamed inventory.Inventory (JSON array, JSON Lines and CSV),
+and a full scheduler pass over it with a no-op scan.
+
+    python benchmarks/bench_inventory.py --hosts 100000
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import HostFilter, Inventory  # noqa: E402
+from scheduler import FleetScheduler  # noqa: E402
+
+
+def make_hosts(count):
+    for i in range(count):
+        yield {
+            "Hostname": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+            "username": "audit",
+            "password": f"secret-{i:08d}",
+            "port": 22,
+            "tags": ["prod" if i % 3 else "staging", f"rack{i % 40}"],
+        }
+
+
+def write_inventories(directory, count):
+    paths = {}
+    paths["json"] = os.path.join(directory, "hosts.json")
+    with open(paths["json"], "w") as f:
+        json.dump(list(make_hosts(count)), f)
+    paths["jsonl"] = os.path.join(directory, "hosts.jsonl")
+    with open(paths["jsonl"], "w") as f:
+        for host in make_hosts(count):
+            f.write(json.dumps(host) + "\n")
+    paths["csv"] = os.path.join(directory, "hosts.csv")
+    with open(paths["csv"], "w", newline="") as f:
+        writer = csv.DictWriter(f, ["Hostname", "username", "password", "port", "tags"])
+        writer.writeheader()
+        for host in make_hosts(count):
+            writer.writerow(dict(host, tags=";".join(host["tags"])))
+    return paths
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<34} hosts: {count:>7}  {elapsed:6.2f}s  peak: {peak / 1e6:8.1f} MB")
+
+
+def noop_scan(machine, deadline=None):
+    return {"hostname": machine["Hostname"], "pass_cnt": 1, "fail_cnt": 0, "score": 100, "results": []}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_inventories(directory, args.hosts)
+
+        def load_whole():
+            with open(paths["json"]) as f:
+                return len(json.load(f))
+
+        measure("json.load (whole file)", load_whole)
+        for kind, path in paths.items():
+            measure(f"streamed {kind}", lambda: sum(1 for _ in Inventory(path)))
+        filtered = Inventory(
+            paths["jsonl"], HostFilter(tags=["prod"], cidrs=["10.0.0.0/16"], globs=["10.0.1*"])
+        )
+        measure("streamed jsonl, tag+cidr+glob", lambda: sum(1 for _ in filtered))
+
+        def schedule():
+            scheduler = FleetScheduler(max_workers=32, window=1024)
+            count = 0
+            for _ in scheduler.stream(Inventory(paths["jsonl"]), noop_scan):
+                count += 1
+            return count
+
+        measure("scheduler pass, summaries dropped", schedule)
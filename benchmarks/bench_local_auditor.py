@@ -0,0 +1,80 @@
+"""
+Old subprocess-per-check local audit vs. the in-process local backend, plus
+a parity check of the new local results against the remote engine run
+through the local SSH stand-in.
+
+    python benchmarks/bench_local_auditor.py --rounds 50
+"""
+import argparse
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog  # noqa: E402
+from common import Utils  # noqa: E402
+from local_backend import collect_local  # noqa: E402
+from ssh_standin import LocalSSHStandIn  # noqa: E402
+
+
+def legacy_audit(catalog):
+    """The pre-engine auditor.py: one stat or grep subprocess per check plus os-release."""
+    results = []
+    for rule in catalog.rules:
+        if rule.type == "file_permission":
+            out = subprocess.run(
+                ["stat", "-c", "%a", rule.file], capture_output=True, text=True
+            ).stdout.strip()
+            status = out in rule.expected
+        else:
+            proc = subprocess.run(
+                ["grep", rule.search_string, rule.file], capture_output=True, text=True
+            )
+            status = False
+            if proc.returncode == 0 and len(proc.stdout.split()) > 1:
+                status, _ = Utils.compare_value(
+                    proc.stdout.split()[1], rule.expected, rule.operator
+                )
+        results.append(status)
+    subprocess.run(["grep", "^NAME=", "/etc/os-release"], capture_output=True)
+    return results
+
+
+def engine_audit(catalog):
+    return Utils("localhost", None, None).evaluate_rules(catalog, collect_local(catalog))
+
+
+def measure(fn, catalog, rounds):
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(catalog)
+        timings.append(time.perf_counter() - start)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    child_cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    return statistics.median(timings), child_cpu / rounds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    for label, fn in (("subprocess", legacy_audit), ("in-process", engine_audit)):
+        median, child_cpu = measure(fn, catalog, args.rounds)
+        print(
+            f"{label:<11} median: {median * 1000:7.2f} ms  "
+            f"child CPU/run: {child_cpu * 1000:6.2f} ms"
+        )
+
+    client = LocalSSHStandIn(latency=0)
+    util = Utils("localhost", None, None)
+    util.client = client
+    remote, _, _ = util.run_checks_batched(client, catalog)
+    print("local == remote engine:", engine_audit(catalog) == remote)
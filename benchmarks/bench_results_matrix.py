@@ -0,0 +1,119 @@
+"""
+Fleet aggregation over per-host result dicts versus the columnar
+ResultMatrix: per-host scores, per-check failure rates and tag groups,
+timed and measured with tracemalloc.
+
+    python benchmarks/bench_results_matrix.py --hosts 10000 --checks 300
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import results_matrix  # noqa: E402
+from results_matrix import ResultMatrix, tally  # noqa: E402
+
+TAGS = ("ssh", "auth", "file", "kernel", "network")
+
+
+def fleet(hosts, checks, seed=1):
+    """Host summaries as the scanners return them, with a few hosts skipping checks."""
+    rng = random.Random(seed)
+    names = [f"check {i}" for i in range(checks)]
+    for host in range(hosts):
+        skip = rng.randrange(checks) if host % 10 == 0 else None
+        yield {
+            "hostname": f"10.{host // 65536}.{host // 256 % 256}.{host % 256}",
+            "results": [
+                {
+                    "name": name,
+                    "status": "FAIL" if rng.random() < 0.1 else "PASS",
+                    "actual_value": rng.choice(("yes", "no", 4, 90, None)),
+                    "expected": "no",
+                }
+                for i, name in enumerate(names)
+                if i != skip
+            ],
+        }
+
+
+def aggregate_dicts(summaries, tags):
+    scores = [tally(s["results"])[2] for s in summaries]
+    run, failed = {}, {}
+    for s in summaries:
+        for r in s["results"]:
+            run[r["name"]] = run.get(r["name"], 0) + 1
+            if r["status"] == "FAIL":
+                failed[r["name"]] = failed.get(r["name"], 0) + 1
+    rates = {name: failed.get(name, 0) / count for name, count in run.items()}
+    groups = {}
+    for name, count in run.items():
+        for tag in tags[name]:
+            group = groups.setdefault(tag, {"run": 0, "failed": 0})
+            group["run"] += count
+            group["failed"] += failed.get(name, 0)
+    return scores, rates, {tag: g["failed"] / g["run"] for tag, g in groups.items()}
+
+
+def aggregate_matrix(matrix):
+    return (
+        matrix.host_scores(),
+        matrix.check_failure_rates(),
+        {tag: g["failure_rate"] for tag, g in matrix.by_tag().items()},
+    )
+
+
+def measured(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=300)
+    args = parser.parse_args()
+
+    tags = {f"check {i}": (TAGS[i % len(TAGS)],) for i in range(args.checks)}
+    summaries, dict_bytes = measured(lambda: list(fleet(args.hosts, args.checks)))
+    matrix, matrix_bytes = measured(lambda: ResultMatrix.from_summaries(summaries))
+    matrix.tags = tags
+
+    expected, dict_seconds = timed(lambda: aggregate_dicts(summaries, tags))
+    backends = [("bytearray", None)]
+    if results_matrix.numpy is not None:
+        backends.append(("numpy", results_matrix.numpy))
+    print(f"{args.hosts} hosts x {args.checks} checks")
+    print(f"{'list of dicts':<20} aggregate: {dict_seconds * 1000:8.1f} ms  memory: {dict_bytes / 2**20:8.1f} MB")
+    for label, module in backends:
+        results_matrix.numpy = module
+        got, seconds = timed(lambda: aggregate_matrix(matrix))
+        same = (
+            all(abs(a - b) < 1e-9 for a, b in zip(got[0], expected[0]))
+            and all(abs(got[1][n] - expected[1][n]) < 1e-9 for n in expected[1])
+            and all(abs(got[2][t] - expected[2][t]) < 1e-9 for t in expected[2])
+        )
+        print(
+            f"{'matrix (' + label + ')':<20} aggregate: {seconds * 1000:8.1f} ms  "
+            f"memory: {matrix_bytes / 2**20:8.1f} MB  same results: {same}"
+        )
+    print(f"matrix cells: {matrix.nbytes() / 2**20:.1f} MB, distinct values: {len(matrix.values)}")
@@ -0,0 +1,139 @@
+"""
+Stratified sampling estimates against a synthetic fleet whose true
+per-check failure rates are known: hosts scanned to reach the target
+precision, worst estimate error, and how often the intervals cover the
+true rate across draws (should be close to the confidence level).
+
+    python benchmarks/bench_sampling.py --hosts 20000 --precision 0.05 --draws 50
+    python benchmarks/bench_sampling.py --live --live-hosts 90   # through the simulated SSH fleet
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sampling import run_sampled  # noqa: E402
+
+CHECKS = 30
+# (share of the fleet, base failure probability) per image: a few big golden images and a long tail
+IMAGES = [(0.45, 0.02), (0.30, 0.10), (0.15, 0.30), (0.07, 0.50), (0.03, 0.80)]
+
+
+def synthetic_fleet(hosts, seed=7):
+    rng = random.Random(seed)
+    machines, truth = [], [0] * CHECKS
+    outcomes = {}
+    for index in range(hosts):
+        image = rng.choices(range(len(IMAGES)), [share for share, _ in IMAGES])[0]
+        base = IMAGES[image][1]
+        failed = [rng.random() < min(1.0, base * (1 + (c % 5) / 4)) for c in range(CHECKS)]
+        hostname = f"10.{index // 65536}.{index // 256 % 256}.{index % 256}"
+        machines.append({"Hostname": hostname, "image": f"image-{image}"})
+        outcomes[hostname] = failed
+        for c, fail in enumerate(failed):
+            truth[c] += fail
+    return machines, outcomes, [count / hosts for count in truth]
+
+
+def synthetic_sweep(outcomes):
+    def sweep(machines):
+        return [
+            {
+                "hostname": m["Hostname"],
+                "results": [
+                    {"name": f"check {c}", "status": "FAIL" if fail else "PASS", "actual_value": None}
+                    for c, fail in enumerate(outcomes[m["Hostname"]])
+                ],
+            }
+            for m in machines
+        ]
+
+    return sweep
+
+
+def offline(args):
+    machines, outcomes, truth = synthetic_fleet(args.hosts)
+    sweep = synthetic_sweep(outcomes)
+    covered = checked = 0
+    scanned, worst, widest = [], 0.0, 0.0
+    start = time.perf_counter()
+    for draw in range(args.draws):
+        report, summaries = run_sampled(
+            sweep, machines, args.sample, "image", args.precision, args.confidence, seed=draw
+        )
+        scanned.append(len(summaries))
+        for c in range(CHECKS):
+            e = report["checks"][f"check {c}"]
+            covered += e["low"] <= truth[c] <= e["high"]
+            checked += 1
+            worst = max(worst, abs(e["rate"] - truth[c]))
+            widest = max(widest, (e["high"] - e["low"]) / 2)
+    elapsed = (time.perf_counter() - start) / args.draws
+    print(f"{args.hosts} hosts, {len(IMAGES)} image strata, {CHECKS} checks, {args.draws} draws")
+    print(
+        f"hosts scanned: mean {sum(scanned) / len(scanned):.0f} ({sum(scanned) / len(scanned) / args.hosts:.1%} of the fleet), "
+        f"max {max(scanned)}"
+    )
+    print(f"worst |estimate - truth|: {worst:.3f}   widest half-width: {widest:.3f}   (target {args.precision})")
+    print(f"interval coverage: {covered / checked:.1%} (nominal {args.confidence:.0%})")
+    print(f"estimation overhead per draw: {elapsed * 1000:.1f} ms")
+
+
+def live(args):
+    import parallel_remote_scanner
+    from ssh_fleet import SimulatedFleet
+
+    logging.disable(logging.CRITICAL)
+    fleet = SimulatedFleet(args.live_hosts, args.port, args.latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            previous = os.getcwd()
+            os.chdir(folder)
+            parallel_remote_scanner.report_folder = folder
+            try:
+                scan_args = parallel_remote_scanner.build_parser().parse_args(["--workers", "16"])
+                context = parallel_remote_scanner.ScanContext(scan_args)
+                start = time.perf_counter()
+                full = context.sweep(fleet.machines())
+                full_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                report, summaries = run_sampled(
+                    context.sweep, fleet.machines(), 3, "image", args.precision, args.confidence, seed=1
+                )
+                sample_seconds = time.perf_counter() - start
+                context.close()
+            finally:
+                os.chdir(previous)
+    finally:
+        fleet.stop()
+    hosts = [s for s in full if s.get("results")]
+    worst = 0.0
+    for check, e in report["checks"].items():
+        truth = sum(
+            1 for s in hosts for r in s["results"] if r["name"] == check and r["status"] == "FAIL"
+        ) / max(1, sum(1 for s in hosts for r in s["results"] if r["name"] == check))
+        worst = max(worst, abs(e["rate"] - truth))
+    print(f"full sweep: {len(full)} hosts in {full_seconds:.1f}s")
+    print(f"sample:     {len(summaries)} hosts in {sample_seconds:.1f}s, worst error vs full sweep {worst:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=20000)
+    parser.add_argument("--sample", type=int, default=10, help="first-round hosts per stratum")
+    parser.add_argument("--precision", type=float, default=0.05)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--draws", type=int, default=50)
+    parser.add_argument("--live", action="store_true", help="also sample the simulated SSH fleet")
+    parser.add_argument("--live-hosts", type=int, default=90)
+    parser.add_argument("--port", type=int, default=2250)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    offline(args)
+    if args.live:
+        live(args)
@@ -0,0 +1,110 @@
+"""
+Scan simulated hosts with 1 process and with N shard processes.
+
+The hosts are asyncssh servers on their own 127.x.y.z loopback addresses,
+served from a separate process so the scanning side is measured alone.
+
+    python benchmarks/bench_sharded_scan.py --hosts 120 --processes 1 2 4
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel_remote_scanner  # noqa: E402
+from bench_async_scanner import _AcceptAll, _handler, simulated_addresses  # noqa: E402
+from parallel_remote_scanner import ScanContext, ShardedScan, build_parser  # noqa: E402
+from sharding import partition  # noqa: E402
+
+
+def serve(addresses, port, latency, ready):
+    import asyncssh
+
+    logging.disable(logging.CRITICAL)
+
+    async def main():
+        host_key = asyncssh.generate_private_key("ssh-ed25519")
+        for address in addresses:
+            await asyncssh.create_server(
+                _AcceptAll,
+                address,
+                port,
+                server_host_keys=[host_key],
+                process_factory=_handler(latency),
+            )
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+@contextlib.contextmanager
+def quiet_stdout():
+    # the scanners print per-host progress, forked shard processes included
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=120)
+    parser.add_argument("--port", type=int, default=2224)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    addresses = list(simulated_addresses(args.hosts))
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve, args=(addresses, args.port, args.latency, ready), daemon=True
+    )
+    server.start()
+    ready.wait()
+
+    machines = [
+        {"Hostname": a, "port": args.port, "username": "bench", "password": "x"}
+        for a in addresses
+    ]
+    for strategy in ("hash", "subnet"):
+        sizes = [len(s) for s in partition(machines, 4, strategy)]
+        print(f"{strategy:<7} split into 4: {sizes}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        parallel_remote_scanner.report_folder = folder
+        os.chdir(folder)  # keeps .state/ out of the repository
+        for processes in args.processes:
+            scan_args = build_parser().parse_args(
+                ["--workers", str(args.workers), "--processes", str(processes), "--no-pool"]
+            )
+            scanner = ShardedScan(scan_args, processes) if processes > 1 else ScanContext(scan_args)
+            try:
+                with quiet_stdout():
+                    start = time.perf_counter()
+                    results = scanner.sweep(machines)
+                    elapsed = time.perf_counter() - start
+            finally:
+                scanner.close()
+            ok = sum(1 for r in results if r.get("status") == "ok")
+            print(
+                f"processes: {processes}  hosts: {len(results)}  ok: {ok}  "
+                f"elapsed: {elapsed:.2f}s  throughput: {len(results) / elapsed:.1f} hosts/s"
+            )
+    server.terminate()
@@ -0,0 +1,77 @@
+"""
+Cold-start regression check for the local audit, measured with
+python -X importtime: fails (exit 1) when the local path imports a module
+it should only load on demand, or when its imports exceed the budget.
+
+    python benchmarks/bench_startup.py --budget-ms 150
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# only remote scans, HTML reports and optional exports need these
+DEFERRED = ("paramiko", "asyncssh", "dotenv", "webbrowser", "yaml", "numpy", "pyarrow", "zstandard", "templates")
+
+
+def import_profile(statement):
+    """(total import microseconds, {module: cumulative microseconds}) of one cold interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules, total = {}, 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+        if not name.startswith("  "):  # top level: cumulative already covers the nested imports
+            total += int(cumulative)
+    return total, modules
+
+
+def local_run_seconds():
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "auditor.py"), "local", "--no-report"],
+            cwd=folder,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=150, help="import budget of the local audit path")
+    parser.add_argument("--repeat", type=int, default=5, help="best of this many cold starts")
+    args = parser.parse_args()
+
+    profiles = [import_profile("import auditor") for _ in range(args.repeat)]
+    total, modules = min(profiles, key=lambda profile: profile[0])
+    baseline = min(import_profile("pass")[0] for _ in range(args.repeat))
+    heaviest = sorted(modules.items(), key=lambda item: -item[1])[:8]
+    print(f"import auditor: {total / 1000:7.1f} ms (bare interpreter {baseline / 1000:.1f} ms)")
+    for name, micros in heaviest:
+        print(f"  {name:<30} {micros / 1000:7.1f} ms")
+    print(f"auditor.py local --no-report: {min(local_run_seconds() for _ in range(3)) * 1000:.0f} ms wall")
+
+    failures = [
+        f"{name} imported on the local path"
+        for name in sorted(modules)
+        if name.split(".")[0] in DEFERRED
+    ]
+    if total > args.budget_ms * 1000:
+        failures.append(f"imports took {total / 1000:.1f} ms, budget {args.budget_ms:.0f} ms")
+    for line in failures:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if failures else 0)
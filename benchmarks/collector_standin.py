@@ -0,0 +1,101 @@
+"""
+Local stand-in for the collector the agent pushes to: accepts JSON Lines on
+a Unix socket and JSON POSTs over HTTP, and keeps every record with its
+arrival time.
+
+    python benchmarks/collector_standin.py --unix /tmp/sca.sock --http 127.0.0.1:8765
+"""
+import argparse
+import http.server
+import json
+import os
+import socketserver
+import threading
+import time
+
+
+class CollectorStandIn:
+    def __init__(self, unix_path=None, http_address=None):
+        self.unix_path = unix_path
+        self.http_address = http_address
+        self.records = []  # (arrival time.time(), record)
+        self._cond = threading.Condition()
+        self._servers = []
+
+    def _received(self, record):
+        with self._cond:
+            self.records.append((time.time(), record))
+            self._cond.notify_all()
+
+    def start(self):
+        collector = self
+
+        class LineHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        collector._received(json.loads(line))
+
+        class PostHandler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                collector._received(json.loads(body))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            self._servers.append(socketserver.ThreadingUnixStreamServer(self.unix_path, LineHandler))
+        if self.http_address:
+            host, port = self.http_address
+            self._servers.append(http.server.ThreadingHTTPServer((host, port), PostHandler))
+        for server in self._servers:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self
+
+    def wait_for(self, predicate, timeout=10, start=0):
+        """The first (arrival, record) from index start on matching predicate, None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            seen = start
+            while True:
+                for arrival, record in self.records[seen:]:
+                    if predicate(record):
+                        return arrival, record
+                seen = len(self.records)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    return None
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="print what an agent pushes")
+    parser.add_argument("--unix", metavar="PATH")
+    parser.add_argument("--http", metavar="HOST:PORT")
+    args = parser.parse_args()
+    address = None
+    if args.http:
+        host, _, port = args.http.rpartition(":")
+        address = (host or "127.0.0.1", int(port))
+    collector = CollectorStandIn(args.unix, address).start()
+    try:
+        seen = 0
+        while True:
+            if collector.wait_for(lambda record: True, timeout=3600, start=seen) is not None:
+                for _, record in collector.records[seen:]:
+                    print(json.dumps(record), flush=True)
+                seen = len(collector.records)
+    except KeyboardInterrupt:
+        collector.stop()
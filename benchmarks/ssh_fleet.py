@@ -0,0 +1,275 @@
+"""
+Simulated SSH fleet for the benchmarks: every host is a paramiko
+ServerInterface listening on its own 127.x.y.z loopback address, with its
+own synthetic /etc tree.
+
+Commands run through the local /bin/sh after the configured latency plus
+a random jitter, with /etc/ paths redirected into the host's tree and
+mapped back in the output. A connection fails (is closed before the SSH
+banner) with probability failure_rate, and waits connect_latency seconds
+before the handshake otherwise. Hosts only accept the password "bench".
+
+A host started with forwarding=True also acts as a bastion: it accepts
+direct-tcpip channels and pipes each one to the requested address, which
+is usually another simulated host. It accepts any password.
+
+    fleet = SimulatedFleet(hosts=200, latency=0.05, jitter=0.02, failure_rate=0.01)
+    fleet.start()
+    machines = fleet.machines()
+"""
+import os
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+
+import paramiko
+
+# a few "golden images": most of a real fleet shares byte-identical configs
+IMAGES = (
+    {"MaxAuthTries": 4, "PermitRootLogin": "no", "PASS_MAX_DAYS": 90, "PASS_MIN_LEN": 14, "shadow": 0o640},
+    {"MaxAuthTries": 6, "PermitRootLogin": "yes", "PASS_MAX_DAYS": 99999, "PASS_MIN_LEN": 8, "shadow": 0o644},
+    {"MaxAuthTries": 3, "PermitRootLogin": "prohibit-password", "PASS_MAX_DAYS": 60, "PASS_MIN_LEN": 12, "shadow": 0o600},
+)
+
+
+def simulated_addresses(count):
+    # 50 hosts per /24 so per-subnet limits and subnet sharding see a spread
+    for i in range(count):
+        yield f"127.0.{1 + i // 50}.{1 + i % 50}"
+
+
+def write_etc(root, image, index):
+    """A minimal /etc below root with the files the default catalog reads."""
+    def write(path, content, mode=0o644):
+        full = os.path.join(root, "etc", path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(content)
+        os.chmod(full, mode)
+
+    padding = "".join(f"# {line}\n" for line in range(80))
+    write(
+        "ssh/sshd_config",
+        f"{padding}Port 22\nMaxAuthTries {image['MaxAuthTries']}\n"
+        f"PermitRootLogin {image['PermitRootLogin']}\nPermitEmptyPasswords no\n"
+        "Match User backup\n    PermitRootLogin yes\n",
+    )
+    write(
+        "login.defs",
+        f"{padding}PASS_MAX_DAYS\t{image['PASS_MAX_DAYS']}\nPASS_MIN_DAYS\t1\n"
+        f"PASS_WARN_AGE\t7\nPASS_MIN_LEN\t{image['PASS_MIN_LEN']}\n",
+    )
+    write("shadow", "root:*:19000:0:99999:7:::\n", image["shadow"])
+    write("passwd", "root:x:0:0:root:/root:/bin/sh\n")
+    write("group", "root:x:0:\n")
+    write("os-release", 'ID=ubuntu\nID_LIKE=debian\nVERSION_ID="22.04"\nPRETTY_NAME="Ubuntu 22.04"\n')
+    write("ssh/ssh_host_ed25519_key", "key\n", 0o600)
+    write("ssh/ssh_host_rsa_key", "key\n", 0o600)
+    for name in ("cron.d/backup", "cron.daily/logrotate"):
+        write(name, f"# job {index}\n", 0o644)
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, host):
+        self.host = host
+        self.destinations = {}
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_auth_password(self, username, password):
+        if self.host.forwarding or password == "bench":
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        if not self.host.forwarding:
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+        self.destinations[chanid] = destination
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=self.host.execute, args=(channel, command), daemon=True).start()
+        return True
+
+
+class SimulatedHost:
+    def __init__(
+        self, address, port, root, host_key, latency, jitter, failure_rate, seed, connect_latency=0.0, forwarding=False
+    ):
+        self.address = address
+        self.port = port
+        self.root = root
+        self.host_key = host_key
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.connect_latency = connect_latency
+        self.forwarding = forwarding
+        self.connections = 0
+        self.failures = 0
+        self.commands = 0
+        self.tunnels = 0
+        self.open_tunnels = 0
+        self.peak_tunnels = 0
+        self._tunnel_lock = threading.Lock()
+        self._sock = None
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.address, self.port))
+        self._sock.listen(64)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            if self.random.random() < self.failure_rate:
+                self.failures += 1
+                conn.close()
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        time.sleep(self.connect_latency)
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self.host_key)
+        server = _Server(self)
+        try:
+            transport.start_server(server=server)
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        # exec channels are served from the request callback, accept() only hands out tunnels
+        while self.forwarding and transport.is_active():
+            channel = transport.accept(1)
+            if channel is not None and channel.get_id() in server.destinations:
+                destination = server.destinations.pop(channel.get_id())
+                threading.Thread(target=self._forward, args=(channel, destination), daemon=True).start()
+
+    def _forward(self, channel, destination):
+        try:
+            upstream = socket.create_connection(destination, 10)
+        except OSError:
+            channel.close()
+            return
+        upstream.settimeout(None)
+        with self._tunnel_lock:
+            self.tunnels += 1
+            self.open_tunnels += 1
+            self.peak_tunnels = max(self.peak_tunnels, self.open_tunnels)
+
+        def pump(read, write):
+            try:
+                while True:
+                    data = read(32768)
+                    if not data:
+                        break
+                    write(data)
+            except (OSError, EOFError):
+                pass
+            finally:
+                # shutdown, not just close, so the other pump's blocking recv returns
+                try:
+                    channel.close()  # raises once the client dropped the bastion connection
+                except (OSError, EOFError):
+                    pass
+                try:
+                    upstream.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        reverse = threading.Thread(target=pump, args=(upstream.recv, channel.sendall), daemon=True)
+        reverse.start()
+        pump(channel.recv, upstream.sendall)
+        reverse.join()
+        upstream.close()
+        with self._tunnel_lock:
+            self.open_tunnels -= 1
+
+    def execute(self, channel, command):
+        self.commands += 1
+        if isinstance(command, bytes):
+            command = command.decode(errors="ignore")
+        time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        local_etc = f"{self.root}/etc/"
+        proc = subprocess.run(
+            ["/bin/sh", "-c", command.replace("/etc/", local_etc)], capture_output=True
+        )
+        try:
+            channel.sendall(proc.stdout.replace(local_etc.encode(), b"/etc/"))
+            channel.sendall_stderr(proc.stderr.replace(local_etc.encode(), b"/etc/"))
+            channel.send_exit_status(proc.returncode)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            channel.close()
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+
+
+class SimulatedFleet:
+    def __init__(
+        self, hosts=100, port=2230, latency=0.05, jitter=0.0, failure_rate=0.0, seed=1, directory=None, connect_latency=0.0
+    ):
+        self.port = port
+        self._tmp = None if directory else tempfile.TemporaryDirectory(prefix="sca-fleet-")
+        directory = directory or self._tmp.name
+        host_key = paramiko.RSAKey.generate(2048)
+        self.hosts = []
+        for index, address in enumerate(simulated_addresses(hosts)):
+            root = os.path.join(directory, address)
+            write_etc(root, IMAGES[index % len(IMAGES)], index)
+            self.hosts.append(
+                SimulatedHost(
+                    address, port, root, host_key, latency, jitter, failure_rate, seed + index, connect_latency
+                )
+            )
+        self.host_key = host_key
+
+    def start(self):
+        for host in self.hosts:
+            host.start()
+        return self
+
+    def machines(self):
+        return [
+            {
+                "Hostname": host.address,
+                "port": self.port,
+                "username": "bench",
+                "password": "bench",
+                "image": f"image-{index % len(IMAGES)}",
+            }
+            for index, host in enumerate(self.hosts)
+        ]
+
+    def stop(self):
+        for host in self.hosts:
+            host.stop()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+def serve_fleet(options, ready, stop):
+    """multiprocessing target: run a fleet until stop is set, so the scanner side is measured alone."""
+    fleet = SimulatedFleet(**options).start()
+    ready.set()
+    stop.wait()
+    fleet.stop()
@@ -0,0 +1,269 @@
+import fnmatch
+import functools
+import hashlib
+import json
+import pathlib
+import re
+
+DEFAULT_CATALOG = pathlib.Path(__file__).resolve().parent / "checks" / "cis_default.json"
+
+RULE_FIELDS = {
+    "file_permission": ("name", "file"),
+    "config_value": ("name", "file", "search_string", "expected", "operator"),
+}
+OPERATORS = ("min", "max", "equal")
+# file_permission checks that need more than one stat of one fixed path
+GLOB_CHARS = frozenset("*?[")
+TREE_FIELDS = ("recursive", "max_mode", "forbid_mode", "owner", "group")
+
+
+class CatalogError(ValueError):
+    pass
+
+
+class Rule:
+    """One compiled check. Built once at load time, shared by every host."""
+
+    __slots__ = (
+        "id",
+        "name",
+        "type",
+        "file",
+        "key",
+        "search_string",
+        "expected",
+        "allowed",
+        "operator",
+        "severity",
+        "tags",
+        "when",
+        "recursive",
+        "max_mode",
+        "forbid_mode",
+        "owner",
+        "group",
+        "tree",
+        "pattern",
+    )
+
+    def __init__(self, check):
+        self.id = str(check.get("id", check["name"]))
+        self.name = check["name"]
+        self.type = check["type"]
+        self.file = check["file"]
+        self.search_string = check.get("search_string")
+        # ConfigIndex lookups use the bare key, "^PASS_MAX_DAYS" -> "PASS_MAX_DAYS"
+        self.key = self.search_string.lstrip("^") if self.search_string else None
+        self.expected = check.get("expected")
+        self.allowed = (
+            frozenset(self.expected)
+            if self.type == "file_permission" and self.expected is not None
+            else None
+        )
+        # glob / recursive / mask / ownership variant of file_permission,
+        # collected with one streamed find per host (see filetree.py)
+        self.recursive = bool(check.get("recursive", False))
+        self.max_mode = int(check["max_mode"], 8) if "max_mode" in check else None
+        self.forbid_mode = int(check["forbid_mode"], 8) if "forbid_mode" in check else None
+        self.owner = check.get("owner")
+        self.group = check.get("group")
+        self.tree = self.type == "file_permission" and (
+            not GLOB_CHARS.isdisjoint(self.file)
+            or any(check.get(field) for field in TREE_FIELDS)
+        )
+        # compiled once: which paths a glob rule covers (agent.affected_rules), None for a fixed path
+        self.pattern = (
+            re.compile(fnmatch.translate(self.file))
+            if not GLOB_CHARS.isdisjoint(self.file)
+            else None
+        )
+        if self.expected is None:
+            # what the report shows for mask / ownership only rules
+            self.expected = ", ".join(
+                text
+                for text, present in (
+                    (f"mode <= {check.get('max_mode')}", "max_mode" in check),
+                    (f"no {check.get('forbid_mode')} bits", "forbid_mode" in check),
+                    (f"owner {self.owner}", self.owner),
+                    (f"group {self.group}", self.group),
+                )
+                if present
+            )
+        self.operator = check.get("operator")
+        self.severity = check.get("severity", "MEDIUM")
+        self.tags = tuple(check.get("tags", ()))
+        # {"os_id": ["ubuntu", "debian"]} -> (("os_id", frozenset(...)),)
+        self.when = tuple(
+            (fact, frozenset([values] if isinstance(values, str) else values))
+            for fact, values in sorted(check.get("when", {}).items())
+        )
+
+    def applies(self, facts):
+        """
+        True when every `when` condition matches the host facts. A fact holding
+        several words (os_like "rhel fedora") matches on any of them. Unknown
+        facts never skip a rule.
+        """
+        if not self.when or not facts:
+            return True
+        for fact, allowed in self.when:
+            value = facts.get(fact)
+            if value and value not in allowed and allowed.isdisjoint(value.split()):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"Rule({self.id!r}, {self.name!r})"
+
+
+class CheckCatalog:
+    """
+    Compiled rule set, pre-grouped so a scan never has to walk the raw list:
+    by_type[type] and by_file[path] hold rules, config_files / permission_files
+    the distinct targets the batched script has to read or stat.
+    Glob / recursive permission rules are kept apart in tree_rules, with
+    tree_specs the distinct (pattern, recursive) roots the find stream walks.
+    """
+
+    def __init__(self, rules, profile="", digest=""):
+        self.rules = tuple(rules)
+        self.profile = profile
+        self.digest = digest
+        self.by_type = {}
+        self.by_file = {}
+        for rule in self.rules:
+            self.by_type.setdefault(rule.type, []).append(rule)
+            if not rule.tree:
+                self.by_file.setdefault(rule.file, []).append(rule)
+        self.tree_rules = tuple(rule for rule in self.rules if rule.tree)
+        self.tree_specs = tuple(
+            dict.fromkeys((rule.file, rule.recursive) for rule in self.tree_rules)
+        )
+        self.config_files = tuple(
+            dict.fromkeys(rule.file for rule in self.by_type.get("config_value", ()))
+        )
+        self.permission_files = tuple(
+            dict.fromkeys(
+                rule.file
+                for rule in self.by_type.get("file_permission", ())
+                if not rule.tree
+            )
+        )
+        self._subsets = {}
+
+    def for_facts(self, facts):
+        """
+        The catalog restricted to the rules that apply to a host with these
+        facts, so skipped rules add no commands. Memoised per distinct rule
+        set, most fleets only have a handful.
+        """
+        if not facts or not any(rule.when for rule in self.rules):
+            return self
+        rules = tuple(rule for rule in self.rules if rule.applies(facts))
+        if len(rules) == len(self.rules):
+            return self
+        key = tuple(rule.id for rule in rules)
+        subset = self._subsets.get(key)
+        if subset is None:
+            subset = self._subsets[key] = CheckCatalog(rules, self.profile, self.digest)
+        return subset
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+
+def validate_check(check, position):
+    """The check, validated, as a normalised copy; the caller's dict is left as is."""
+    if not isinstance(check, dict):
+        raise CatalogError(f"check #{position}: must be a mapping, not {type(check).__name__}")
+    check = dict(check)
+    ident = f"{check['id']}: " if "id" in check else ""
+    label = f"check #{position} ({ident}{check.get('name', '?')})"
+    check_type = check.get("type")
+    if check_type not in RULE_FIELDS:
+        raise CatalogError(f"{label}: unknown type {check_type!r}")
+    missing = [field for field in RULE_FIELDS[check_type] if field not in check]
+    if missing:
+        raise CatalogError(f"{label}: missing {', '.join(missing)}")
+    for field in ("name", "file", "search_string"):
+        if field in check and not (isinstance(check[field], str) and check[field]):
+            raise CatalogError(f"{label}: {field} must be a non-empty string")
+    tags = check.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise CatalogError(f"{label}: tags must be a list of strings")
+    when = check.get("when", {})
+    if not isinstance(when, dict) or not all(
+        isinstance(v, str) or (isinstance(v, list) and all(isinstance(i, str) for i in v))
+        for v in when.values()
+    ):
+        raise CatalogError(f"{label}: when must map fact names to a string or list of strings")
+    if check_type == "file_permission":
+        if "expected" not in check and not any(f in check for f in TREE_FIELDS[1:]):
+            raise CatalogError(
+                f"{label}: needs expected, max_mode, forbid_mode, owner or group"
+            )
+        expected = check.get("expected", [])
+        if isinstance(expected, str):
+            check["expected"] = [expected]
+        elif not isinstance(expected, list) or not all(isinstance(mode, str) for mode in expected):
+            raise CatalogError(f"{label}: expected modes must be strings like '644'")
+        for field in ("max_mode", "forbid_mode"):
+            mode = check.get(field)
+            if mode is not None and not (
+                isinstance(mode, str) and mode and set(mode) <= set("01234567")
+            ):
+                raise CatalogError(f"{label}: {field} must be an octal string like '600'")
+    else:
+        if check["operator"] not in OPERATORS:
+            raise CatalogError(f"{label}: operator must be one of {OPERATORS}")
+        if check["operator"] in ("min", "max") and not isinstance(
+            check["expected"], int
+        ):
+            raise CatalogError(f"{label}: {check['operator']} needs an integer expected")
+        if not isinstance(check["expected"], (str, int)) or isinstance(check["expected"], bool):
+            raise CatalogError(f"{label}: expected must be a string or an integer")
+    return check
+
+
+def parse_catalog(raw, path):
+    if str(path).endswith((".yaml", ".yml")):
+        try:
+            import yaml  # only YAML catalogs pay for it, JSON always works
+        except ImportError:
+            raise CatalogError(f"{path}: PyYAML is required for YAML catalogs") from None
+        document = yaml.safe_load(raw)
+    else:
+        document = json.loads(raw)
+    if isinstance(document, list):
+        document = {"checks": document}
+    return document
+
+
+def compile_catalog(document, digest=""):
+    if not isinstance(document, dict):
+        raise CatalogError("catalog must be a list of checks or a mapping with a checks list")
+    checks = document.get("checks") or []
+    if not isinstance(checks, list):
+        raise CatalogError("checks must be a list")
+    seen = set()
+    rules = []
+    for position, check in enumerate(checks, 1):
+        rule = Rule(validate_check(check, position))
+        if rule.id in seen:
+            raise CatalogError(f"check #{position}: duplicate id {rule.id!r}")
+        seen.add(rule.id)
+        rules.append(rule)
+    return CheckCatalog(rules, document.get("profile", ""), digest)
+
+
+@functools.lru_cache(maxsize=8)
+def load_catalog(path=DEFAULT_CATALOG):
+    """
+    Load, validate and compile a JSON/YAML check catalog, once per process.
+    digest is the catalog's sha256, incremental state is tied to it.
+    """
+    raw = pathlib.Path(path).read_bytes()
+    return compile_catalog(parse_catalog(raw, path), hashlib.sha256(raw).hexdigest())
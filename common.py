@@ -1,68 +1,378 @@
+import contextlib
+import functools
 import os
 import shutil
 import datetime
-import json
-import pathlib
+import re
 import shlex
 import socket
-import paramiko, sys
+import uuid
+import sys
+
+from catalog import load_catalog
+from config_index import is_sshd_config, parse_config
+from bastion import parse_jump
+from evalcache import fetch_command
+from facts import FACTS_COMMAND, parse_facts
+from filetree import TreeScan
+from incremental import run_checks_incremental
+from instrumentation import NO_TIMINGS
+from probe import PROBE_MISSING, build_probe, parse_probe
+from sinks import PerHostJsonSink
+
+CONNECT_TIMEOUT = 10
+COMMAND_TIMEOUT = 30
+
+
+class CommandTimeout(TimeoutError):
+    """A remote command (or the whole host scan) ran past its deadline."""
+
+
+def build_batch_script(commands, marker):
+    """
+    Wrap each command so its stdout, stderr and exit code come back as one
+    delimited block. stderr is captured separately via the fd 3 swap so the
+    per-command (exit, out, err) triple matches what execute_command returns.
+    """
+    parts = []
+    for i, cmd in enumerate(commands):
+        parts.append(
+            f"echo '{marker} out {i}'\n"
+            f"{{ __sca_err=$( {{ {cmd}\n}} 2>&1 1>&3 3>&- ); __sca_rc=$?; }} 3>&1\n"
+            "echo\n"
+            f"echo '{marker} err {i}'\n"
+            "printf '%s\\n' \"$__sca_err\"\n"
+            f"echo \"{marker} end {i} $__sca_rc\"\n"
+        )
+    return "".join(parts)
+
+
+def parse_batch_output(output, marker, count):
+    """Split the output of a build_batch_script() run back into (exit, out, err) triples."""
+    block = re.compile(
+        rf"^{marker} out (\d+)\n(.*?)^{marker} err \1\n(.*?)^{marker} end \1 (\d+)$",
+        re.S | re.M,
+    )
+    found = {}
+    for match in block.finditer(output):
+        found[int(match.group(1))] = (
+            int(match.group(4)),
+            match.group(2).strip(),
+            match.group(3).strip(),
+        )
+    missing = (255, "", "no output returned by batched script")
+    return [found.get(i, missing) for i in range(count)]
+
+
+class ScanData:
+    """
+    Everything the rules of one host are evaluated against, however it was
+    collected (batched SSH script or local os.stat / file reads):
+    modes     path -> (exit, mode, err) as returned by stat -c '%a'
+    indexes   path -> ConfigIndex (None when the file could not be read),
+              or None altogether when config keys were read with awk
+    outputs   command -> (exit, out, err) of the remote script
+    trees     rule id -> (status, value) of glob / recursive permission rules
+    digests   path -> sha256 of the config file content, when it was hashed
+    """
+
+    __slots__ = ("modes", "indexes", "outputs", "trees", "digests")
+
+    def __init__(self, modes, indexes=None, outputs=None, trees=None, digests=None):
+        self.modes = modes
+        self.indexes = indexes
+        self.outputs = outputs or {}
+        self.trees = trees or {}
+        self.digests = digests or {}
 
 
 class Utils:
 
-    def __init__(self, hostname, username, password):
+    def __init__(
+        self,
+        hostname,
+        username,
+        password,
+        port=22,
+        pool=None,
+        timings=None,
+        deadline=None,
+        facts_cache=None,
+        eval_cache=None,
+        bastions=None,
+        jump=None,
+    ):
         self.hostname = hostname
         self.username = username
         self.password = password
+        self.port = port
+        self.pool = pool
+        # instrumentation.ScanTimings shared by the run, or a no-op recorder
+        self.timings = timings or NO_TIMINGS
+        # scheduler.HostDeadline capping connect/command time, None for the defaults
+        self.deadline = deadline
         self.client = None
+        self.last_error = None
+        # facts.FactsCache shared by the run; self.facts holds this host's facts once known
+        self.facts_cache = facts_cache
+        self.facts = None
+        # evalcache.EvalCache shared by the run's workers, and this host's
+        # snapshot of the config indexes it offered the remote side as known
+        self.eval_cache = eval_cache
+        self._known = {}
+        # jump host as a bastion.parse_jump() tuple, reached through the run's
+        # shared bastion.BastionPool (or one of our own, closed with the client)
+        self.jump = parse_jump(jump, username, password) if jump else None
+        self.bastions = bastions
+        self._own_bastions = None
+
+    @property
+    def host_key(self):
+        return f"{self.hostname}:{self.port}"
+
+    def store_facts(self, facts):
+        self.facts = facts
+        if self.facts_cache is not None:
+            self.facts_cache.put(self.host_key, facts)
+
+    def load_cached_facts(self):
+        """Fresh facts from the cache, None when there are none (or no cache)."""
+        if self.facts is None and self.facts_cache is not None:
+            self.facts = self.facts_cache.get(self.host_key)
+        return self.facts
+
+    def ensure_facts(self, client):
+        """
+        OS release, kernel, IPs, user, sshd version and package manager of the
+        host: from the cache when fresh, else one FACTS_COMMAND round trip.
+        """
+        if self.load_cached_facts() is None:
+            _, out, _ = self.execute_command(client, FACTS_COMMAND)
+            self.store_facts(parse_facts(out))
+        return self.facts
+
+    def _time_limit(self, default):
+        """default seconds, or less when the host deadline is closer."""
+        if self.deadline is None:
+            return default
+        return self.deadline.limit(default)
+
+    def open_socket(self, timeout):
+        """TCP socket to the host, or a direct-tcpip tunnel through its jump host."""
+        if self.jump is None:
+            return socket.create_connection((self.hostname, self.port), timeout)
+        if self.bastions is None:
+            from bastion import BastionPool
+
+            self.bastions = self._own_bastions = BastionPool()
+        return self.bastions.open(self.jump, self.hostname, self.port, timeout)
 
     def create_ssh_connection(self):
+        import paramiko  # deferred so local audits never load the SSH stack
+
+        self.last_error = None
+        sock = None
         try:
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.client.connect(self.hostname, 22, self.username, self.password)
+            connect_timeout = self._time_limit(
+                self.deadline.connect_timeout if self.deadline else CONNECT_TIMEOUT
+            )
+            if self.pool is not None:
+                # pooled transports are already authenticated, skip the whoami probe on reuse
+                with self.timings.phase(self.hostname, "connect"):
+                    self.client, reused = self.pool.get(
+                        self.hostname,
+                        self.username,
+                        self.password,
+                        self.port,
+                        connect_timeout,
+                        self.open_socket if self.jump else None,
+                    )
+                if self.deadline is not None:
+                    self.deadline.attach(self.client)
+                if reused:
+                    return self.client
+            else:
+                # open the socket ourselves so connect and kex+auth are timed apart
+                with self.timings.phase(self.hostname, "connect"):
+                    sock = self.open_socket(connect_timeout)
+                with self.timings.phase(self.hostname, "auth"):
+                    self.client = paramiko.SSHClient()
+                    self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                    if self.deadline is not None:
+                        self.deadline.attach(self.client)
+                    self.client.connect(
+                        self.hostname,
+                        self.port,
+                        self.username,
+                        self.password,
+                        sock=sock,
+                        timeout=connect_timeout,
+                        banner_timeout=connect_timeout,
+                        auth_timeout=connect_timeout,
+                    )
 
             print(f"Connecting to {self.hostname}...")
 
-            stdin, stdout, stderr = self.client.exec_command("whoami")
-            output = stdout.read().decode().strip()
-            print(f"Command Output: {output}")
+            # the facts command doubles as the post-login probe (and is skipped when cached)
+            facts = self.ensure_facts(self.client)
+            print(f"Command Output: {facts.get('user', '')}")
             print(
                 f"\n========= ✅SSH Connection Successful {self.hostname} =============\n"
             )
             return self.client
 
-        except (paramiko.SSHException, socket.error, OSError) as exc:
+        except (paramiko.SSHException, socket.error, OSError, EOFError) as exc:
             print(f"SSH connect failed for {self.hostname}: {exc}")
+            # kept so a scheduler can tell timeouts and transient errors from bad credentials
+            self.last_error = exc
+            # close what the failed attempt opened, a bastion tunnel would keep its slot until LoginGraceTime
+            if self.client is not None:
+                if self.pool is not None:
+                    self.pool.discard(self.hostname, self.username, self.port)
+                else:
+                    self.client.close()
+                self.client = None
+            if sock is not None:
+                sock.close()
+            self._close_own_bastions()
             return None
 
-    def execute_command(self, client: str, command: str, timeout: int = 10):
-        stdin, stdout, stderr = self.client.exec_command(command)
-        exit_status = stdout.channel.recv_exit_status()  # blocks until command finishes
-        out = stdout.read().decode(errors="ignore").strip()
-        err = stderr.read().decode(errors="ignore").strip()
+    def _close_own_bastions(self):
+        if self._own_bastions is not None:
+            self._own_bastions.close()
+            self.bastions = self._own_bastions = None
+
+    def close_ssh_connection(self):
+        """Close the connection, or hand it back to the pool when one is used."""
+        if self.client is None:
+            return
+        if self.pool is None:
+            self.client.close()
+            self._close_own_bastions()
+        else:
+            transport = self.client.get_transport()
+            # an idle tunnel would hold one of the bastion's channel slots
+            # between sweeps, behind a jump host only the bastion stays pooled
+            if self.jump is not None or transport is None or not transport.is_active():
+                self.pool.discard(self.hostname, self.username, self.port)
+            else:
+                self.pool.release(self.hostname, self.username, self.port)
+        self.client = None
+
+    def _channel_slot(self, timeout):
+        """The command timeout to apply and the pool's channel slot (if pooled)."""
+        if timeout is None:
+            timeout = self.deadline.command_timeout if self.deadline else COMMAND_TIMEOUT
+        slot = (
+            self.pool.channel(self.hostname, self.username, self.port)
+            if self.pool is not None
+            else contextlib.nullcontext()
+        )
+        return self._time_limit(timeout), slot
+
+    def execute_command(self, client: str, command: str, timeout: int = None):
+        """
+        Run one command and return (exit_status, out, err).
+        Raises CommandTimeout when it does not finish within timeout seconds
+        (COMMAND_TIMEOUT, or the deadline's command_timeout) or the host deadline.
+        """
+        timeout, slot = self._channel_slot(timeout)
+        with slot, self.timings.phase(self.hostname, "exec"):
+            # the channel timeout bounds every read; drain the output before
+            # waiting on the exit status so a chatty command can't stall on a full window
+            stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+            channel = stdout.channel
+            try:
+                out = stdout.read().decode(errors="ignore").strip()
+                err = stderr.read().decode(errors="ignore").strip()
+                if not channel.status_event.wait(timeout):
+                    raise socket.timeout()
+            except socket.timeout:
+                channel.close()
+                raise CommandTimeout(
+                    f"{self.hostname}: command timed out after {timeout:.0f}s"
+                ) from None
+            exit_status = channel.recv_exit_status()
+        if self.deadline is not None and self.deadline.expired:
+            # the scheduler aborted the host while we waited, the output is not trustworthy
+            raise CommandTimeout(f"{self.hostname}: host deadline exceeded")
         return exit_status, out, err
 
-    def check_file_permissions(self, client, file_path, expected_permissions):
+    def stream_command(self, client, command, timeout=None):
         """
-        Returns (bool, actual_permissions_or_error)
+        Like execute_command, but yields stdout line by line as it arrives
+        instead of returning it whole, for output that grows with the host
+        (file tree listings). timeout bounds each read, not the whole stream.
+        """
+        timeout, slot = self._channel_slot(timeout)
+        with slot, self.timings.phase(self.hostname, "exec"):
+            stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+            channel = stdout.channel
+            try:
+                for line in stdout:
+                    yield line.decode(errors="ignore") if isinstance(line, bytes) else line
+                if not channel.status_event.wait(timeout):
+                    raise socket.timeout()
+            except socket.timeout:
+                channel.close()
+                raise CommandTimeout(
+                    f"{self.hostname}: command timed out after {timeout:.0f}s"
+                ) from None
+        if self.deadline is not None and self.deadline.expired:
+            raise CommandTimeout(f"{self.hostname}: host deadline exceeded")
+
+    def check_file_trees(self, client, rules):
         """
-        cmd = f"stat -c '%a' {shlex.quote(file_path)}"
-        exit_code, out, err = self.execute_command(client, cmd)
+        Evaluate glob / recursive permission rules from one streamed find
+        listing. Returns rule id -> (status, value).
+        """
+        if not rules:
+            return {}
+        scan = TreeScan(rules)
+        for line in self.stream_command(client, scan.command()):
+            scan.feed(line)
+        return scan.results()
+
+    def execute_batch(self, client, commands):
+        """
+        Run several commands over a single exec channel.
+        Returns a list of (exit_status, out, err) in the same order as commands.
+        """
+        if not commands:
+            # e.g. a re-run of tree rules only, with the facts already known
+            return []
+        marker = f"__SCA_{uuid.uuid4().hex[:12]}__"
+        exit_status, out, err = self.execute_command(
+            client, build_batch_script(commands, marker)
+        )
+        with self.timings.phase(self.hostname, "parse"):
+            return parse_batch_output(out, marker, len(commands))
+
+    @staticmethod
+    def permission_command(file_path):
+        return f"stat -c '%a' {shlex.quote(file_path)}"
+
+    @staticmethod
+    def evaluate_permissions(exit_code, out, err, expected_permissions):
         if exit_code != 0:
             # file may not exist or stat failed
             return False, err or f"stat failed with exit {exit_code}"
         # out contains numeric permission like 600 or 644
         return out in expected_permissions, out
 
-    def check_config(
-        self, client, search_string, file_path, expected_comparison, operator
-    ):
+    def check_file_permissions(self, client, file_path, expected_permissions):
         """
-        Robustly find the config line (ignores commented lines) and extract value.
-        Supports operators: 'max', 'min', 'equal' for numeric comparison and 'equal' for strings like 'no'/'yes'.
-        Returns (bool, value_or_error)
+        Returns (bool, actual_permissions_or_error)
         """
+        exit_code, out, err = self.execute_command(
+            client, self.permission_command(file_path)
+        )
+        return self.evaluate_permissions(exit_code, out, err, expected_permissions)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def config_commands(search_string, file_path):
+        """Returns the (awk, grep fallback) commands used to read one config key, built once per key and file."""
         # strip leading ^ if provided
         pattern = search_string.lstrip("^")
         # awk pattern: match lines starting with optional spaces then the token, that are not commented
@@ -76,16 +386,12 @@ class Utils:
             "split(line, a, /[ \\t=]+/); print a[2] ? a[2] : a[1]; exit }' "
             f"{shlex.quote(file_path)}"
         )
-        exit_code, out, err = self.execute_command(client, awk_cmd)
-        if exit_code != 0 or not out:
-            # fallback: try grep (less robust) to provide helpful error message
-            grep_cmd = f"grep -E '^[ \\t]*{pattern}' {shlex.quote(file_path)} || true"
-            _, g_out, g_err = self.execute_command(client, grep_cmd)
-            if not g_out:
-                return False, f"{pattern} not found in {file_path}"
-            # if grep found something but awk failed to extract, return that raw line for debugging
-            return False, f"unparsable line: {g_out.splitlines()[0][:200]}"
-        value = out.strip()
+        grep_cmd = f"grep -E '^[ \\t]*{pattern}' {shlex.quote(file_path)} || true"
+        return awk_cmd, grep_cmd
+
+    @staticmethod
+    def compare_value(value, expected_comparison, operator):
+        """Apply a min/max/equal operator to a raw config value."""
         # normalize common boolean strings
         low = value.lower()
         if operator == "equal" and isinstance(expected_comparison, str):
@@ -104,124 +410,322 @@ class Utils:
         else:
             return False, f"unknown operator {operator}"
 
-    def run_security_checks(self, client, report_folder):
-        """Run all security checks and return formatted results."""
-
-        CHECKS = [
-            {
-                "name": "Shadow File Permissions",
-                "type": "file_permission",
-                "file": "/etc/shadow",
-                "expected": ["640", "600"],
-            },
-            {
-                "name": "SSH MaxAuthTries",
-                "type": "config_value",
-                "file": "/etc/ssh/sshd_config",
-                "search_string": "MaxAuthTries",
-                "expected": 4,
-                "operator": "max",
-            },
-            {
-                "name": "Password Maximum Days",
-                "type": "config_value",
-                "file": "/etc/login.defs",
-                "search_string": "^PASS_MAX_DAYS",
-                "expected": 90,
-                "operator": "max",
-            },
-            {
-                "name": "Password Minimum Days",
-                "type": "config_value",
-                "file": "/etc/login.defs",
-                "search_string": "^PASS_MIN_DAYS",
-                "expected": 1,
-                "operator": "min",
-            },
-            {
-                "name": "Password Warning Age",
-                "type": "config_value",
-                "file": "/etc/login.defs",
-                "search_string": "^PASS_WARN_AGE",
-                "expected": 7,
-                "operator": "min",
-            },
-            {
-                "name": "SSH Root Login Disabled",
-                "type": "config_value",  # NEW type - checking for string, not number
-                "file": "/etc/ssh/sshd_config",
-                "search_string": "^PermitRootLogin",
-                "expected": "no",
-                "operator": "equal",
-            },
-            {
-                "name": "Passwd File Permissions",
-                "type": "file_permission",
-                "file": "/etc/passwd",
-                "expected": ["644"],
-            },
-            {
-                "name": "Group File Permissions",
-                "type": "file_permission",
-                "file": "/etc/group",
-                "expected": ["644"],
-            },
-            {
-                "name": "SSH Empty Passwords Disabled",
-                "type": "config_value",
-                "file": "/etc/ssh/sshd_config",
-                "search_string": "^PermitEmptyPasswords",
-                "expected": "no",
-                "operator": "equal",
-            },
-            {
-                "name": "Password Minimum Length",
-                "type": "config_value",
-                "file": "/etc/login.defs",
-                "search_string": "^PASS_MIN_LEN",
-                "expected": 14,
-                "operator": "min",
-            },
-        ]
+    def check_config(
+        self, client, search_string, file_path, expected_comparison, operator
+    ):
+        """
+        Robustly find the config line (ignores commented lines) and extract value.
+        Supports operators: 'max', 'min', 'equal' for numeric comparison and 'equal' for strings like 'no'/'yes'.
+        Returns (bool, value_or_error)
+        """
+        awk_cmd, grep_cmd = self.config_commands(search_string, file_path)
+        awk_result = self.execute_command(client, awk_cmd)
+        grep_result = None
+        if awk_result[0] != 0 or not awk_result[1]:
+            # fallback: try grep (less robust) to provide helpful error message
+            grep_result = self.execute_command(client, grep_cmd)
+        return self.evaluate_config(
+            awk_result,
+            grep_result,
+            search_string,
+            file_path,
+            expected_comparison,
+            operator,
+        )
 
-        results = []
-        for check in CHECKS:
-            if check["type"] == "file_permission":
-                status, value = self.check_file_permissions(
-                    client, check["file"], check["expected"]
-                )
-            elif check["type"] == "config_value":
-                status, value = self.check_config(
-                    client,
-                    check["search_string"],
-                    check["file"],
-                    check["expected"],
-                    check["operator"],
-                )
-            results.append(
-                {
-                    "name": check["name"],
-                    "status": "PASS" if status else "FAIL",
-                    "expected": check["expected"],
-                    "actual_value": value,
-                }
+    def evaluate_config(
+        self,
+        awk_result,
+        grep_result,
+        search_string,
+        file_path,
+        expected_comparison,
+        operator,
+    ):
+        pattern = search_string.lstrip("^")
+        exit_code, out, err = awk_result
+        if exit_code != 0 or not out:
+            g_out = grep_result[1] if grep_result else ""
+            if not g_out:
+                return False, f"{pattern} not found in {file_path}"
+            # if grep found something but awk failed to extract, return that raw line for debugging
+            return False, f"unparsable line: {g_out.splitlines()[0][:200]}"
+        return self.compare_value(out.strip(), expected_comparison, operator)
+
+    def evaluate_config_index(
+        self, index, search_string, file_path, expected_comparison, operator
+    ):
+        """Same contract as check_config, but reads the key from a parsed ConfigIndex."""
+        pattern = search_string.lstrip("^")
+        if index is None or pattern not in index:
+            return False, f"{pattern} not found in {file_path}"
+        value = index.get(pattern)
+        if not value:
+            return False, f"unparsable line: {index.line(pattern).strip()[:200]}"
+        return self.compare_value(value, expected_comparison, operator)
+
+    def _evaluate_permission_rule(self, rule, data):
+        if rule.tree:
+            return data.trees[rule.id]
+        return self.evaluate_permissions(*data.modes[rule.file], rule.allowed)
+
+    def _evaluate_config_rule(self, rule, data):
+        if data.indexes is not None:
+            evaluate = functools.partial(
+                self.evaluate_config_index,
+                data.indexes.get(rule.file),
+                rule.search_string,
+                rule.file,
+                rule.expected,
+                rule.operator,
             )
+            digest = data.digests.get(rule.file)
+            if digest is not None and self.eval_cache is not None:
+                # the verdict only depends on file content, path and rule, hosts on the same image share it
+                return self.eval_cache.verdict(digest, rule, evaluate)
+            return evaluate()
+        awk_cmd, grep_cmd = self.config_commands(rule.search_string, rule.file)
+        return self.evaluate_config(
+            data.outputs[awk_cmd],
+            data.outputs[grep_cmd],
+            rule.search_string,
+            rule.file,
+            rule.expected,
+            rule.operator,
+        )
+
+    def _run_permission_rule(self, client, rule):
+        if rule.tree:
+            return self.check_file_trees(client, (rule,))[rule.id]
+        return self.check_file_permissions(client, rule.file, rule.allowed)
+
+    def _run_config_rule(self, client, rule):
+        return self.check_config(
+            client, rule.search_string, rule.file, rule.expected, rule.operator
+        )
+
+    # rule type -> handler, looked up once per rule instead of an if/elif chain
+    rule_evaluators = {
+        "file_permission": _evaluate_permission_rule,
+        "config_value": _evaluate_config_rule,
+    }
+    rule_runners = {
+        "file_permission": _run_permission_rule,
+        "config_value": _run_config_rule,
+    }
 
-        report_metadata = {
+    @staticmethod
+    def rule_result(rule, status, value):
+        return {
+            "name": rule.name,
+            "status": "PASS" if status else "FAIL",
+            "expected": rule.expected,
+            "actual_value": value,
+        }
+
+    def fetch_command(self, path):
+        """
+        `cat path`, or with an eval cache the hash-first fetch that leaves out
+        content whose digest this host was offered as known.
+        """
+        if self.eval_cache is None:
+            return f"cat {shlex.quote(path)}"
+        return fetch_command(path, tuple(self._known.get(path, ())))
+
+    def compile_batch(self, catalog, fetch_configs=True):
+        """
+        Turn the catalog (plus FACTS_COMMAND while the host facts aren't
+        known yet) into the command list for one batched remote script.
+        """
+        commands = [] if self.facts is not None else [FACTS_COMMAND]
+        if fetch_configs:
+            if self.eval_cache is not None:
+                self._known = {
+                    path: self.eval_cache.known(path) for path in catalog.config_files
+                }
+            commands.extend(self.fetch_command(path) for path in catalog.config_files)
+        else:
+            for rule in catalog.by_type.get("config_value", ()):
+                commands.extend(self.config_commands(rule.search_string, rule.file))
+        commands.extend(self.permission_command(path) for path in catalog.permission_files)
+        return list(dict.fromkeys(commands))
+
+    def evaluate_batch(self, catalog, commands, outputs, fetch_configs=True, trees=None):
+        """
+        Map the (exit, out, err) triples of a compile_batch() script back onto
+        the catalog rules that apply to the host. trees holds the results of
+        the catalog's tree_rules (check_file_trees). Returns (results, machine, ip).
+        """
+        outputs = dict(zip(commands, outputs))
+        if FACTS_COMMAND in outputs:
+            self.store_facts(parse_facts(outputs[FACTS_COMMAND][1]))
+        catalog = catalog.for_facts(self.facts)
+        machine, ip = self.facts.get("machine", ""), self.facts.get("ips", "")
+
+        indexes = None
+        digests = {}
+        if fetch_configs:
+            indexes = {}
+            for path in catalog.config_files:
+                exit_code, content, err = outputs[self.fetch_command(path)]
+                if exit_code != 0:
+                    continue
+                if self.eval_cache is None:
+                    indexes[path] = parse_config(
+                        content, ignore_case=is_sshd_config(path)
+                    )
+                    continue
+                digest, _, body = content.partition("\n")
+                indexes[path], digests[path] = self.eval_cache.index(
+                    path, digest, body, self._known.get(path, {}).get(digest)
+                )
+        modes = {
+            path: outputs[self.permission_command(path)]
+            for path in catalog.permission_files
+        }
+        data = ScanData(modes, indexes, outputs, trees, digests)
+        return self.evaluate_rules(catalog, data), machine, ip
+
+    def evaluate_rules(self, catalog, data):
+        """Evaluate every catalog rule against already collected ScanData."""
+        return [
+            self.rule_result(rule, *self.rule_evaluators[rule.type](self, rule, data))
+            for rule in catalog.rules
+        ]
+
+    def run_checks_batched(self, client, catalog, fetch_configs=True):
+        """
+        Compile every rule into one remote script so a host costs a single
+        exec round trip.
+        With fetch_configs=True each config file is cat'ed once and all
+        config_value checks are evaluated against a local ConfigIndex instead
+        of running awk per key.
+        Returns (results, machine, ip).
+        """
+        catalog = catalog.for_facts(self.ensure_facts(client))
+        commands = self.compile_batch(catalog, fetch_configs)
+        outputs = self.execute_batch(client, commands)
+        trees = self.check_file_trees(client, catalog.tree_rules)
+        with self.timings.phase(self.hostname, "parse"):
+            return self.evaluate_batch(catalog, commands, outputs, fetch_configs, trees)
+
+    def compile_probe(self, catalog):
+        """The command list for one probe exchange, facts first while they aren't known."""
+        commands = [] if self.facts is not None else [FACTS_COMMAND]
+        commands.append(build_probe(catalog))
+        return commands
+
+    def evaluate_probe(self, catalog, commands, outputs, trees=None):
+        """
+        Evaluate a compile_probe() run. Returns (results, machine, ip), or None
+        when the target couldn't run the probe and the shell checks are needed.
+        """
+        outputs = dict(zip(commands, outputs))
+        if FACTS_COMMAND in outputs:
+            self.store_facts(parse_facts(outputs[FACTS_COMMAND][1]))
+        exit_code, out, err = outputs[build_probe(catalog)]
+        if exit_code != 0:
+            reason = "no python" if exit_code == PROBE_MISSING else err or f"exit {exit_code}"
+            print(f"Probe unavailable on {self.hostname} ({reason}), using shell checks")
+            return None
+        try:
+            modes, indexes = parse_probe(out, catalog)
+        except (ValueError, KeyError, TypeError) as exc:
+            print(f"Probe output from {self.hostname} unreadable ({exc}), using shell checks")
+            return None
+        catalog = catalog.for_facts(self.facts)
+        machine, ip = self.facts.get("machine", ""), self.facts.get("ips", "")
+        data = ScanData(modes, indexes, trees=trees)
+        return self.evaluate_rules(catalog, data), machine, ip
+
+    def run_checks_probe(self, client, catalog):
+        """
+        Run the generated python probe (probe.build_probe) once on the target:
+        stat, config parsing and key extraction all happen remotely and come
+        back as one small JSON document, facts included when not cached.
+        Returns (results, machine, ip), or None to fall back to shell checks.
+        """
+        catalog = catalog.for_facts(self.load_cached_facts())
+        commands = self.compile_probe(catalog)
+        outputs = self.execute_batch(client, commands)
+        trees = None
+        if outputs[-1][0] == 0:
+            # file trees stream separately, their listing can be far bigger than the probe payload
+            trees = self.check_file_trees(client, catalog.tree_rules)
+        with self.timings.phase(self.hostname, "parse"):
+            return self.evaluate_probe(catalog, commands, outputs, trees)
+
+    def report_record(self, results, machine, ip):
+        return {
             "timestamp": datetime.datetime.now().isoformat(),
             "tool": "Automated Security Compliance Script",
             "host": socket.gethostname(),
-            "Machine": client.exec_command("uname")[1].read().decode().strip(),
+            "target": self.hostname,
+            "Machine": machine,
             "result": results,
-            "ip": client.exec_command("hostname -I")[1].read().decode().strip(),
+            "ip": ip,
+            "facts": self.facts,
         }
 
-        filename = (
-            f"security_audit_report_{report_metadata['ip'].replace('.','_')}.json"
-        )
-        file_path = pathlib.Path(report_folder) / filename
-        with open(file_path, "w") as f:
-            json.dump(report_metadata, f, indent=2)
+    def write_report(self, report_folder, results, machine, ip, sink=None):
+        """Hand the host's report to sink, or write the per-host JSON file."""
+        if sink is None:
+            sink = PerHostJsonSink(report_folder)
+        with self.timings.phase(self.hostname, "write"):
+            sink.write(self.report_record(results, machine, ip))
+
+    def run_security_checks(
+        self,
+        client,
+        report_folder,
+        batched=True,
+        fetch_configs=True,
+        catalog=None,
+        state_store=None,
+        sink=None,
+        probe=False,
+    ):
+        """
+        Run all security checks and return formatted results.
+        batched=True sends every check in one remote script, batched=False
+        falls back to one exec_command per check.
+        fetch_configs (batched mode only) reads each config file once and
+        evaluates config_value checks locally.
+        catalog defaults to checks/cis_default.json.
+        state_store (an incremental.StateStore) only re-runs rules whose
+        target files changed since the previous scan of this host.
+        sink (a sinks.ResultSink) receives the report instead of the
+        per-host JSON file in report_folder.
+        probe=True (without state_store) runs the generated python probe,
+        one exchange per host; targets without python fall back to the
+        batched / per-check mode chosen above.
+        """
+        if catalog is None:
+            catalog = load_catalog()
+
+        probed = None
+        if probe and state_store is None:
+            probed = self.run_checks_probe(client, catalog)
+
+        if probed is not None:
+            results, machine, ip = probed
+        elif state_store is not None:
+            results, machine, ip, _ = run_checks_incremental(
+                self, client, catalog, state_store, fetch_configs
+            )
+        elif batched:
+            results, machine, ip = self.run_checks_batched(
+                client, catalog, fetch_configs
+            )
+        else:
+            results = []
+            for rule in catalog.for_facts(self.ensure_facts(client)).rules:
+                with self.timings.phase(self.hostname, "check", rule.name):
+                    status, value = self.rule_runners[rule.type](self, client, rule)
+                results.append(self.rule_result(rule, status, value))
+            machine, ip = self.facts.get("machine", ""), self.facts.get("ips", "")
+
+        self.write_report(report_folder, results, machine, ip, sink)
 
         return results
 
@@ -239,10 +743,11 @@ class Utils:
         os.makedirs(report_dir, exist_ok=True)
         os.makedirs(backup_dir, exist_ok=True)
 
+        # JSON Lines segments are rolled as whole files alongside the per-host reports
         old_files = [
             file
             for file in os.listdir(report_dir)
-            if file.endswith(".json") or file.endswith(".html")
+            if file.endswith((".json", ".html", ".jsonl", ".jsonl.gz", ".jsonl.zst"))
         ]
 
         if not old_files:
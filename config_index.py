@@ -0,0 +1,67 @@
+import re
+
+# "KEY VALUE", "KEY=VALUE" and "KEY = VALUE" forms
+LINE_RE = re.compile(r"^([^\s=]+)\s*(?:=\s*|\s+)(.*)$")
+COMMENT_RE = re.compile(r"\s+#.*$")
+
+
+class ConfigIndex:
+    """
+    key -> value index of one config file.
+    Global keys live in `values`, keys inside sshd `Match` blocks are kept
+    per block in `match_blocks` so they never shadow the global setting.
+    Like sshd, the first occurrence of a key wins.
+    """
+
+    def __init__(self, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.values = {}
+        self.lines = {}
+        self.match_blocks = []
+
+    def _key(self, key):
+        return key.lower() if self.ignore_case else key
+
+    def get(self, key):
+        """Returns the global value for key, or None when it is not set."""
+        return self.values.get(self._key(key))
+
+    def line(self, key):
+        """Returns the raw line the key was read from (useful for error messages)."""
+        return self.lines.get(self._key(key))
+
+    def __contains__(self, key):
+        return self._key(key) in self.lines
+
+
+def is_sshd_config(file_path):
+    return file_path.rstrip("/").rsplit("/", 1)[-1].startswith("sshd_config")
+
+
+def parse_config(text, ignore_case=False):
+    """Parse a KEY VALUE / KEY=VALUE style config file into a ConfigIndex."""
+    index = ConfigIndex(ignore_case)
+    values, lines = index.values, index.lines
+    in_match = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        line = COMMENT_RE.sub("", line)
+        match = LINE_RE.match(line)
+        key = index._key(match.group(1) if match else line)
+        tokens = match.group(2).split() if match else []
+        value = tokens[0] if tokens else None
+
+        if key == index._key("Match"):
+            block = {"criteria": match.group(2) if match else "", "values": {}}
+            index.match_blocks.append(block)
+            values = block["values"]
+            in_match = True
+            continue
+        if in_match:
+            values.setdefault(key, value)
+        elif key not in lines:
+            lines[key] = raw
+            values[key] = value
+    return index
@@ -0,0 +1,176 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+
+from sinks import ResultSink, read_jsonl
+
+INDEX_SUFFIX = ".index.json"
+HOST_REPORT_GLOB = "security_audit_report_*.json"
+SEGMENT_GLOBS = ("audit*.jsonl", "audit*.jsonl.gz", "audit*.jsonl.zst")
+
+
+def _value(value):
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+
+
+def _digest(checks):
+    blob = json.dumps(sorted(checks.items()), separators=(",", ":")).encode()
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def _checks(entry):
+    # index files keep each host's checks as an encoded string, decoded only when it drifted
+    checks = entry[1]
+    return json.loads(checks) if isinstance(checks, str) else checks
+
+
+class RunIndex:
+    """
+    One scan run reduced to host -> (digest, {check: [status, value]}).
+    The per-host digest lets diff() skip every unchanged host with a single
+    string comparison, so only the few hosts that drifted are walked.
+    """
+
+    def __init__(self, hosts=None):
+        self.hosts = hosts or {}
+
+    def add(self, record):
+        host = record.get("target") or record.get("ip")
+        checks = {
+            r["name"]: [r["status"], _value(r.get("actual_value"))]
+            for r in record.get("result", [])
+        }
+        self.hosts[host] = [_digest(checks), checks]
+
+    def save(self, path):
+        tmp = f"{path}.tmp"
+        packed = {
+            host: [digest, checks if isinstance(checks, str) else json.dumps(checks)]
+            for host, (digest, checks) in self.hosts.items()
+        }
+        with open(tmp, "w") as f:
+            json.dump(packed, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, folder):
+        """
+        Index of a report folder (Reports/ or one Reports/Backup/backup_*).
+        Uses the *.index.json files written by RunIndexSink when present,
+        and otherwise rebuilds it from the per-host reports and jsonl segments.
+        """
+        index = cls()
+        index_files = sorted(glob.glob(os.path.join(folder, "*" + INDEX_SUFFIX)))
+        if index_files:
+            for path in index_files:
+                with open(path, "r") as f:
+                    index.hosts.update(json.load(f))
+            return index
+        for path in sorted(glob.glob(os.path.join(folder, HOST_REPORT_GLOB))):
+            with open(path, "r") as f:
+                index.add(json.load(f))
+        for pattern in SEGMENT_GLOBS:
+            for path in sorted(glob.glob(os.path.join(folder, pattern))):
+                for record in read_jsonl(path):
+                    index.add(record)
+        return index
+
+
+class RunIndexSink(ResultSink):
+    """Builds the run's RunIndex while it is written and saves it on close."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = RunIndex()
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        with self._lock:
+            self.index.add(record)
+
+    def close(self):
+        self.index.save(self.path)
+
+
+def change_record(host, check, kind, before, after):
+    change = {"host": host, "check": check, "change": kind}
+    if before is not None:
+        change["was"] = {"status": before[0], "value": before[1]}
+    if after is not None:
+        change["now"] = {"status": after[0], "value": after[1]}
+    return change
+
+
+def diff(baseline, current):
+    """
+    Yield only what changed between two RunIndex objects:
+    newly_failing, newly_passing, value_changed, check_added, check_removed,
+    host_added and host_missing.
+    """
+    before_hosts = baseline.hosts
+    for host, entry in current.hosts.items():
+        previous = before_hosts.get(host)
+        if previous is None:
+            yield {"host": host, "check": None, "change": "host_added"}
+            continue
+        if previous[0] == entry[0]:
+            continue
+        checks = _checks(entry)
+        old_checks = _checks(previous)
+        for check, now in checks.items():
+            was = old_checks.get(check)
+            if was is None:
+                yield change_record(host, check, "check_added", None, now)
+            elif was[0] != now[0]:
+                kind = "newly_passing" if now[0] == "PASS" else "newly_failing"
+                yield change_record(host, check, kind, was, now)
+            elif was[1] != now[1]:
+                yield change_record(host, check, "value_changed", was, now)
+        for check, was in old_checks.items():
+            if check not in checks:
+                yield change_record(host, check, "check_removed", was, None)
+    for host in before_hosts:
+        if host not in current.hosts:
+            yield {"host": host, "check": None, "change": "host_missing"}
+
+
+def latest_backup(report_dir="Reports"):
+    """The newest Backup/backup_<timestamp> folder, i.e. the previous run, or None."""
+    backups = sorted(glob.glob(os.path.join(report_dir, "Backup", "backup_*")))
+    return backups[-1] if backups else None
+
+
+def write_drift(changes, path):
+    """Write changes as JSON Lines and return a count per change kind."""
+    counts = {}
+    with open(path, "w") as f:
+        for change in changes:
+            counts[change["change"]] = counts.get(change["change"], 0) + 1
+            f.write(json.dumps(change, separators=(",", ":")) + "\n")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report what changed between two scan runs")
+    parser.add_argument("--current", default="Reports", help="report folder of the run to check")
+    parser.add_argument("--baseline", help="report folder to compare against, default the latest backup")
+    parser.add_argument("--output", default="-", help="JSON Lines file for the changes, - for stdout")
+    args = parser.parse_args(argv)
+
+    baseline_dir = args.baseline or latest_backup(args.current)
+    if baseline_dir is None:
+        parser.error("no baseline: pass --baseline or run a scan twice")
+    changes = diff(RunIndex.load(baseline_dir), RunIndex.load(args.current))
+    if args.output == "-":
+        for change in changes:
+            print(json.dumps(change))
+    else:
+        counts = write_drift(changes, args.output)
+        print(f"{sum(counts.values())} changes vs {baseline_dir}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import collections
+import shlex
+import threading
+
+from config_index import is_sshd_config, parse_config
+
+EVAL_CACHE_SIZE = 256
+# digests per config path offered to the remote side as "already known"
+KNOWN_PER_PATH = 4
+NO_DIGEST = "-"
+
+
+def fetch_command(path, known=()):
+    """
+    Print the file's sha256 on the first line, then its content unless the
+    digest is one of `known` (the control node already has that index).
+    Without sha256sum the digest line is NO_DIGEST and the content always follows.
+    """
+    quoted = shlex.quote(path)
+    cases = "|".join(known)
+    skip = f"case $__sca_h in {cases}) ;; *) cat {quoted};; esac" if known else f"cat {quoted}"
+    return (
+        f"if __sca_h=$(sha256sum < {quoted} 2>/dev/null); then "
+        f'__sca_h=${{__sca_h%% *}}; echo "$__sca_h"; {skip}; '
+        f"else echo {NO_DIGEST}; cat {quoted}; fi"
+    )
+
+
+class EvalCache:
+    """
+    Bounded LRU shared by every worker thread of a run, for fleets built
+    from a few golden images:
+    indexes   (sha256 of a config file, ignore_case) -> parsed ConfigIndex
+    verdicts  (sha256, path, key, operator, expected) -> (status, value)
+    Cached ConfigIndex objects are shared between hosts and must not be modified.
+    """
+
+    def __init__(self, max_entries=EVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._indexes = collections.OrderedDict()
+        self._verdicts = collections.OrderedDict()
+        self._known = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, table, key):
+        with self._lock:
+            value = table.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                table.move_to_end(key)
+            return value
+
+    def _put(self, table, key, value):
+        with self._lock:
+            table[key] = value
+            table.move_to_end(key)
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+
+    def known(self, path):
+        """digest -> ConfigIndex still cached for path, newest first; the caller keeps them alive."""
+        ignore_case = is_sshd_config(path)
+        with self._lock:
+            return {
+                digest: self._indexes[(digest, ignore_case)]
+                for digest in self._known.get(path, ())
+                if (digest, ignore_case) in self._indexes
+            }
+
+    def index(self, path, digest, content, index=None):
+        """
+        The ConfigIndex of content, parsed at most once per distinct digest.
+        index is the caller's known() copy when the remote side skipped the content.
+        Returns (index, digest), digest None when the host couldn't hash the file.
+        """
+        ignore_case = is_sshd_config(path)
+        if digest == NO_DIGEST:
+            return parse_config(content, ignore_case=ignore_case), None
+        key = (digest, ignore_case)
+        if index is None:
+            index = self._get(self._indexes, key)
+        else:
+            with self._lock:
+                self.hits += 1
+        if index is None:
+            index = parse_config(content, ignore_case=ignore_case)
+        self._put(self._indexes, key, index)
+        with self._lock:
+            recent = self._known.setdefault(path, collections.OrderedDict())
+            recent[digest] = True
+            recent.move_to_end(digest, last=False)
+            while len(recent) > KNOWN_PER_PATH:
+                recent.popitem()
+        return index, digest
+
+    def verdict(self, digest, rule, evaluate):
+        """evaluate() for this rule against content with this digest, memoised."""
+        # the path decides ignore_case, and verdict values name the file ("... not found in <path>")
+        key = (digest, rule.file, rule.key, rule.operator, rule.expected)
+        result = self._get(self._verdicts, key)
+        if result is None:
+            result = evaluate()
+            self._put(self._verdicts, key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "indexes": len(self._indexes),
+                "verdicts": len(self._verdicts),
+            }
@@ -0,0 +1,50 @@
+import os
+import time
+
+from incremental import STATE_DIR, StateStore
+
+FACTS_TTL = 3600
+
+# One round trip for everything the scanners used to ask for separately
+# (whoami, uname, hostname -I) plus what conditional rules key on.
+# os-release is sourced in a subshell so its variables don't leak.
+FACTS_COMMAND = (
+    "( . /etc/os-release 2>/dev/null; "
+    'echo "os_id=$ID"; echo "os_version=$VERSION_ID"; '
+    'echo "os_like=$ID_LIKE"; echo "os_name=$PRETTY_NAME" ); '
+    'echo "machine=$(uname)"; echo "kernel=$(uname -r)"; echo "arch=$(uname -m)"; '
+    'echo "hostname=$(hostname)"; echo "ips=$(hostname -I 2>/dev/null)"; '
+    'echo "user=$(whoami)"; '
+    "echo \"sshd_version=$( { sshd -V 2>&1; ssh -V 2>&1; } | grep -o 'OpenSSH_[^ ,]*' | head -n 1)\"; "
+    "for p in apt-get dnf yum zypper apk pacman; do "
+    'command -v $p >/dev/null 2>&1 && { echo "pkg_manager=$p"; break; }; done; true'
+)
+
+
+def parse_facts(output):
+    facts = {}
+    for line in output.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            facts[key.strip()] = value.strip()
+    return facts
+
+
+class FactsCache:
+    """
+    Host facts kept on disk for ttl seconds, one small JSON file per host,
+    so repeat scans skip the facts command (and with it the whoami probe).
+    """
+
+    def __init__(self, ttl=FACTS_TTL, directory=os.path.join(STATE_DIR, "facts")):
+        self.ttl = ttl
+        self.store = StateStore(directory)
+
+    def get(self, host_key):
+        entry = self.store.load(host_key)
+        if not entry or time.time() - entry.get("collected_at", 0) > self.ttl:
+            return None
+        return entry["facts"]
+
+    def put(self, host_key, facts):
+        self.store.save(host_key, {"collected_at": time.time(), "facts": facts})
@@ -0,0 +1,193 @@
+import functools
+import glob
+import grp
+import os
+import pwd
+import re
+import shlex
+import stat
+
+from catalog import GLOB_CHARS
+
+# mode, owner, group, path: tab separated and path last so spaces survive
+ENTRY_FORMAT = r"%m\t%u\t%g\t%p\n"
+# what a tree fingerprint covers: files added or removed, chmod / chown (ctime) and the verdict inputs
+FINGERPRINT_FORMAT = r"%p %C@ %m %u %g\n"
+SPEC_HEADER = "@@sca-tree"
+# offenders kept per rule, the rest are only counted
+MAX_OFFENDERS = 5
+
+
+def glob_quote(pattern):
+    """Shell-quote a path pattern except its glob characters, so the remote shell still expands them."""
+    parts = re.split(r"(\*|\?|\[[^\]/]*\])", pattern)
+    return "".join(
+        part if part in ("*", "?") or part.startswith("[") else shlex.quote(part)
+        for part in parts
+        if part
+    )
+
+
+def tree_command(specs):
+    """
+    One command listing every (pattern, recursive) root as a single stream:
+    a SPEC_HEADER line per root followed by one ENTRY_FORMAT line per file.
+    -H follows symlinked roots, symlinks found while walking are skipped.
+    """
+    parts = []
+    for index, (pattern, recursive) in enumerate(specs):
+        depth = "" if recursive else " -maxdepth 0"
+        parts.append(
+            f"echo '{SPEC_HEADER} {index}'; "
+            f"find -H {glob_quote(pattern)}{depth} ! -type l -printf '{ENTRY_FORMAT}' 2>/dev/null"
+        )
+    return "; ".join(parts) + "; true"
+
+
+def tree_key(pattern, recursive):
+    """Fingerprint key of one (pattern, recursive) root, apart from plain file paths."""
+    return f"tree:{'R' if recursive else '-'}:{pattern}"
+
+
+def tree_fingerprint_command(specs):
+    """
+    One "tree_key|checksum" line per (pattern, recursive) root, the cksum of
+    its FINGERPRINT_FORMAT listing, so an unchanged tree is known without
+    streaming it.
+    """
+    parts = []
+    for pattern, recursive in specs:
+        depth = "" if recursive else " -maxdepth 0"
+        listing = f"find -H {glob_quote(pattern)}{depth} ! -type l -printf '{FINGERPRINT_FORMAT}' 2>/dev/null"
+        parts.append(f'echo {shlex.quote(tree_key(pattern, recursive))}"|$({listing} | cksum)"')
+    return "; ".join(parts)
+
+
+def violation(rule, mode, owner, group):
+    """Why one file breaks the rule, or None when it complies."""
+    bits = int(mode, 8)
+    if rule.allowed is not None and mode not in rule.allowed:
+        return "mode"
+    if rule.max_mode is not None and bits & ~rule.max_mode & 0o7777:
+        return "mode"
+    if rule.forbid_mode is not None and bits & rule.forbid_mode:
+        return "mode"
+    if rule.owner and owner != rule.owner:
+        return "owner"
+    if rule.group and group != rule.group:
+        return "group"
+    return None
+
+
+class TreeScan:
+    """
+    Streaming evaluator for glob / recursive permission rules. Feed it the
+    lines of a tree_command() run one at a time (or local entries through
+    add()); per rule only a file count and the first MAX_OFFENDERS offenders
+    are kept, so a walk over a large tree needs no more memory than a small one.
+    """
+
+    def __init__(self, rules):
+        self.rules = tuple(rules)
+        self.specs = tuple(dict.fromkeys((rule.file, rule.recursive) for rule in self.rules))
+        self._spec_rules = [
+            [rule for rule in self.rules if (rule.file, rule.recursive) == spec]
+            for spec in self.specs
+        ]
+        self._checked = dict.fromkeys((rule.id for rule in self.rules), 0)
+        self._failed = dict.fromkeys((rule.id for rule in self.rules), 0)
+        self._offenders = {rule.id: [] for rule in self.rules}
+        self._current = None
+
+    def command(self):
+        return tree_command(self.specs)
+
+    def feed(self, line):
+        line = line.rstrip("\n")
+        if line.startswith(SPEC_HEADER):
+            self._current = int(line[len(SPEC_HEADER):])
+            return
+        fields = line.split("\t", 3)
+        # anything else (a path holding a newline) can't be attributed, skip it
+        if self._current is not None and len(fields) == 4 and fields[0].isdigit():
+            self.add(self._current, *fields)
+
+    def add(self, spec_index, mode, owner, group, path):
+        for rule in self._spec_rules[spec_index]:
+            self._checked[rule.id] += 1
+            if violation(rule, mode, owner, group) is not None:
+                self._failed[rule.id] += 1
+                if len(self._offenders[rule.id]) < MAX_OFFENDERS:
+                    self._offenders[rule.id].append(f"{path} ({mode} {owner}:{group})")
+
+    def results(self):
+        """rule id -> (status, value), the same pair the other rule evaluators return."""
+        results = {}
+        for rule in self.rules:
+            checked, failed = self._checked[rule.id], self._failed[rule.id]
+            if not checked:
+                if rule.recursive or not GLOB_CHARS.isdisjoint(rule.file):
+                    results[rule.id] = (True, f"no files match {rule.file}")
+                else:
+                    results[rule.id] = (False, f"{rule.file} not found")
+            elif failed:
+                more = ", ..." if failed > len(self._offenders[rule.id]) else ""
+                results[rule.id] = (
+                    False,
+                    f"{failed} of {checked} files: "
+                    + ", ".join(self._offenders[rule.id])
+                    + more,
+                )
+            else:
+                results[rule.id] = (True, f"{checked} files checked")
+        return results
+
+
+@functools.lru_cache(maxsize=256)
+def _user(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+
+@functools.lru_cache(maxsize=256)
+def _group(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+
+def _entry(path, st):
+    return format(stat.S_IMODE(st.st_mode), "o"), _user(st.st_uid), _group(st.st_gid), path
+
+
+def iter_local_entries(pattern, recursive):
+    """The (mode, owner, group, path) entries tree_command() would print for this machine."""
+    for root in sorted(glob.glob(pattern)):
+        try:
+            st = os.stat(root)
+        except OSError:
+            continue
+        yield _entry(root, st)
+        if not (recursive and stat.S_ISDIR(st.st_mode)):
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    continue
+                if not stat.S_ISLNK(st.st_mode):
+                    yield _entry(path, st)
+
+
+def scan_local(rules):
+    """TreeScan results for this machine, walking the file system in-process."""
+    scan = TreeScan(rules)
+    for index, (pattern, recursive) in enumerate(scan.specs):
+        for entry in iter_local_entries(pattern, recursive):
+            scan.add(index, *entry)
+    return scan.results()
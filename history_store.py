@@ -0,0 +1,214 @@
+import argparse
+import datetime
+import json
+import sqlite3
+import threading
+
+from sinks import ResultSink
+
+DEFAULT_DB = "Reports/audit_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL UNIQUE,
+    ip TEXT,
+    machine TEXT
+);
+CREATE TABLE IF NOT EXISTS check_results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    check_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expected TEXT,
+    actual_value TEXT,
+    scanned_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_check_status_time
+    ON check_results (check_name, status, scanned_at);
+CREATE INDEX IF NOT EXISTS idx_results_host_time
+    ON check_results (host_id, scanned_at);
+"""
+
+
+class HistoryStore:
+    """
+    SQLite audit history: runs, hosts and one row per check result.
+    Results are buffered and inserted with executemany in one transaction
+    per batch_size hosts, WAL mode keeps readers unblocked while a run writes.
+    """
+
+    def __init__(self, path=DEFAULT_DB, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._host_ids = {}
+
+    def start_run(self, label=None):
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, label) VALUES (?, ?)",
+                (datetime.datetime.now().isoformat(), label),
+            )
+        return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        self.flush()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE id = ?",
+                (datetime.datetime.now().isoformat(), run_id),
+            )
+
+    def add(self, run_id, record):
+        """Queue one host's report record (the dict written by Utils.write_report)."""
+        with self._lock:
+            self._pending.append((run_id, record))
+            if len(self._pending) < self.batch_size:
+                return
+            pending, self._pending = self._pending, []
+            self._insert(pending)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                self._insert(pending)
+
+    def _host_id(self, record):
+        target = record.get("target") or record.get("ip") or record.get("host")
+        host_id = self._host_ids.get(target)
+        if host_id is None:
+            self.conn.execute(
+                "INSERT INTO hosts (target, ip, machine) VALUES (?, ?, ?) "
+                "ON CONFLICT(target) DO UPDATE SET ip = excluded.ip, machine = excluded.machine",
+                (target, record.get("ip"), record.get("Machine")),
+            )
+            host_id = self.conn.execute(
+                "SELECT id FROM hosts WHERE target = ?", (target,)
+            ).fetchone()[0]
+            self._host_ids[target] = host_id
+        return host_id
+
+    def _insert(self, pending):
+        with self.conn:
+            rows = []
+            for run_id, record in pending:
+                host_id = self._host_id(record)
+                scanned_at = record.get("timestamp") or datetime.datetime.now().isoformat()
+                for result in record.get("result", []):
+                    rows.append(
+                        (
+                            run_id,
+                            host_id,
+                            result["name"],
+                            result["status"],
+                            json.dumps(result["expected"]),
+                            str(result["actual_value"]),
+                            scanned_at,
+                        )
+                    )
+            self.conn.executemany(
+                "INSERT INTO check_results (run_id, host_id, check_name, status, "
+                "expected, actual_value, scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def failing_hosts(self, check_name, days=30):
+        """Hosts that failed check_name at least once in the last `days` days."""
+        since = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+        return self.conn.execute(
+            "SELECT h.target, COUNT(*), MAX(r.scanned_at), "
+            "(SELECT actual_value FROM check_results l WHERE l.host_id = h.id "
+            " AND l.check_name = r.check_name ORDER BY l.scanned_at DESC LIMIT 1) "
+            "FROM check_results r JOIN hosts h ON h.id = r.host_id "
+            "WHERE r.check_name = ? AND r.status = 'FAIL' AND r.scanned_at >= ? "
+            "GROUP BY h.id ORDER BY MAX(r.scanned_at) DESC",
+            (check_name, since),
+        ).fetchall()
+
+    def host_history(self, target, days=30):
+        since = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat()
+        return self.conn.execute(
+            "SELECT r.scanned_at, r.check_name, r.status, r.actual_value "
+            "FROM check_results r JOIN hosts h ON h.id = r.host_id "
+            "WHERE h.target = ? AND r.scanned_at >= ? "
+            "ORDER BY r.scanned_at DESC, r.check_name",
+            (target, since),
+        ).fetchall()
+
+    def runs(self, limit=20):
+        return self.conn.execute(
+            "SELECT ru.id, ru.started_at, ru.finished_at, ru.label, "
+            "COUNT(DISTINCT r.host_id), SUM(r.status = 'FAIL') "
+            "FROM runs ru LEFT JOIN check_results r ON r.run_id = ru.id "
+            "GROUP BY ru.id ORDER BY ru.id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+class HistorySink(ResultSink):
+    """
+    Feeds scan records straight into a HistoryStore run.
+    own_store=True closes the store with the sink, for a store opened just for this run.
+    """
+
+    def __init__(self, store, label=None, own_store=False):
+        self.store = store
+        self.own_store = own_store
+        self.run_id = store.start_run(label)
+
+    def write(self, record):
+        self.store.add(self.run_id, record)
+
+    def close(self):
+        try:
+            self.store.finish_run(self.run_id)
+        finally:
+            if self.own_store:
+                self.store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the audit history database")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    failures = sub.add_parser("failures", help="hosts failing a check")
+    failures.add_argument("check")
+    failures.add_argument("--days", type=int, default=30)
+
+    host = sub.add_parser("host", help="check history of one host")
+    host.add_argument("target")
+    host.add_argument("--days", type=int, default=30)
+
+    runs = sub.add_parser("runs", help="recent scan runs")
+    runs.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+    store = HistoryStore(args.db)
+    if args.command == "failures":
+        for target, count, last_seen, value in store.failing_hosts(args.check, args.days):
+            print(f"{target:<20} failed {count:>3}x  last {last_seen}  value: {value}")
+    elif args.command == "host":
+        for scanned_at, check, status, value in store.host_history(args.target, args.days):
+            print(f"{scanned_at}  {check:<30} {status:<4}  {value}")
+    else:
+        for run_id, started, finished, label, hosts, failed in store.runs(args.limit):
+            print(f"#{run_id:<5} {started}  hosts: {hosts:<6} failed checks: {failed or 0:<6} {label or ''}")
+    store.close()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import pathlib
+import shlex
+import threading
+
+from catalog import CheckCatalog
+from filetree import tree_fingerprint_command, tree_key
+
+STATE_DIR = ".state"
+# ctime moves on chmod/chown as well as on writes, so permission checks are covered too.
+# %z/%y (not %Z/%Y) keep the sub-second part so back-to-back edits are seen
+STAT_FORMAT = "%n|%z|%y|%s|%i|%a|%u|%g"
+
+
+def fingerprint_command(paths, use_hash=False, tree_specs=()):
+    """
+    One remote command that fingerprints every path (missing files are simply
+    absent) and every glob / recursive root in tree_specs.
+    """
+    quoted = " ".join(shlex.quote(path) for path in paths)
+    command = f"stat -c '{STAT_FORMAT}' {quoted} 2>/dev/null"
+    if tree_specs:
+        command += "; " + tree_fingerprint_command(tree_specs)
+    if use_hash:
+        command += f"; echo '--'; sha256sum {quoted} 2>/dev/null"
+    return command + "; true"
+
+
+def parse_fingerprints(output):
+    fingerprints = {}
+    hashing = False
+    for line in output.splitlines():
+        if line == "--":
+            hashing = True
+        elif hashing:
+            digest, _, path = line.partition("  ")
+            if path in fingerprints:
+                fingerprints[path] += f"|{digest}"
+        else:
+            path, sep, rest = line.partition("|")
+            if sep:
+                fingerprints[path] = rest
+    return fingerprints
+
+
+class StateStore:
+    """Last fingerprints and results per host, one small JSON file each."""
+
+    def __init__(self, directory=STATE_DIR):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, host_key):
+        name = hashlib.sha1(host_key.encode()).hexdigest()[:16]
+        return self.directory / f"{name}.json"
+
+    def load(self, host_key):
+        try:
+            with open(self._path(host_key), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, host_key, state):
+        path = self._path(host_key)
+        # per writer: a shard process and a retry (or two sweeps) may save the same host at once
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+def run_checks_incremental(util, client, catalog, store, fetch_configs=True, use_hash=False):
+    """
+    Re-run only the rules whose target files changed since the last scan of
+    this host, reusing the stored results for everything else.
+    Returns (results, machine, ip, rerun_count).
+    """
+    host_key = util.host_key
+    # rules that don't apply to this host (catalog `when`) are never fingerprinted or run
+    catalog = catalog.for_facts(util.ensure_facts(client))
+    paths = list(catalog.by_file)
+    command = fingerprint_command(paths, use_hash, catalog.tree_specs)
+    _, out, _ = util.execute_command(client, command)
+    fingerprints = parse_fingerprints(out)
+    # glob / recursive rules are fingerprinted per root, by a checksum of its listing
+    keys = paths + [tree_key(*spec) for spec in catalog.tree_specs]
+
+    previous = store.load(host_key)
+    if previous is None or previous.get("catalog") != catalog.digest:
+        changed = set(keys)
+        previous = {"fingerprints": {}, "results": {}}
+    else:
+        old = previous["fingerprints"]
+        changed = {key for key in keys if fingerprints.get(key) != old.get(key)}
+
+    stale = [
+        rule
+        for rule in catalog.rules
+        if (tree_key(rule.file, rule.recursive) if rule.tree else rule.file) in changed
+        or rule.id not in previous["results"]
+    ]
+    fresh = {}
+    machine, ip = previous.get("machine", ""), previous.get("ip", "")
+    if stale:
+        results, machine, ip = util.run_checks_batched(
+            client, CheckCatalog(stale, catalog.profile, catalog.digest), fetch_configs
+        )
+        fresh = {rule.id: result for rule, result in zip(stale, results)}
+
+    merged = {**previous["results"], **fresh}
+    store.save(
+        host_key,
+        {
+            "catalog": catalog.digest,
+            "fingerprints": fingerprints,
+            "results": {rule.id: merged[rule.id] for rule in catalog.rules},
+            "machine": machine,
+            "ip": ip,
+        },
+    )
+    return [merged[rule.id] for rule in catalog.rules], machine, ip, len(stale)
@@ -0,0 +1,163 @@
+import bisect
+import collections
+import contextlib
+import json
+import threading
+import time
+
+# histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+class ScanTimings:
+    """
+    Thread-safe recorder for per-host / per-check phase durations
+    (connect, auth, exec, parse, write, host). Shared by all scan workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = collections.defaultdict(list)  # phase -> [seconds]
+        self.host_totals = collections.defaultdict(float)  # host -> seconds
+        self.host_phases = collections.defaultdict(dict)  # host -> phase -> seconds
+        self.check_times = collections.defaultdict(list)  # check -> [seconds]
+
+    def record(self, host, phase, seconds, check=None):
+        with self._lock:
+            self.samples[phase].append(seconds)
+            phases = self.host_phases[host]
+            phases[phase] = phases.get(phase, 0.0) + seconds
+            if phase == "host":
+                self.host_totals[host] += seconds
+            if check is not None:
+                self.check_times[check].append(seconds)
+
+    def merge(self, other):
+        """Fold in the samples of another recorder, e.g. one returned by a shard process."""
+        with self._lock:
+            for phase, values in other.samples.items():
+                self.samples[phase].extend(values)
+            for host, seconds in other.host_totals.items():
+                self.host_totals[host] += seconds
+            for host, phases in other.host_phases.items():
+                mine = self.host_phases[host]
+                for phase, seconds in phases.items():
+                    mine[phase] = mine.get(phase, 0.0) + seconds
+            for check, values in other.check_times.items():
+                self.check_times[check].extend(values)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, host, phase, check=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(host, phase, time.perf_counter() - start, check)
+
+    def summary(self):
+        with self._lock:
+            samples = {phase: sorted(values) for phase, values in self.samples.items()}
+            checks = {check: sorted(values) for check, values in self.check_times.items()}
+        return {
+            "phases": {phase: self._stats(values) for phase, values in samples.items()},
+            "checks": {check: self._stats(values) for check, values in checks.items()},
+        }
+
+    @staticmethod
+    def _stats(values):
+        counts = [0] * (len(BUCKETS) + 1)
+        for value in values:
+            counts[bisect.bisect_left(BUCKETS, value)] += 1
+        return {
+            "count": len(values),
+            "sum": sum(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": values[-1] if values else 0.0,
+            "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], counts)),
+        }
+
+    def slowest_hosts(self, top=10):
+        with self._lock:
+            ranked = sorted(self.host_totals.items(), key=lambda item: item[1], reverse=True)
+            return [(host, total, dict(self.host_phases[host])) for host, total in ranked[:top]]
+
+    def export_json(self, path):
+        data = self.summary()
+        data["slowest_hosts"] = [
+            {"host": host, "seconds": total, "phases": phases}
+            for host, total, phases in self.slowest_hosts(50)
+        ]
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def export_prometheus(self, path):
+        """Write the phase histograms in the Prometheus text exposition format."""
+        lines = [
+            "# HELP sca_phase_duration_seconds Duration of scan phases.",
+            "# TYPE sca_phase_duration_seconds histogram",
+        ]
+        for phase, stats in sorted(self.summary()["phases"].items()):
+            cumulative = 0
+            for le, count in stats["buckets"].items():
+                cumulative += count
+                lines.append(
+                    f'sca_phase_duration_seconds_bucket{{phase="{phase}",le="{le}"}} {cumulative}'
+                )
+            lines.append(f'sca_phase_duration_seconds_sum{{phase="{phase}"}} {stats["sum"]:.6f}')
+            lines.append(f'sca_phase_duration_seconds_count{{phase="{phase}"}} {stats["count"]}')
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def format_report(self, top=10):
+        summary = self.summary()
+        lines = ["Scan timing summary (seconds)"]
+        lines.append(f"{'phase':<10}{'count':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+        for phase, s in sorted(summary["phases"].items()):
+            lines.append(
+                f"{phase:<10}{s['count']:>8}{s['p50']:>10.3f}{s['p90']:>10.3f}"
+                f"{s['p99']:>10.3f}{s['max']:>10.3f}"
+            )
+        lines.append(f"Slowest hosts (top {top}):")
+        for host, total, phases in self.slowest_hosts(top):
+            detail = ", ".join(f"{p}={t:.2f}" for p, t in phases.items() if p != "host")
+            lines.append(f"  {host:<25} {total:8.2f}  ({detail})")
+        checks = sorted(summary["checks"].items(), key=lambda item: item[1]["p90"], reverse=True)
+        if checks:
+            lines.append(f"Slowest checks by p90 (top {top}):")
+            for check, s in checks[:top]:
+                lines.append(f"  {check:<35} p90={s['p90']:.3f} max={s['max']:.3f}")
+        return "\n".join(lines)
+
+
+class _NoTimings:
+    """Stand-in used when instrumentation is off, so call sites need no if-checks."""
+
+    def phase(self, host, phase, check=None):
+        return contextlib.nullcontext()
+
+    def record(self, host, phase, seconds, check=None):
+        pass
+
+
+NO_TIMINGS = _NoTimings()
@@ -0,0 +1,226 @@
+import csv
+import fnmatch
+import hashlib
+import ipaddress
+import json
+import queue
+import threading
+
+CHUNK_SIZE = 64 * 1024
+# hosts handed from the reader thread per queue item, amortises the queue locking
+BATCH_SIZE = 256
+
+
+def _normalise(entry):
+    """Same keys as hosts.json: Hostname, username, password, port and an optional tags list."""
+    machine = dict(entry)
+    if "Hostname" not in machine:
+        for alias in ("hostname", "host"):
+            if alias in machine:
+                machine["Hostname"] = machine.pop(alias)
+                break
+    if machine.get("port") not in (None, ""):
+        machine["port"] = int(machine["port"])
+    else:
+        machine.pop("port", None)
+    tags = machine.get("tags")
+    if isinstance(tags, str):
+        machine["tags"] = [t.strip() for t in tags.replace(",", ";").split(";") if t.strip()]
+    return machine
+
+
+def iter_json_array(f):
+    """
+    Yield the elements of a top-level JSON array one by one, reading the file
+    in CHUNK_SIZE pieces so only the current element is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # skip whitespace and separators, reading more when the buffer runs dry
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = f.read(CHUNK_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("inventory JSON ends before the closing ]")
+            return
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("inventory JSON must be an array of hosts")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(CHUNK_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+            continue
+        yield value
+        # the consumed prefix is dropped on the next read, not on every element
+        pos = end
+
+
+def iter_hosts(path):
+    """Stream host entries from a .json array, .jsonl/.ndjson or .csv inventory."""
+    path = str(path)
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    yield _normalise(json.loads(line))
+    elif path.endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                yield _normalise({k: v for k, v in row.items() if k and v not in (None, "")})
+    else:
+        with open(path, "r") as f:
+            for entry in iter_json_array(f):
+                yield _normalise(entry)
+
+
+def shard_index(machine, shards):
+    """Stable shard of a host: sha1 of host:port, the same in every process."""
+    key = f"{machine.get('Hostname')}:{machine.get('port', 22)}"
+    digest = hashlib.sha1(key.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+
+class HostFilter:
+    """
+    Selects inventory entries. Every given criterion must match:
+    tags    the host carries all of these tags
+    cidrs   the host address is inside one of these networks
+    globs   the hostname matches one of these fnmatch patterns
+    keys    host:port is in this set (a shard manifest)
+    shard   (index, count), only the hosts sharding.partition(..., "hash") puts there
+    """
+
+    def __init__(self, tags=None, cidrs=None, globs=None, keys=None, shard=None):
+        self.tags = set(tags or ())
+        self.cidrs = [ipaddress.ip_network(c, strict=False) for c in cidrs or ()]
+        self.globs = list(globs or ())
+        self.keys = set(keys) if keys is not None else None
+        self.shard = shard
+
+    def _in_cidrs(self, hostname):
+        try:
+            address = ipaddress.ip_address(hostname)
+        except ValueError:
+            return False
+        return any(address in network for network in self.cidrs)
+
+    def __call__(self, machine):
+        hostname = str(machine.get("Hostname"))
+        if self.tags and not self.tags.issubset(machine.get("tags") or ()):
+            return False
+        if self.cidrs and not self._in_cidrs(hostname):
+            return False
+        if self.globs and not any(fnmatch.fnmatch(hostname, g) for g in self.globs):
+            return False
+        if self.keys is not None and f"{hostname}:{machine.get('port', 22)}" not in self.keys:
+            return False
+        if self.shard is not None and shard_index(machine, self.shard[1]) != self.shard[0]:
+            return False
+        return True
+
+
+class Inventory:
+    """
+    A re-iterable, filtered view of an inventory file. Every iteration
+    re-reads the file (so each sweep sees inventory edits) on a reader
+    thread that stays at most prefetch hosts ahead of the consumer; the
+    bounded queue blocks the reader when the scanners fall behind.
+    Only paths and filters are stored, so an Inventory can be sent to
+    shard processes that then read their own slice.
+    """
+
+    def __init__(self, path, host_filter=None, prefetch=1000):
+        self.path = path
+        self.host_filter = host_filter
+        self.prefetch = prefetch
+
+    def with_filter(self, **criteria):
+        """A copy that additionally applies HostFilter(**criteria)."""
+        extra = HostFilter(**criteria)
+        base = self.host_filter
+        combined = extra if base is None else _AllOf(base, extra)
+        return Inventory(self.path, combined, self.prefetch)
+
+    def _entries(self):
+        for machine in iter_hosts(self.path):
+            if self.host_filter is None or self.host_filter(machine):
+                yield machine
+
+    def __iter__(self):
+        feed = queue.Queue(maxsize=max(1, self.prefetch // BATCH_SIZE))
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    feed.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read():
+            try:
+                batch = []
+                for machine in self._entries():
+                    batch.append(machine)
+                    if len(batch) >= BATCH_SIZE:
+                        if not put(batch):
+                            return
+                        batch = []
+                if batch and not put(batch):
+                    return
+                put(_END)
+            except Exception as exc:
+                put(_Failure(exc))
+
+        reader = threading.Thread(target=read, name="inventory-reader", daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = feed.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exc
+                yield from item
+        finally:
+            # consumer stopped early: let the reader thread exit
+            stop.set()
+
+
+class _AllOf:
+    def __init__(self, *filters):
+        self.filters = filters
+
+    def __call__(self, machine):
+        return all(f(machine) for f in self.filters)
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+_END = object()
@@ -0,0 +1,78 @@
+import os
+import platform
+import shutil
+import socket
+import stat
+
+from common import ScanData
+from config_index import is_sshd_config, parse_config
+from filetree import scan_local
+
+
+def stat_mode(path):
+    """os.stat equivalent of `stat -c '%a' path`, returned as an (exit, out, err) triple."""
+    try:
+        return 0, format(stat.S_IMODE(os.stat(path).st_mode), "o"), ""
+    except OSError as exc:
+        return 1, "", f"stat: cannot statx '{path}': {exc.strerror}"
+
+
+def read_config(path):
+    """Read and index a config file in one buffered pass, None if it can't be read."""
+    try:
+        with open(path, "r", errors="ignore") as f:
+            content = f.read()
+    except OSError:
+        return None
+    return parse_config(content, ignore_case=is_sshd_config(path))
+
+
+def collect_local(catalog):
+    """Gather what the catalog needs from this machine: one stat / one read per file."""
+    return ScanData(
+        modes={path: stat_mode(path) for path in catalog.permission_files},
+        indexes={path: read_config(path) for path in catalog.config_files},
+        trees=scan_local(catalog.tree_rules),
+    )
+
+
+def os_release_name(path="/etc/os-release"):
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                if line.startswith("NAME="):
+                    return line.split("=", 1)[1].strip().strip('"')
+    except OSError:
+        pass
+    return ""
+
+
+def local_facts():
+    """The FACTS_COMMAND facts of this machine, read in-process."""
+    facts = {}
+    try:
+        with open("/etc/os-release", "r") as f:
+            release = dict(
+                line.rstrip("\n").split("=", 1) for line in f if "=" in line
+            )
+    except OSError:
+        release = {}
+    for fact, key in (
+        ("os_id", "ID"),
+        ("os_version", "VERSION_ID"),
+        ("os_like", "ID_LIKE"),
+        ("os_name", "PRETTY_NAME"),
+    ):
+        facts[fact] = release.get(key, "").strip().strip('"')
+    uname = platform.uname()
+    facts.update(
+        machine=uname.system,
+        kernel=uname.release,
+        arch=uname.machine,
+        hostname=socket.gethostname(),
+    )
+    facts["pkg_manager"] = next(
+        (p for p in ("apt-get", "dnf", "yum", "zypper", "apk", "pacman") if shutil.which(p)),
+        "",
+    )
+    return facts
@@ -1,7 +1,25 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import json
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import functools
 import logging
+import os
+import time
+from bastion import JUMP_CHANNELS, BastionPool
+from catalog import load_catalog
 from common import Utils
+from incremental import StateStore
+from instrumentation import ScanTimings
+from scheduler import DurationHistory, FleetScheduler
+from drift import RunIndex, diff, latest_backup, write_drift
+from evalcache import EvalCache
+from facts import FactsCache
+from inventory import HostFilter, Inventory
+from results_matrix import ResultMatrix, tally
+from sampling import format_estimates, run_sampled, write_estimates
+from sharding import STRATEGIES, load_manifest, partition, write_shard_summary
+from sinks import make_sink
+from ssh_pool import SSHConnectionPool
+from templates.fleet_report_template import generate_fleet_report
 
 report_folder = "Reports"
 
@@ -11,7 +29,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def scan_single_machine(machine) -> dict:
+def scan_single_machine(machine, pool=None, state_store=None, sink=None, timings=None, deadline=None, facts_cache=None, probe=False, eval_cache=None, bastions=None, jump=None) -> dict:
     result = []
     pass_cnt = fail_cnt = 0
     compliance_score = 0
@@ -21,54 +39,267 @@ def scan_single_machine(machine) -> dict:
     password = machine.get('password')
     
     client = None
-    util = Utils(hostname,username,password)
-    
-    try:
-        client = util.create_ssh_connection()
-        if client:
-            result = util.run_security_checks(client,report_folder)
-            for r in result:
-                status = "✅ PASS" if r["status"]=="PASS" else "❌ FAIL"
-                logger.info(f"[{hostname}] {r['name']:<30} {status}")
-
-            pass_cnt = sum(1 for r in result if r["status"] == "PASS")
-            fail_cnt = sum(1 for r in result if r["status"] == "FAIL")
-            total_checks = len(result)
-            compliance_score = (pass_cnt / total_checks) * 100 if total_checks > 0 else 0
+    util = Utils(hostname,username,password,machine.get('port', 22),pool,timings,deadline,facts_cache,eval_cache,bastions,machine.get('jump') or jump)
+    with util.timings.phase(hostname, "host"):
+        try:
+            client = util.create_ssh_connection()
+            if client:
+                result = util.run_security_checks(client,report_folder,state_store=state_store,sink=sink,probe=probe)
+                for r in result:
+                    status = "✅ PASS" if r["status"]=="PASS" else "❌ FAIL"
+                    logger.info(f"[{hostname}] {r['name']:<30} {status}")
+
+                pass_cnt, fail_cnt, compliance_score = tally(result)
         
+                return {
+                    "hostname": hostname,
+                    "port": machine.get('port', 22),
+                    "pass_cnt": pass_cnt,
+                    "fail_cnt": fail_cnt,
+                    "score": compliance_score,
+                    "results": result
+                }
+            if deadline is not None and util.last_error is not None:
+                # let the scheduler decide between retry, timeout and failure
+                raise util.last_error
             return {
                 "hostname": hostname,
+                "port": machine.get('port', 22),
                 "pass_cnt": pass_cnt,
                 "fail_cnt": fail_cnt,
                 "score": compliance_score,
                 "results": result
             }
-        return {
-            "hostname": hostname,
-            "pass_cnt": pass_cnt,
-            "fail_cnt": fail_cnt,
-            "score": compliance_score,
-            "results": result
-        }
-    finally:
-        if client:
-            client.close()
-            logger.info(f"\n[{hostname}] ✅ SSH connection closed.")
+        finally:
+            if client:
+                util.close_ssh_connection()
+                if pool is None:
+                    logger.info(f"\n[{hostname}] ✅ SSH connection closed.")
             
-if __name__=="__main__":
-    Utils.rotate_reports()
-    results = []
-    try:
-        with open('hosts.json','r') as f:
-            machines = json.load(f)
-
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                futures = [executor.submit(scan_single_machine, machine) for machine in machines]
-                for future in as_completed(futures):
-                    try:
-                        results.append(future.result())
-                    except Exception as e:
-                        logging.error(f"Error scanning machine: {e}")
-    except Exception as e:
-        logger.error(f"Failed to load machines.json: {e}")
+def iter_scan_fleet(machines, max_workers=10, scheduler=None, **scan_options):
+    """
+    Scan every machine through a scheduler.FleetScheduler (deadlines, retries,
+    longest-first ordering) and yield the host summaries as they complete.
+    machines may be a list or a streamed inventory.Inventory; scan_options go
+    to scan_single_machine.
+    """
+    scheduler = scheduler or FleetScheduler(max_workers)
+    timed_out = []
+    for summary in scheduler.stream(machines, functools.partial(scan_single_machine, **scan_options)):
+        if summary.get("status") == "timeout":
+            timed_out.append(summary["hostname"])
+        yield summary
+    if timed_out:
+        logger.warning(f"{len(timed_out)} host(s) timed out: {', '.join(map(str, timed_out[:50]))}")
+
+def scan_fleet(machines, max_workers=10, scheduler=None, **scan_options):
+    return list(iter_scan_fleet(machines, max_workers, scheduler, **scan_options))
+
+class ScanContext:
+    """Long-lived state of one scanning process: connection pool, scheduler, incremental state and timings."""
+
+    def __init__(self, args):
+        self.args = args
+        self.pool = None if args.no_pool else SSHConnectionPool(ttl=max(args.interval * 2, 300))
+        self.state_store = StateStore() if args.incremental else None
+        self.timings = ScanTimings() if (args.timings or args.prometheus) else None
+        self.facts_cache = FactsCache(args.facts_ttl) if args.facts_ttl > 0 else None
+        self.eval_cache = EvalCache(args.eval_cache) if args.eval_cache > 0 else None
+        self.bastions = BastionPool(args.jump_channels)
+        self.scheduler = FleetScheduler(args.workers,args.host_timeout,args.connect_timeout,args.command_timeout,args.retries,history=DurationHistory())
+
+    def sweep(self, machines, prefix="audit"):
+        return list(self.iter_sweep(machines, prefix))
+
+    def iter_sweep(self, machines, prefix="audit"):
+        """Yields host summaries as they complete, so callers needn't hold the whole fleet."""
+        args = self.args
+        sink = make_sink(args.sink, report_folder, args.compress, args.history, prefix, args.drift)
+        try:
+            yield from iter_scan_fleet(machines, scheduler=self.scheduler, pool=self.pool, state_store=self.state_store, sink=sink, timings=self.timings, facts_cache=self.facts_cache, probe=args.probe, eval_cache=self.eval_cache, bastions=self.bastions, jump=args.jump)
+        finally:
+            sink.close()
+            if self.pool is not None:
+                self.pool.prune()
+                logger.info(f"[{prefix}] connection pool: {self.pool.metrics()}")
+            logger.info(f"[{prefix}] scheduler: {self.scheduler.stats}")
+            if self.eval_cache is not None:
+                logger.info(f"[{prefix}] eval cache: {self.eval_cache.stats()}")
+            if self.bastions.stats["tunnels"]:
+                logger.info(f"[{prefix}] bastions: {self.bastions.metrics()}")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+        self.bastions.close()
+
+_shard_context = None
+
+def scan_shard(index, machines, args):
+    """Runs in a shard process; the context (and its SSH pool) lives on between sweeps."""
+    global _shard_context
+    if _shard_context is None:
+        _shard_context = ScanContext(args)
+    results = _shard_context.sweep(machines, f"audit-shard{index:02d}")
+    timings = _shard_context.timings
+    if timings is not None:
+        # hand this sweep's samples to the parent and start afresh
+        _shard_context.timings = ScanTimings()
+    return results, timings
+
+class ShardedScan:
+    """
+    Splits the fleet across N processes, each with its own scheduler and
+    worker threads, so SSH crypto and result processing aren't serialised on
+    one GIL. Every shard keeps its own single-process executor, so a host's
+    pooled connection and state stay in the same process between sweeps.
+    """
+
+    def __init__(self, args, processes):
+        self.args = args
+        self.processes = processes
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(processes)]
+        self.timings = []
+
+    def sweep(self, machines):
+        if isinstance(machines, Inventory) and self.args.shard_by == "hash":
+            # every shard process streams the inventory itself and keeps its own slice
+            shards = [machines.with_filter(shard=(index, self.processes)) for index in range(self.processes)]
+        else:
+            shards = partition(machines, self.processes, self.args.shard_by)
+        futures = [
+            executor.submit(scan_shard, index, shard, self.args)
+            for index, (executor, shard) in enumerate(zip(self.executors, shards))
+        ]
+        results, self.timings = [], []
+        for index, future in enumerate(futures):
+            try:
+                shard_results, timings = future.result()
+            except Exception as e:
+                logger.error(f"Shard {index} failed: {e}")
+                shard_results = [
+                    {"hostname": m.get('Hostname'), "pass_cnt": 0, "fail_cnt": 0, "score": 0, "results": [], "status": "error", "error": f"shard failed: {e}"}
+                    for m in shards[index]
+                ]
+                timings = None
+            results.extend(shard_results)
+            if timings is not None:
+                self.timings.append(timings)
+        return results
+
+    def close(self):
+        for executor in self.executors:
+            executor.shutdown()
+
+def build_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--inventory', default='hosts.json', help="hosts as a .json array, .jsonl or .csv, streamed")
+    parser.add_argument('--tag', action='append', help="only hosts carrying this tag (repeatable, all must match)")
+    parser.add_argument('--cidr', action='append', help="only hosts inside this network (repeatable)")
+    parser.add_argument('--host-glob', action='append', help="only hostnames matching this pattern (repeatable)")
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--sweeps', type=int, default=1, help="number of sweeps, 0 runs forever")
+    parser.add_argument('--interval', type=float, default=300, help="seconds between sweeps")
+    parser.add_argument('--no-pool', action='store_true', help="reconnect to every host on every sweep")
+    parser.add_argument('--incremental', action='store_true', help="only re-run checks whose files changed since the last scan")
+    parser.add_argument('--sink', choices=['json', 'jsonl'], default='json', help="per-host JSON files or one JSON Lines stream")
+    parser.add_argument('--compress', choices=['gzip', 'zstd'], help="compression for the jsonl sink")
+    parser.add_argument('--history', metavar='DB', help="also record results in this SQLite history database")
+    parser.add_argument('--open-report', action='store_true', help="open the fleet HTML report in a browser")
+    parser.add_argument('--probe', action='store_true', help="run one generated python probe per host, shell checks where python is missing")
+    parser.add_argument('--eval-cache', type=int, default=256, help="config indexes / verdicts cached by content hash, 0 disables")
+    parser.add_argument('--facts-ttl', type=float, default=3600, help="seconds host facts are cached on disk, 0 disables")
+    parser.add_argument('--drift', action='store_true', help="write Reports/drift.jsonl with only the changes since the previous sweep")
+    parser.add_argument('--jump', metavar='[USER@]HOST[:PORT]', help="reach hosts through this bastion, an inventory 'jump' field overrides it")
+    parser.add_argument('--jump-channels', type=int, default=JUMP_CHANNELS, help="concurrent tunnels per bastion transport")
+    parser.add_argument('--connect-timeout', type=float, default=10, help="seconds for TCP connect, banner and auth")
+    parser.add_argument('--command-timeout', type=float, default=30, help="seconds for one remote command")
+    parser.add_argument('--host-timeout', type=float, default=120, help="seconds for the whole scan of one host")
+    parser.add_argument('--retries', type=int, default=2, help="retries for transient connection failures")
+    parser.add_argument('--processes', type=int, default=1, help="scan in this many shard processes, each with its own workers")
+    parser.add_argument('--shard-by', choices=STRATEGIES, default='hash', help="how hosts are split across --processes")
+    parser.add_argument('--manifest', metavar='FILE', help="only scan the hosts of this shard manifest (see sharding.py split)")
+    parser.add_argument('--sample', type=int, metavar='N', help="scan N random hosts per stratum and estimate fleet failure rates instead of a full sweep")
+    parser.add_argument('--stratify-by', default='tags', help="strata for --sample: tags, subnet or an inventory field such as image")
+    parser.add_argument('--precision', type=float, help="with --sample, widen the sample until every interval is within +/- this (e.g. 0.05)")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the --sample intervals")
+    parser.add_argument('--seed', help="seed of the --sample draw, random by default")
+    parser.add_argument('--parquet', metavar='FILE', help="also write the host x check results as Parquet (needs pyarrow)")
+    parser.add_argument('--timings', metavar='FILE', help="write per-phase timing histograms as JSON")
+    parser.add_argument('--prometheus', metavar='FILE', help="write timing histograms in Prometheus text format")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if os.path.exists(args.inventory):
+        machines = Inventory(args.inventory, HostFilter(args.tag, args.cidr, args.host_glob))
+    else:
+        logger.error(f"Failed to load {args.inventory}: no such file")
         machines = []
+
+    manifest = None
+    if args.manifest and machines:
+        manifest = load_manifest(args.manifest)
+        machines = machines.with_filter(keys=manifest["hosts"])
+        logger.info(f"Shard {manifest['shard']}/{manifest['shards']}: {len(manifest['hosts'])} hosts")
+
+    if args.processes > 1:
+        scanner = ShardedScan(args, args.processes)
+        timings = ScanTimings() if (args.timings or args.prometheus) else None
+    else:
+        scanner = ScanContext(args)
+        timings = scanner.timings
+    # the catalog every host is scanned with, its rule tags group the failure rates
+    catalog = load_catalog()
+
+    sweep = 0
+    try:
+        while True:
+            Utils.rotate_reports()
+            if args.sample:
+                # only the sampled hosts are scanned, the reports below cover just them
+                estimates, results = run_sampled(scanner.sweep, machines, args.sample, args.stratify_by, args.precision, args.confidence, seed=args.seed)
+                print(format_estimates(estimates))
+                logger.info(f"Estimates written to {write_estimates(estimates, os.path.join(report_folder, 'sample_estimate.json'))}")
+            elif args.processes > 1 or manifest is not None:
+                results = scanner.sweep(machines)
+            else:
+                # the fleet report consumes summaries as they arrive
+                results = scanner.iter_sweep(machines)
+            if args.processes > 1 and timings is not None:
+                for shard_timings in scanner.timings:
+                    timings.merge(shard_timings)
+            if manifest is not None:
+                path = os.path.join(report_folder, f"shard-{manifest['shard']:02d}.summary.json")
+                write_shard_summary(path, results, manifest)
+                logger.info(f"Shard summary written to {path}, merge with: python sharding.py merge")
+            matrix = ResultMatrix.from_summaries(results, catalog)
+            report = generate_fleet_report(matrix, os.path.join(report_folder, "fleet_report.html"), args.open_report)
+            logger.info(f"Fleet report written to {report}")
+            for tag, group in sorted(matrix.by_tag().items()):
+                logger.info(f"[{tag}] failure rate {group['failure_rate']:.1%} ({group['failed']}/{group['run']})")
+            if args.parquet:
+                logger.info(f"Results written to {matrix.write_parquet(args.parquet)}")
+            if args.drift:
+                baseline = latest_backup(report_folder)
+                if baseline is not None:
+                    drift_path = os.path.join(report_folder, "drift.jsonl")
+                    counts = write_drift(diff(RunIndex.load(baseline), RunIndex.load(report_folder)), drift_path)
+                    logger.info(f"Drift vs {baseline}: {counts or 'no changes'}")
+            sweep += 1
+            logger.info(f"Sweep {sweep} done")
+            if args.sweeps and sweep >= args.sweeps:
+                break
+            time.sleep(args.interval)
+    finally:
+        scanner.close()
+        if timings is not None:
+            print(timings.format_report())
+            if args.timings:
+                timings.export_json(args.timings)
+            if args.prometheus:
+                timings.export_prometheus(args.prometheus)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,88 @@
+import functools
+import json
+import pathlib
+
+from config_index import ConfigIndex, is_sshd_config
+
+PROBE_MISSING = 127
+PROBE_DELIMITER = "__SCA_PROBE__"
+
+# the probe parses config files with the exact same code as the control node
+_CONFIG_INDEX_SOURCE = (pathlib.Path(__file__).resolve().parent / "config_index.py").read_text()
+
+# Kept to what both python 2.6+ and python 3 accept, old targets often only have /usr/bin/python.
+_PROBE_BODY = r'''
+import io, os, stat, sys
+
+def _mode(path):
+    try:
+        return [0, "%o" % stat.S_IMODE(os.stat(path).st_mode), ""]
+    except OSError as exc:
+        return [1, "", "stat: cannot statx '%s': %s" % (path, exc.strerror)]
+
+def _keys(path, wanted):
+    try:
+        f = io.open(path, "r", errors="ignore")
+        try:
+            text = f.read()
+        finally:
+            f.close()
+    except (IOError, OSError):
+        return None
+    index = parse_config(text, ignore_case=is_sshd_config(path))
+    return dict((key, [index.get(key), index.line(key)]) for key in wanted if key in index)
+
+sys.stdout.write(json.dumps({
+    "modes": dict((path, _mode(path)) for path in SPEC["modes"]),
+    "configs": dict((path, _keys(path, keys)) for path, keys in SPEC["configs"].items()),
+}, separators=(",", ":")))
+'''
+
+
+@functools.lru_cache(maxsize=64)
+def build_probe(catalog):
+    """
+    Shell command that runs a self-contained python probe for the catalog:
+    it stats every permission file and pulls only the wanted keys out of
+    every config file on the target, printing one compact JSON document.
+    Exits PROBE_MISSING when the target has no python interpreter.
+    """
+    configs = {}
+    for rule in catalog.by_type.get("config_value", ()):
+        configs.setdefault(rule.file, [])
+        if rule.key not in configs[rule.file]:
+            configs[rule.file].append(rule.key)
+    spec = {"modes": list(catalog.permission_files), "configs": configs}
+    script = "\n".join(
+        (
+            "import json",
+            _CONFIG_INDEX_SOURCE,
+            f"SPEC = json.loads({json.dumps(spec, separators=(',', ':'))!r})",
+            _PROBE_BODY,
+        )
+    )
+    return (
+        "__sca_py=; for p in python3 python; do "
+        'command -v $p >/dev/null 2>&1 && { __sca_py=$p; break; }; done\n'
+        f'[ -n "$__sca_py" ] || exit {PROBE_MISSING}\n'
+        f"$__sca_py - <<'{PROBE_DELIMITER}'\n{script}\n{PROBE_DELIMITER}"
+    )
+
+
+def parse_probe(output, catalog):
+    """
+    Turn the probe's JSON into (modes, indexes) for common.ScanData.
+    The rebuilt ConfigIndex only holds the keys the catalog asked for.
+    """
+    payload = json.loads(output)
+    indexes = {}
+    for path, keys in payload["configs"].items():
+        if keys is None:
+            indexes[path] = None
+            continue
+        index = indexes[path] = ConfigIndex(ignore_case=is_sshd_config(path))
+        for key, (value, line) in keys.items():
+            index.values[index._key(key)] = value
+            index.lines[index._key(key)] = line
+    modes = {path: tuple(mode) for path, mode in payload["modes"].items()}
+    return modes, indexes
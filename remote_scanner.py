@@ -1,15 +1,11 @@
+import argparse
 import logging
-import os
-import json
-import datetime
-import pathlib
-import socket
-import paramiko
-import dotenv
-import shlex
-from templates.report_template import generate_html_report
+import sys
 # from Utils import rotate_reports
+from bastion import BastionPool
 from common import Utils
+from inventory import Inventory
+from results_matrix import tally
 
 report_folder = "Reports"
 
@@ -19,29 +15,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def scan_single_machine(machine) -> dict:
+def error_row(hostname, error):
+    return {"hostname": hostname, "pass_count": 0, "fail_count": 0, "total_checks": 0, "compliance_score": 0, "error": str(error)}
+
+def scan_single_machine(machine, bastions=None, jump=None) -> dict:
     hostname = machine.get('Hostname')
     username = machine.get('username')
     password = machine.get('password')
 
-    util = Utils(hostname,username,password)
+    util = Utils(hostname,username,password,machine.get('port', 22),bastions=bastions,jump=machine.get('jump') or jump)
     client = util.create_ssh_connection()
+    if not client:
+        return error_row(hostname, util.last_error)
 
-    if client:
+    try:
         result = util.run_security_checks(client,report_folder)
         for r in result:
             status = "✅ PASS" if r["status"]=="PASS" else "❌ FAIL"
             logger.info(f"{r['name']:<30} {status} (Actual: {r['actual_value']}, Expected: {r['expected']})")
 
-        pass_cnt = sum(1 for r in result if r["status"] == "PASS")
-        fail_cnt = sum(1 for r in result if r["status"] == "FAIL")
+        pass_cnt, fail_cnt, compliance_score = tally(result)
         total_checks = len(result)
-        compliance_score = (pass_cnt / total_checks) * 100 if total_checks > 0 else 0
-    
-        transport = client.get_transport()
-
-    if transport and transport.is_active():
-        client.close()
+    finally:
+        # also after a failed or timed out check run, so the host's connection (and bastion tunnel) is freed
+        util.close_ssh_connection()
         logger.info("\n✅ SSH connection closed.")
 
     return {
@@ -52,17 +49,35 @@ def scan_single_machine(machine) -> dict:
         "compliance_score": compliance_score
     }
 
-if __name__=="__main__":
-    
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="scan every host of the inventory one after another")
+    parser.add_argument('--inventory', default='hosts.json', help="hosts as a .json array, .jsonl or .csv, streamed")
+    parser.add_argument('--jump', metavar='[USER@]HOST[:PORT]', help="reach hosts through this bastion, an inventory 'jump' field overrides it")
+    args = parser.parse_args(argv)
+    # one transport per bastion for the whole run, every host is a channel on it
+    bastions = BastionPool()
+
     Utils.rotate_reports()
     
+    results = []
     try:
-        results = []
-        with open('hosts.json','r') as f:
-            machines = json.load(f)
-            for machine in machines:
-                results.append(scan_single_machine(machine))
+        # streamed one host at a time, the inventory is never loaded whole
+        for machine in Inventory(args.inventory):
+            try:
+                results.append(scan_single_machine(machine, bastions, args.jump))
+            except Exception as e:
+                # e.g. a CommandTimeout: record the host and go on with the next one
+                logger.error(f"[{machine.get('Hostname')}] scan failed: {e!r}")
+                results.append(error_row(machine.get('Hostname'), e))
 
     except Exception as e:
-        logger.error(f"Failed to load machines.json: {e}")
-        machines = []
\ No newline at end of file
+        logger.error(f"Failed to load {args.inventory}: {e}")
+        return 1
+    finally:
+        bastions.close()
+    failed = sum(1 for r in results if "error" in r)
+    logger.info(f"Scanned {len(results)} hosts, {failed} failed")
+    return 0
+
+if __name__=="__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,290 @@
+import array
+import json
+import sys
+
+# optional, imported on first use so tally() callers and plain scans never load them
+numpy = pyarrow = None
+_tried = set()
+
+NOT_RUN, PASS, FAIL = 0, 1, 2
+STATUS_NAMES = ("", "PASS", "FAIL")
+
+
+def _load_numpy():
+    global numpy
+    if "numpy" not in _tried:
+        _tried.add("numpy")
+        try:
+            import numpy
+        except ImportError:  # aggregates fall back to bytearray counting, still C speed
+            numpy = None
+
+
+def _load_pyarrow():
+    global pyarrow
+    if "pyarrow" not in _tried:
+        _tried.add("pyarrow")
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:  # Arrow / Parquet export is optional
+            pyarrow = None
+
+
+def tally(results):
+    """(pass_cnt, fail_cnt, score) of one host's result list, in a single pass."""
+    passed = failed = 0
+    for r in results:
+        if r["status"] == "PASS":
+            passed += 1
+        elif r["status"] == "FAIL":
+            failed += 1
+    return passed, failed, (passed / len(results)) * 100 if results else 0
+
+
+class ResultMatrix:
+    """
+    Fleet results in columnar form: a hosts x checks status matrix, one byte
+    per cell (NOT_RUN / PASS / FAIL) in a flat row-major bytearray, check
+    names interned once as columns, and actual values interned into a side
+    table referenced by a parallel uint32 code per cell.
+    numpy, when installed, only ever gets a zero-copy view of the bytearray.
+    """
+
+    def __init__(self, checks=(), tags=None):
+        _load_numpy()
+        self.checks = []
+        self._check_index = {}
+        self.tags = dict(tags or {})  # check name -> tags
+        self.hosts = []
+        self.errors = {}  # row -> (status, error) of hosts that produced no results
+        self.status = bytearray()
+        self.value_codes = array.array("I")
+        self.values = [None]
+        self._value_index = {}
+        for name in checks:
+            self._column(name)
+
+    @classmethod
+    def for_catalog(cls, catalog):
+        """Columns laid out up front from a CheckCatalog, so rows never need re-striding."""
+        return cls(
+            [rule.name for rule in catalog.rules],
+            {rule.name: rule.tags for rule in catalog.rules},
+        )
+
+    @classmethod
+    def from_summaries(cls, summaries, catalog=None):
+        """Build from scan_single_machine() / AsyncScanner host summaries (consumed lazily)."""
+        matrix = cls.for_catalog(catalog) if catalog is not None else cls()
+        for summary in summaries:
+            results = summary.get("results") or []
+            error = summary.get("error") or ("" if results else "no results")
+            # a failed host's partial results are not counted, as in the fleet report
+            matrix.add(
+                str(summary.get("hostname")),
+                [] if error else results,
+                error,
+                summary.get("status"),
+            )
+        return matrix
+
+    @classmethod
+    def from_records(cls, records, catalog=None):
+        """Build from per-host report records (PerHostJsonSink / JsonLinesSink output)."""
+        matrix = cls.for_catalog(catalog) if catalog is not None else cls()
+        for record in records:
+            matrix.add(str(record.get("target") or record.get("ip")), record.get("result") or [])
+        return matrix
+
+    @property
+    def width(self):
+        return len(self.checks)
+
+    def _column(self, name):
+        index = self._check_index.get(name)
+        if index is None:
+            index = self._check_index[name] = len(self.checks)
+            self.checks.append(sys.intern(name))
+            if self.hosts:
+                self._restride(len(self.checks) - 1)
+        return index
+
+    def _restride(self, old):
+        # a check first seen after some rows were added, rare once a catalog lays out the columns
+        width = len(self.checks)
+        status = bytearray(len(self.hosts) * width)
+        codes = array.array("I", bytes(status) * 4)
+        for row in range(len(self.hosts)):
+            status[row * width : row * width + old] = self.status[row * old : (row + 1) * old]
+            codes[row * width : row * width + old] = self.value_codes[row * old : (row + 1) * old]
+        self.status, self.value_codes = status, codes
+
+    def _value(self, value):
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            value = json.dumps(value, default=str)
+        # typed key so 1, 1.0, True and "1" stay distinct values
+        key = (type(value).__name__, value)
+        code = self._value_index.get(key)
+        if code is None:
+            code = self._value_index[key] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def add(self, host, results, error="", status=None):
+        """Append one host's result list as a row, returns the row index."""
+        columns = [self._column(r["name"]) for r in results]
+        row = len(self.hosts)
+        self.hosts.append(host)
+        width = self.width
+        self.status.extend(bytes(width))
+        self.value_codes.frombytes(bytes(4 * width))
+        base = row * width
+        for column, r in zip(columns, results):
+            self.status[base + column] = PASS if r["status"] == "PASS" else FAIL
+            self.value_codes[base + column] = self._value(r.get("actual_value"))
+        if error:
+            self.errors[row] = (status or "unreachable", error)
+        return row
+
+    def _grid(self):
+        return numpy.frombuffer(self.status, dtype=numpy.uint8).reshape(len(self.hosts), self.width)
+
+    def row_counts(self, code):
+        """Per host (row order), how many cells hold this status code."""
+        width = self.width
+        if numpy is not None and width:
+            return (self._grid() == code).sum(axis=1).tolist()
+        return [self.status.count(code, row * width, (row + 1) * width) for row in range(len(self.hosts))]
+
+    def column_counts(self, code):
+        """Per check (column order), how many hosts hold this status code."""
+        width = self.width
+        if numpy is not None and self.hosts:
+            return (self._grid() == code).sum(axis=0).tolist()
+        return [self.status[column::width].count(code) for column in range(width)] if self.hosts else [0] * width
+
+    def host_scores(self):
+        """Compliance percentage per host, row order (0 for hosts without results)."""
+        return [
+            passed * 100 / (passed + failed) if passed + failed else 0
+            for passed, failed in zip(self.row_counts(PASS), self.row_counts(FAIL))
+        ]
+
+    def check_failure_rates(self):
+        """check name -> share of the hosts that ran it that failed it."""
+        failed = self.column_counts(FAIL)
+        missing = self.column_counts(NOT_RUN)
+        hosts = len(self.hosts)
+        return {
+            name: failed[i] / (hosts - missing[i]) if hosts - missing[i] else 0.0
+            for i, name in enumerate(self.checks)
+        }
+
+    def by_tag(self):
+        """tag -> checks, cells run, cells failed and failure rate across the fleet."""
+        failed = self.column_counts(FAIL)
+        missing = self.column_counts(NOT_RUN)
+        hosts = len(self.hosts)
+        groups = {}
+        for i, name in enumerate(self.checks):
+            for tag in self.tags.get(name) or ("untagged",):
+                group = groups.setdefault(tag, {"checks": 0, "run": 0, "failed": 0})
+                group["checks"] += 1
+                group["run"] += hosts - missing[i]
+                group["failed"] += failed[i]
+        for group in groups.values():
+            group["failure_rate"] = group["failed"] / group["run"] if group["run"] else 0.0
+        return groups
+
+    def failed_checks(self, row):
+        """Column indexes of the checks this host failed."""
+        width = self.width
+        if numpy is not None and width:
+            return numpy.flatnonzero(self._grid()[row] == FAIL).tolist()
+        cells = self.status[row * width : (row + 1) * width]
+        return [column for column, code in enumerate(cells) if code == FAIL]
+
+    def band_counts(self, bands):
+        """
+        Failed and run counts per check per band, bands being lists of rows
+        (host indexes) grouped by the caller: returns (fail[check][band], total[check][band]).
+        """
+        width = self.width
+        fail = [[0] * len(bands) for _ in range(width)]
+        total = [[0] * len(bands) for _ in range(width)]
+        if numpy is not None and width:
+            grid = self._grid()
+            for b, members in enumerate(bands):
+                if not members:
+                    continue
+                cells = grid[members]
+                for column, (f, t) in enumerate(
+                    zip((cells == FAIL).sum(axis=0).tolist(), (cells != NOT_RUN).sum(axis=0).tolist())
+                ):
+                    fail[column][b], total[column][b] = f, t
+            return fail, total
+        for b, members in enumerate(bands):
+            for row in members:
+                cells = self.status[row * width : (row + 1) * width]
+                for column, code in enumerate(cells):
+                    if code:
+                        total[column][b] += 1
+                        if code == FAIL:
+                            fail[column][b] += 1
+        return fail, total
+
+    def value(self, row, column):
+        return self.values[self.value_codes[row * self.width + column]]
+
+    def nbytes(self):
+        """Bytes held by the matrix and the value codes (the side table is shared by equal values)."""
+        return len(self.status) + self.value_codes.itemsize * len(self.value_codes)
+
+    def to_arrow(self):
+        """
+        Long-format pyarrow.Table, one row per check that ran on a host:
+        host, check, status (dictionary encoded) and actual_value as text.
+        """
+        _load_pyarrow()
+        if pyarrow is None:
+            raise ValueError("Arrow / Parquet export needs the pyarrow package")
+        width = self.width
+        if numpy is not None:
+            flat = numpy.frombuffer(self.status, dtype=numpy.uint8)
+            cells = numpy.flatnonzero(flat)
+            host_ids = (cells // width).astype(numpy.uint32)
+            check_ids = (cells % width).astype(numpy.uint32)
+            codes = flat[cells].astype(numpy.uint32)
+            values = numpy.frombuffer(self.value_codes, dtype=numpy.uint32)[cells]
+        else:
+            host_ids, check_ids, codes, values = (array.array("I") for _ in range(4))
+            for index, code in enumerate(self.status):
+                if code:
+                    row, column = divmod(index, width)
+                    host_ids.append(row)
+                    check_ids.append(column)
+                    codes.append(code)
+                    values.append(self.value_codes[index])
+        text = [None if v is None else v if isinstance(v, str) else json.dumps(v, default=str) for v in self.values]
+        return pyarrow.table(
+            {
+                "host": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(host_ids, pyarrow.uint32()), pyarrow.array(self.hosts, pyarrow.string())
+                ),
+                "check": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(check_ids, pyarrow.uint32()), pyarrow.array(self.checks, pyarrow.string())
+                ),
+                "status": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(codes, pyarrow.uint32()), pyarrow.array(STATUS_NAMES, pyarrow.string())
+                ),
+                "actual_value": pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(values, pyarrow.uint32()), pyarrow.array(text, pyarrow.string())
+                ),
+            }
+        )
+
+    def write_parquet(self, path):
+        table = self.to_arrow()
+        pyarrow.parquet.write_table(table, path)
+        return path
@@ -0,0 +1,226 @@
+"""
+Stratified sampling scans: estimate per-check failure rates for the whole
+fleet from a random sample of hosts in every stratum (tag set, image,
+subnet, ...), with confidence intervals, optionally widening the sample
+until every interval is narrow enough.
+
+    python parallel_remote_scanner.py --sample 10 --stratify-by image --precision 0.05
+"""
+import collections
+import datetime
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import statistics
+
+from results_matrix import ResultMatrix
+from sharding import host_key, subnet_of
+
+logger = logging.getLogger(__name__)
+
+# hosts ever drawn from one stratum, bounds the memory of a streamed inventory
+MAX_PER_STRATUM = 2000
+
+
+def stratum_of(machine, by="tags"):
+    """
+    The stratum of a host: its sorted tag set ("tags"), its /24 ("subnet"),
+    or the value of any other inventory field such as "image".
+    """
+    if by == "tags":
+        return ",".join(sorted(machine.get("tags") or ())) or "untagged"
+    if by == "subnet":
+        return subnet_of(str(machine.get("Hostname")))
+    value = machine.get(by)
+    return str(value) if value not in (None, "") else "unknown"
+
+
+class StratifiedSample:
+    """
+    One pass over the inventory: hosts per stratum are counted, and the
+    max_per_stratum hosts with the lowest seeded hash are kept in that order
+    (bottom-k), so any prefix of a stratum is a uniform random sample and
+    widening it never draws a host twice.
+    """
+
+    def __init__(self, machines, by="tags", max_per_stratum=MAX_PER_STRATUM, seed=None):
+        self.by = by
+        self.seed = os.urandom(8).hex() if seed is None else str(seed)
+        self.population = collections.Counter()
+        heaps = collections.defaultdict(list)
+        for machine in machines:
+            stratum = stratum_of(machine, by)
+            self.population[stratum] += 1
+            # max-heap on the rank, so the highest rank is the one dropped
+            item = (-self._rank(machine), self.population[stratum], machine)
+            if len(heaps[stratum]) < max_per_stratum:
+                heapq.heappush(heaps[stratum], item)
+            else:
+                heapq.heappushpop(heaps[stratum], item)
+        self.ranked = {
+            stratum: [machine for _, _, machine in sorted(heap, reverse=True)]
+            for stratum, heap in heaps.items()
+        }
+        self.taken = dict.fromkeys(self.ranked, 0)
+
+    def _rank(self, machine):
+        digest = hashlib.blake2b(f"{self.seed}:{host_key(machine)}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big")
+
+    def remaining(self, stratum):
+        return len(self.ranked[stratum]) - self.taken[stratum]
+
+    def draw(self, allocation):
+        """(stratum, machine) pairs for up to allocation[stratum] more hosts of each stratum."""
+        drawn = []
+        for stratum, count in allocation.items():
+            start = self.taken[stratum]
+            end = min(start + count, len(self.ranked[stratum]))
+            drawn.extend((stratum, machine) for machine in self.ranked[stratum][start:end])
+            self.taken[stratum] = end
+        return drawn
+
+
+def _adjusted(failed, total, z):
+    # Agresti-Coull: keeps the variance honest for 0/n and n/n strata
+    return (failed + z * z / 2) / (total + z * z)
+
+
+def estimate(matrix, strata_rows, population, confidence=0.95):
+    """
+    Stratified failure-rate estimate per check, weighting each stratum by
+    its share of the fleet: {check: {"rate", "low", "high", "hosts"}}.
+    strata_rows maps a stratum to the matrix rows of its sampled hosts; a
+    stratum whose sample never ran a check is left out of that check.
+    """
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    names = list(strata_rows)
+    fail, total = matrix.band_counts([strata_rows[name] for name in names])
+    estimates = {}
+    for column, check in enumerate(matrix.checks):
+        strata = [
+            (population[name], fail[column][b], total[column][b])
+            for b, name in enumerate(names)
+            if total[column][b]
+        ]
+        size = sum(n for n, _, _ in strata)
+        if not size:
+            continue
+        rate = variance = 0.0
+        for n, failed, ran in strata:
+            weight = n / size
+            rate += weight * failed / ran
+            # finite population correction: a fully scanned stratum adds no uncertainty
+            fpc = (n - ran) / (n - 1) if n > 1 else 0.0
+            p = _adjusted(failed, ran, z)
+            variance += weight * weight * fpc * p * (1 - p) / (ran + z * z)
+        half = z * math.sqrt(variance)
+        estimates[check] = {
+            "rate": rate,
+            "low": max(0.0, rate - half),
+            "high": min(1.0, rate + half),
+            "hosts": sum(ran for _, _, ran in strata),
+        }
+    return estimates
+
+
+def widen(sample, matrix, strata_rows, budget, z=1.96):
+    """
+    Neyman allocation of budget more hosts: strata get them in proportion to
+    their size times the spread of their worst check, capped by what is left.
+    """
+    names = [name for name in strata_rows if sample.remaining(name)]
+    fail, total = matrix.band_counts([strata_rows[name] for name in names])
+    weights = {}
+    for b, name in enumerate(names):
+        spread = max(
+            (
+                math.sqrt(p * (1 - p))
+                for p in (_adjusted(fail[c][b], total[c][b], z) for c in range(matrix.width))
+            ),
+            default=0.5,
+        )
+        weights[name] = sample.population[name] * spread
+    scale = sum(weights.values())
+    if not scale:
+        return {}
+    return {
+        name: min(sample.remaining(name), max(1, math.ceil(budget * weight / scale)))
+        for name, weight in weights.items()
+    }
+
+
+def run_sampled(sweep, machines, per_stratum, by="tags", precision=None, confidence=0.95,
+                max_per_stratum=MAX_PER_STRATUM, seed=None, max_rounds=10):
+    """
+    Scan per_stratum hosts of every stratum through sweep (a callable taking
+    a list of machines and returning host summaries) and estimate; with a
+    precision, keep widening the sample until every check's interval
+    half-width is at most precision, the sample is exhausted or max_rounds
+    is reached. Returns (report, the host summaries scanned).
+    """
+    sample = StratifiedSample(machines, by, max_per_stratum, seed)
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    matrix = ResultMatrix()
+    strata_rows = {name: [] for name in sample.population}
+    summaries = []
+    estimates = {}
+    unreachable = 0
+    allocation = dict.fromkeys(sample.population, per_stratum)
+    for round_number in range(1, max_rounds + 1):
+        drawn = sample.draw(allocation)
+        if not drawn:
+            break
+        strata = {str(machine.get("Hostname")): stratum for stratum, machine in drawn}
+        for summary in sweep([machine for _, machine in drawn]):
+            summaries.append(summary)
+            if summary.get("error") or not summary.get("results"):
+                unreachable += 1
+                continue
+            hostname = str(summary.get("hostname"))
+            strata_rows[strata[hostname]].append(matrix.add(hostname, summary["results"]))
+        estimates = estimate(matrix, strata_rows, sample.population, confidence)
+        widest = max((e["high"] - e["low"]) / 2 for e in estimates.values()) if estimates else 1.0
+        logger.info(
+            f"Sample round {round_number}: {len(summaries)} hosts scanned, "
+            f"widest {confidence:.0%} interval ±{widest:.1%}"
+        )
+        if precision is None or widest <= precision:
+            break
+        allocation = widen(sample, matrix, strata_rows, sum(sample.taken.values()), z)
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "stratified_by": by,
+        "confidence": confidence,
+        "fleet_hosts": sum(sample.population.values()),
+        "sampled_hosts": len(summaries),
+        "unreachable": unreachable,
+        "strata": {
+            name: {"hosts": sample.population[name], "sampled": sample.taken[name], "scanned": len(rows)}
+            for name, rows in strata_rows.items()
+        },
+        "checks": estimates,
+    }
+    return report, summaries
+
+
+def format_estimates(report):
+    lines = [
+        f"Estimated from {report['sampled_hosts']} of {report['fleet_hosts']} hosts in "
+        f"{len(report['strata'])} strata ({report['unreachable']} unreachable), "
+        f"{report['confidence']:.0%} intervals:"
+    ]
+    for check, e in sorted(report["checks"].items(), key=lambda item: -item[1]["rate"]):
+        lines.append(
+            f"  {check:<40} {e['rate']:6.1%} failing  [{e['low']:6.1%}, {e['high']:6.1%}]  n={e['hosts']}"
+        )
+    return "\n".join(lines)
+
+
+def write_estimates(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
@@ -0,0 +1,313 @@
+import heapq
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import paramiko
+
+from common import CONNECT_TIMEOUT, COMMAND_TIMEOUT, CommandTimeout
+from incremental import STATE_DIR
+
+logger = logging.getLogger(__name__)
+
+HOST_TIMEOUT = 120
+DURATIONS_FILE = os.path.join(STATE_DIR, "durations.json")
+
+
+class HostDeadline:
+    """
+    Time limits of one host scan attempt. Utils caps every connect and
+    command at the time left, and the scheduler can abort() a straggler by
+    closing its SSH client from the outside, which unblocks the worker.
+    """
+
+    def __init__(
+        self,
+        host_timeout=HOST_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT,
+        command_timeout=COMMAND_TIMEOUT,
+    ):
+        self.host_timeout = host_timeout
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.expires_at = float("inf")
+        self.expired = False
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """The clock starts when a worker picks the host up, not when it is queued."""
+        self.expires_at = time.monotonic() + self.host_timeout
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def limit(self, seconds):
+        """seconds, capped at the time left; raises CommandTimeout once it is used up."""
+        remaining = self.remaining()
+        if self.expired or remaining <= 0:
+            raise CommandTimeout("host deadline exceeded")
+        return min(seconds, remaining)
+
+    def attach(self, client):
+        with self._lock:
+            self._clients.append(client)
+            if not self.expired:
+                return
+        client.close()
+
+    def abort(self):
+        with self._lock:
+            self.expired = True
+            clients, self._clients = self._clients, []
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+class DurationHistory:
+    """Smoothed scan duration per host, persisted between sweeps for longest-first ordering."""
+
+    def __init__(self, path=DURATIONS_FILE, alpha=0.3):
+        self.path = path
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._observed = set()
+        self.durations = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def observe(self, host, seconds):
+        with self._lock:
+            self._observed.add(host)
+            previous = self.durations.get(host)
+            self.durations[host] = (
+                seconds
+                if previous is None
+                else previous + self.alpha * (seconds - previous)
+            )
+
+    def estimate(self, host, default=None):
+        return self.durations.get(host, default)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # shard processes share the file: overlay only the hosts this process scanned
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with self._lock:
+            durations = self._read()
+            durations.update((host, self.durations[host]) for host in self._observed)
+            with open(tmp, "w") as f:
+                json.dump(durations, f)
+            os.replace(tmp, self.path)
+
+
+def classify_error(exc):
+    """Returns (status, retryable) for an exception raised by one scan attempt."""
+    if isinstance(exc, CommandTimeout):
+        # the host connected but is too slow: a straggler, not worth another slot
+        return "timeout", False
+    if isinstance(exc, paramiko.AuthenticationException):
+        return "error", False
+    if isinstance(exc, socket.timeout):
+        return "timeout", True
+    if isinstance(exc, (paramiko.SSHException, ConnectionError, EOFError, OSError)):
+        return "unreachable", True
+    return "error", False
+
+
+class FleetScheduler:
+    """
+    Runs one scan function over the fleet on a thread pool.
+
+    machines may be any iterable (e.g. a streamed inventory.Inventory); it is
+    only read window hosts ahead of the workers, so memory stays flat however
+    large the inventory is. Within that window hosts are started
+    longest-expected-first (from DurationHistory) so slow boxes don't end up
+    alone at the tail of the sweep. Every attempt gets a
+    HostDeadline; a watchdog aborts hosts that overrun it and they are
+    reported with status "timeout". Transient connect failures are retried
+    up to retries times after a jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        max_workers=10,
+        host_timeout=HOST_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT,
+        command_timeout=COMMAND_TIMEOUT,
+        retries=2,
+        backoff=1.0,
+        history=None,
+        grace=2.0,
+        window=1024,
+    ):
+        self.max_workers = max_workers
+        self.host_timeout = host_timeout
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.history = history
+        # time past the deadline before the watchdog steps in; the in-thread limits fire first
+        self.grace = grace
+        self.window = window
+        self.stats = {"retries": 0, "timeouts": 0, "aborted": 0}
+
+    def _expected(self, machine, default):
+        if self.history is None:
+            return default
+        return self.history.estimate(machine.get("Hostname"), default)
+
+    def _backoff(self, attempt):
+        # full jitter: spreads retries of a flapping subnet instead of syncing them up
+        return random.uniform(0, self.backoff * (2**attempt))
+
+    @staticmethod
+    def _attempt(scan, machine, deadline):
+        deadline.start()
+        return scan(machine, deadline=deadline)
+
+    def _failure(self, machine, status, error):
+        return {
+            "hostname": machine.get("Hostname"),
+            "port": machine.get("port", 22),
+            "pass_cnt": 0,
+            "fail_cnt": 0,
+            "score": 0,
+            "results": [],
+            "status": status,
+            "error": str(error),
+        }
+
+    def run(self, machines, scan):
+        """Like stream(), but returns all summaries as a list."""
+        return list(self.stream(machines, scan))
+
+    def stream(self, machines, scan):
+        """
+        scan(machine, deadline=...) -> summary dict, raising on connect/command failure.
+        Yields the summary of every host in completion order.
+        """
+        source = iter(machines)
+        exhausted = False
+        ready = []  # heap of (-expected seconds, sequence, machine, attempt)
+        delayed = []  # heap of (ready_at, sequence, machine, attempt)
+        running = {}
+        sequence = 0
+        known = list(self.history.durations.values()) if self.history is not None else []
+        # hosts never seen before are expected to take as long as the fleet median
+        default = statistics.median(known) if known else 0.0
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                # backpressure: only pull from the inventory while the window has room
+                while not exhausted and len(ready) < self.window:
+                    machine = next(source, None)
+                    if machine is None:
+                        exhausted = True
+                        break
+                    sequence += 1
+                    heapq.heappush(
+                        ready, (-self._expected(machine, default), sequence, machine, 0)
+                    )
+                if not (ready or delayed or running):
+                    break
+
+                now = time.monotonic()
+                while delayed and delayed[0][0] <= now:
+                    _, _, machine, attempt = heapq.heappop(delayed)
+                    sequence += 1
+                    heapq.heappush(
+                        ready, (-self._expected(machine, default), sequence, machine, attempt)
+                    )
+                while ready and len(running) < self.max_workers:
+                    _, _, machine, attempt = heapq.heappop(ready)
+                    deadline = HostDeadline(
+                        self.host_timeout, self.connect_timeout, self.command_timeout
+                    )
+                    future = executor.submit(self._attempt, scan, machine, deadline)
+                    running[future] = (machine, attempt, deadline)
+
+                timeout = 0.5
+                if delayed:
+                    timeout = max(0.0, min(timeout, delayed[0][0] - now))
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    machine, attempt, deadline = running.pop(future)
+                    hostname = machine.get("Hostname")
+                    elapsed = time.monotonic() - (deadline.expires_at - self.host_timeout)
+                    try:
+                        summary = future.result()
+                    except Exception as exc:
+                        status, retryable = classify_error(exc)
+                        if deadline.expired:
+                            status, retryable = "timeout", False
+                        if retryable and attempt < self.retries:
+                            delay = self._backoff(attempt)
+                            self.stats["retries"] += 1
+                            logger.warning(
+                                f"[{hostname}] {exc}, retry {attempt + 1}/{self.retries} in {delay:.1f}s"
+                            )
+                            sequence += 1
+                            heapq.heappush(
+                                delayed,
+                                (time.monotonic() + delay, sequence, machine, attempt + 1),
+                            )
+                            continue
+                        summary = self._failure(machine, status, exc)
+                    else:
+                        if deadline.expired:
+                            summary = self._failure(machine, "timeout", "host deadline exceeded")
+                        summary.setdefault("status", "ok")
+
+                    if summary["status"] == "timeout":
+                        self.stats["timeouts"] += 1
+                        logger.error(f"[{hostname}] timed out after {elapsed:.1f}s")
+                        elapsed = max(elapsed, self.host_timeout)
+                    if self.history is not None and summary["status"] in ("ok", "timeout"):
+                        self.history.observe(hostname, elapsed)
+                    yield summary
+
+                # watchdog: unblock workers stuck past their deadline, and stop
+                # waiting for ones that still haven't returned a grace period later
+                now = time.monotonic()
+                for future, (machine, _, deadline) in list(running.items()):
+                    hostname = machine.get("Hostname")
+                    if not deadline.expired and now > deadline.expires_at + self.grace:
+                        logger.error(f"[{hostname}] aborting straggler")
+                        self.stats["aborted"] += 1
+                        deadline.abort()
+                    elif deadline.expired and now > deadline.expires_at + 2 * self.grace:
+                        logger.error(f"[{hostname}] abandoned, worker did not return")
+                        del running[future]
+                        self.stats["timeouts"] += 1
+                        if self.history is not None:
+                            self.history.observe(hostname, self.host_timeout)
+                        yield self._failure(machine, "timeout", "host deadline exceeded")
+        finally:
+            # don't join abandoned workers, they exit on their own once their socket gives up
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if self.history is not None:
+            self.history.save()
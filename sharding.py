@@ -0,0 +1,148 @@
+import argparse
+import datetime
+import glob
+import ipaddress
+import json
+import os
+
+from inventory import Inventory, shard_index
+from templates.fleet_report_template import generate_fleet_report
+
+STRATEGIES = ("hash", "subnet")
+UNRESOLVED = "unresolved"
+
+
+def host_key(machine):
+    return f"{machine.get('Hostname')}:{machine.get('port', 22)}"
+
+
+def subnet_of(hostname, prefix=24):
+    """
+    The /prefix network of an IP literal. DNS names can't be placed without
+    resolving them, they all get the UNRESOLVED bucket: fine for grouping
+    (sharding, sampling strata), but not a network path to rate-limit, so
+    AsyncScanner applies no per-subnet limit to them.
+    """
+    try:
+        return str(ipaddress.ip_network(f"{hostname}/{prefix}", strict=False))
+    except ValueError:
+        return UNRESOLVED
+
+
+def partition(machines, shards, strategy="hash", subnet_prefix=24):
+    """
+    Split machines into `shards` lists.
+    hash    stable sha1 of host:port, so a host stays on the same shard while
+            the shard count doesn't change (keeps pools and state warm)
+    subnet  whole subnets per shard, largest first onto the least loaded shard,
+            so one shard's scanners share a network path
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown shard strategy {strategy!r}")
+    buckets = [[] for _ in range(shards)]
+    if strategy == "hash":
+        for machine in machines:
+            buckets[shard_index(machine, shards)].append(machine)
+        return buckets
+
+    groups = {}
+    for machine in machines:
+        groups.setdefault(subnet_of(machine.get("Hostname"), subnet_prefix), []).append(machine)
+    for _, members in sorted(groups.items(), key=lambda item: (-len(item[1]), item[0])):
+        min(buckets, key=len).extend(members)
+    return buckets
+
+
+def write_manifests(machines, shards, directory, strategy="hash", subnet_prefix=24):
+    """
+    One shard-<i>-of-<n>.json per control node. Manifests only list host:port
+    keys, credentials stay in each node's own hosts.json.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index, members in enumerate(partition(machines, shards, strategy, subnet_prefix)):
+        path = os.path.join(directory, f"shard-{index + 1:02d}-of-{shards:02d}.json")
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "shard": index + 1,
+                    "shards": shards,
+                    "strategy": strategy,
+                    "hosts": [host_key(m) for m in members],
+                },
+                f,
+                indent=2,
+            )
+        paths.append(path)
+    return paths
+
+
+def load_manifest(path):
+    """The manifest dict; select its hosts with inventory.with_filter(keys=manifest["hosts"])."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_shard_summary(path, results, manifest=None):
+    """Host summaries of one shard's sweep, the input of merge_summaries()."""
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "shard": manifest.get("shard") if manifest else None,
+                "shards": manifest.get("shards") if manifest else None,
+                "finished_at": datetime.datetime.now().isoformat(),
+                "hosts": results,
+            },
+            f,
+        )
+    return path
+
+
+def merge_summaries(paths):
+    """
+    Combine shard summaries into one host list. A host present in several
+    files (re-run slice, overlapping manifests) keeps its newest summary.
+    Hosts are told apart by host_key, as for partitioning: two SSH endpoints
+    on one address stay two hosts (summaries without a port mean port 22).
+    """
+    merged = {}
+    for path in paths:
+        with open(path, "r") as f:
+            summary = json.load(f)
+        finished = summary.get("finished_at") or ""
+        for host in summary["hosts"]:
+            key = host_key({"Hostname": host.get("hostname"), "port": host.get("port", 22)})
+            if key not in merged or merged[key][0] <= finished:
+                merged[key] = (finished, host)
+    return [host for _, host in merged.values()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a fleet into shard manifests and merge shard results")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    split = sub.add_parser("split", help="write one manifest per control node")
+    split.add_argument("--hosts", default="hosts.json", help="inventory: .json, .jsonl or .csv")
+    split.add_argument("--shards", type=int, required=True)
+    split.add_argument("--by", choices=STRATEGIES, default="hash")
+    split.add_argument("--subnet-prefix", type=int, default=24)
+    split.add_argument("--out", default="shards")
+
+    merge = sub.add_parser("merge", help="combine shard summaries into one fleet report")
+    merge.add_argument("summaries", nargs="+", help="summary files or globs")
+    merge.add_argument("--report", default="Reports/fleet_report.html")
+    merge.add_argument("--output", help="also write the merged host summaries as JSON")
+
+    args = parser.parse_args()
+    if args.command == "split":
+        machines = Inventory(args.hosts)
+        for path in write_manifests(machines, args.shards, args.out, args.by, args.subnet_prefix):
+            print(path)
+    else:
+        paths = sorted({p for pattern in args.summaries for p in glob.glob(pattern)})
+        hosts = merge_summaries(paths)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(hosts, f)
+        print(f"{len(hosts)} hosts from {len(paths)} shard summaries")
+        print(generate_fleet_report(hosts, args.report))
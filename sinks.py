@@ -0,0 +1,239 @@
+import datetime
+import gzip
+import io
+import json
+import os
+import pathlib
+import queue
+import threading
+
+
+def _zstandard(purpose):
+    """zstandard, imported on first use: only zstd segments need it."""
+    try:
+        import zstandard
+    except ImportError:  # zstd output is optional
+        raise ValueError(f"{purpose} needs the zstandard package") from None
+    return zstandard
+
+
+class ResultSink:
+    """Where per-host report records go. Sinks are shared by all scan workers."""
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PerHostJsonSink(ResultSink):
+    """The original layout: one pretty-printed security_audit_report_<ip>.json per host."""
+
+    def __init__(self, report_folder):
+        self.report_folder = pathlib.Path(report_folder)
+
+    def write(self, record):
+        filename = f"security_audit_report_{record['ip'].replace('.','_')}.json"
+        with open(self.report_folder / filename, "w") as f:
+            json.dump(record, f, indent=2)
+
+
+class JsonLinesSink(ResultSink):
+    """
+    Append-only JSON Lines segments fed through one buffered writer thread.
+
+    Workers only enqueue records; the writer serialises them, writes in
+    batches and rolls to a new segment file once segment_bytes or
+    segment_records is reached. Only the newest keep_segments segments are kept.
+    compression: None, "gzip" or "zstd" (needs the zstandard package).
+    """
+
+    suffixes = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+    def __init__(
+        self,
+        directory,
+        prefix="audit",
+        compression=None,
+        segment_bytes=64 * 1024 * 1024,
+        segment_records=None,
+        keep_segments=None,
+        queue_size=10000,
+    ):
+        if compression not in self.suffixes:
+            raise ValueError(f"unknown compression {compression!r}")
+        self._zstandard = _zstandard("zstd compression") if compression == "zstd" else None
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.compression = compression
+        self.segment_bytes = segment_bytes
+        self.segment_records = segment_records
+        self.keep_segments = keep_segments
+        self.segments = []
+        self._file = None
+        self._raw = None
+        self._written = 0
+        self._records = 0
+        self._sequence = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="jsonl-sink", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, record):
+        if self._error:
+            raise self._error
+        self._queue.put(record)
+
+    def rotate(self):
+        """Roll to a new segment at the next write, e.g. at the start of a sweep."""
+        self._queue.put(_ROTATE)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+    def _open_segment(self):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._sequence += 1
+        path = self.directory / (
+            f"{self.prefix}-{timestamp}-{self._sequence:05d}"
+            f"{self.suffixes[self.compression]}"
+        )
+        self._raw = open(path, "wb", buffering=1024 * 1024)
+        if self.compression == "gzip":
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            self._file = self._zstandard.ZstdCompressor().stream_writer(self._raw)
+        else:
+            self._file = self._raw
+        self._written = self._records = 0
+        self.segments.append(path)
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        if self._raw is not self._file and not self._raw.closed:
+            self._raw.close()
+        self._file = self._raw = None
+        if self.keep_segments:
+            while len(self.segments) > self.keep_segments:
+                os.remove(self.segments.pop(0))
+
+    def _segment_full(self):
+        if self.segment_records and self._records >= self.segment_records:
+            return True
+        return self._written >= self.segment_bytes
+
+    def _handle(self, item):
+        if item is _ROTATE:
+            self._close_segment()
+            return
+        if self._file is None or self._segment_full():
+            self._close_segment()
+            self._open_segment()
+        line = json.dumps(item, separators=(",", ":"), default=str)
+        data = (line + "\n").encode()
+        self._file.write(data)
+        self._written += len(data)
+        self._records += 1
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # drain whatever is already queued so it goes out in one write
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in batch:
+                if item is _STOP:
+                    if not self._error:
+                        self._close_segment()
+                    return
+                if self._error:
+                    # keep consuming so producers never block on a dead writer
+                    continue
+                try:
+                    self._handle(item)
+                except Exception as exc:
+                    self._error = exc
+            if self._file is not None and not self._error and self._queue.empty():
+                self._file.flush()
+
+
+class TeeSink(ResultSink):
+    """Write every record to several sinks, e.g. per-host JSON plus the history DB."""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+_ROTATE = object()
+_STOP = object()
+
+
+def read_jsonl(path):
+    """Iterate over the records of one (optionally compressed) segment."""
+    path = str(path)
+    if path.endswith(".gz"):
+        f = gzip.open(path, "rt")
+    elif path.endswith(".zst"):
+        zstandard = _zstandard("reading .zst segments")
+        f = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")))
+    else:
+        f = open(path, "r")
+    with f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def make_sink(
+    kind, report_folder, compression=None, history_db=None, prefix="audit", run_index=False
+):
+    """
+    Build a sink from the scanner's command-line options.
+    history_db additionally records the run in that SQLite history database.
+    prefix names the jsonl segments, so processes sharing a folder don't collide.
+    run_index also writes <prefix>.index.json, the compact form drift.py compares.
+    """
+    if kind == "json":
+        sink = PerHostJsonSink(report_folder)
+    elif kind == "jsonl":
+        sink = JsonLinesSink(report_folder, prefix=prefix, compression=compression)
+    else:
+        raise ValueError(f"unknown sink {kind!r}")
+    if history_db:
+        from history_store import HistorySink, HistoryStore
+
+        # one connection per sink, closed with it: a sweep loop builds a sink per sweep
+        sink = TeeSink([sink, HistorySink(HistoryStore(history_db), own_store=True)])
+    if run_index:
+        from drift import INDEX_SUFFIX, RunIndexSink
+
+        index_path = os.path.join(report_folder, prefix + INDEX_SUFFIX)
+        sink = TeeSink([sink, RunIndexSink(index_path)])
+    return sink
@@ -0,0 +1,211 @@
+import collections
+import contextlib
+import threading
+import time
+
+import paramiko
+
+
+class PooledConnection:
+    def __init__(self, client, max_channels):
+        self.client = client
+        self.created = time.monotonic()
+        self.last_used = self.created
+        # scans holding the client between get() and release(), LRU eviction skips it while > 0
+        self.users = 0
+        # sshd only allows MaxSessions (default 10) channels per connection
+        self.channels = threading.BoundedSemaphore(max_channels)
+
+    def is_alive(self):
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except (paramiko.SSHException, OSError, EOFError):
+            return False
+        return True
+
+
+class SSHConnectionPool:
+    """
+    Keeps authenticated SSH clients alive between scans, keyed by (host, user, port).
+
+    max_size        number of connections kept, the least recently used idle one is evicted first
+    ttl             seconds a connection may sit idle before it is dropped
+    health_check    idle seconds after which a connection is probed before reuse
+    max_channels    concurrent exec channels multiplexed over one transport
+    """
+
+    def __init__(self, max_size=256, ttl=300, health_check=30, max_channels=8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.health_check = health_check
+        self.max_channels = max_channels
+        self._connections = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # key -> [lock, threads using it], dropped with the key's connection once unused
+        self._key_locks = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "health_failures": 0}
+
+    def _connect(self, hostname, username, password, port, timeout=None, open_socket=None):
+        sock = open_socket(timeout) if open_socket is not None else None
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                hostname,
+                port,
+                username,
+                password,
+                sock=sock,
+                timeout=timeout,
+                banner_timeout=timeout,
+                auth_timeout=timeout,
+            )
+        except BaseException:
+            # a failed kex or auth leaves the transport open, and a bastion tunnel holding its slot
+            client.close()
+            if sock is not None:
+                sock.close()
+            raise
+        return PooledConnection(client, self.max_channels)
+
+    def _evict(self, key):
+        conn = self._connections.pop(key, None)
+        if conn:
+            self.stats["evictions"] += 1
+            conn.client.close()
+        entry = self._key_locks.get(key)
+        if entry is not None and entry[1] == 0:
+            del self._key_locks[key]
+
+    def _shrink(self):
+        """Evict least recently used idle connections down to max_size, never one in use."""
+        idle = [key for key, conn in self._connections.items() if conn.users == 0]
+        for key in idle[: max(0, len(self._connections) - self.max_size)]:
+            self._evict(key)
+
+    @contextlib.contextmanager
+    def _key_lock(self, key):
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0 and key not in self._connections:
+                    del self._key_locks[key]
+
+    def _reusable(self, conn, now):
+        """Called without the pool lock: the health probe is network I/O."""
+        idle = now - conn.last_used
+        if idle > self.ttl:
+            return False
+        if idle > self.health_check and not conn.is_alive():
+            with self._lock:
+                self.stats["health_failures"] += 1
+            return False
+        return True
+
+    def _get(self, hostname, username, password, port, timeout, open_socket):
+        key = (hostname, username, port)
+        with self._key_lock(key):
+            with self._lock:
+                conn = self._connections.get(key)
+                if conn is not None:
+                    # counted as in use first, so LRU eviction leaves it alone during the probe
+                    conn.users += 1
+            if conn is not None:
+                now = time.monotonic()
+                reusable = self._reusable(conn, now)
+                with self._lock:
+                    if reusable and self._connections.get(key) is conn:
+                        self._connections.move_to_end(key)
+                        conn.last_used = now
+                        self.stats["hits"] += 1
+                        return conn, True
+                    conn.users -= 1
+                    if self._connections.get(key) is conn:
+                        self._evict(key)
+            with self._lock:
+                self.stats["misses"] += 1
+
+            # handshake outside the pool lock so other hosts are not blocked
+            conn = self._connect(hostname, username, password, port, timeout, open_socket)
+            conn.users = 1
+            with self._lock:
+                self._connections[key] = conn
+                self._shrink()
+            return conn, False
+
+    def get(self, hostname, username, password, port=22, timeout=None, open_socket=None):
+        """
+        Returns (client, reused) for the host, connecting only on a miss.
+        timeout bounds the TCP connect, banner and auth of a new connection.
+        open_socket(timeout), when given, supplies the socket of a new
+        connection instead of a direct TCP connect (e.g. a bastion tunnel).
+        Hand the client back with release() (or discard() if it failed).
+        """
+        conn, reused = self._get(hostname, username, password, port, timeout, open_socket)
+        return conn.client, reused
+
+    def release(self, hostname, username, port=22):
+        """The caller is done with the client, it stays pooled for the next scan."""
+        with self._lock:
+            conn = self._connections.get((hostname, username, port))
+            if conn is not None and conn.users:
+                conn.users -= 1
+                conn.last_used = time.monotonic()
+            self._shrink()
+
+    @contextlib.contextmanager
+    def channel(self, hostname, username, port=22):
+        """
+        Hold one channel slot on the host's pooled transport while a command
+        runs, so concurrent check batches share the connection without going
+        over the server's session limit.
+        """
+        with self._lock:
+            conn = self._connections.get((hostname, username, port))
+        if conn is None:
+            yield
+            return
+        with conn.channels:
+            yield
+        conn.last_used = time.monotonic()
+
+    def discard(self, hostname, username, port=22):
+        """Drop a connection that failed mid-scan so the next get() reconnects."""
+        with self._lock:
+            self._evict((hostname, username, port))
+
+    def prune(self):
+        """Close connections that have been idle longer than ttl."""
+        now = time.monotonic()
+        with self._lock:
+            for key in [
+                key
+                for key, conn in self._connections.items()
+                if conn.users == 0 and now - conn.last_used > self.ttl
+            ]:
+                self._evict(key)
+
+    def close(self):
+        with self._lock:
+            for key in list(self._connections):
+                self._evict(key)
+
+    def metrics(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return dict(
+            self.stats,
+            size=len(self._connections),
+            key_locks=len(self._key_locks),
+            hit_rate=(self.stats["hits"] / total) if total else 0.0,
+        )
@@ -0,0 +1,239 @@
+import datetime
+import html
+import json
+import string
+
+from results_matrix import FAIL, NOT_RUN, PASS, ResultMatrix
+
+SCORE_BANDS = 10
+PAGE_SIZE = 100
+
+# Compiled once at import. Host rows are not rendered server side: they are
+# embedded as compact JSON arrays and paged/sorted in the browser, so a 10k
+# host report stays a few hundred KB and the DOM only ever holds one page.
+FLEET_TEMPLATE = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Fleet Security Audit Report</title>
+    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+    <style>
+        body { font-family: 'Segoe UI', Arial, sans-serif; background: #f4f6f8; margin: 0; }
+        .container { width: 95%; max-width: 1400px; margin: 30px auto; background: #fff;
+                     padding: 25px 40px; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.1); }
+        h1 { text-align: center; color: #222; }
+        .cards { display: flex; gap: 20px; flex-wrap: wrap; justify-content: space-around; }
+        .card { text-align: center; min-width: 140px; }
+        .card h2 { margin: 0; font-size: 2em; color: #263238; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 14px; }
+        th, td { padding: 6px 10px; text-align: left; }
+        th { background: linear-gradient(90deg, #263238, #37474f); color: #fff; cursor: pointer; }
+        .heat td.cell { text-align: center; color: #222; min-width: 42px; }
+        .PASS { background-color: #c8e6c9; }
+        .FAIL { background-color: #ffcdd2; }
+        .ERROR { background-color: #ffe0b2; }
+        .TIMEOUT { background-color: #e1bee7; }
+        .pager { margin-top: 10px; text-align: center; }
+        .pager button { margin: 0 4px; }
+        canvas { max-height: 260px; }
+        footer { text-align: center; margin-top: 40px; color: #777; font-size: 0.9em; }
+    </style>
+</head>
+<body>
+<div class="container">
+    <h1>🛡️ Fleet Security Audit Report</h1>
+    <p style="text-align:center">Generated $generated</p>
+    <div class="cards">
+        <div class="card"><h2>$host_count</h2>hosts</div>
+        <div class="card"><h2>$mean_score%</h2>mean compliance</div>
+        <div class="card"><h2>$unreachable</h2>unreachable</div>
+        <div class="card"><h2>$timed_out</h2>timed out</div>
+        <div class="card"><h2>$check_count</h2>checks</div>
+    </div>
+
+    <h3>Score distribution</h3>
+    <canvas id="scoreChart"></canvas>
+
+    <h3>Check failure rate by host score band</h3>
+    <table class="heat">
+        <thead><tr><th>Check</th><th>Fail rate</th>$band_headers</tr></thead>
+        <tbody>$heatmap_rows</tbody>
+    </table>
+
+    <h3>Hosts</h3>
+    <input id="filter" placeholder="filter hosts / failed checks" size="40">
+    <table>
+        <thead><tr>
+            <th data-col="0">Host</th><th data-col="1">Score</th>
+            <th data-col="2">Passed</th><th data-col="3">Failed</th><th>Failed checks</th>
+        </tr></thead>
+        <tbody id="hosts"></tbody>
+    </table>
+    <div class="pager">
+        <button id="prev">&laquo;</button><span id="page"></span><button id="next">&raquo;</button>
+    </div>
+
+    <footer><p>Generated by <b>Automated Security Configuration Auditor</b></p></footer>
+</div>
+<script>
+var CHECKS = $checks_json;
+var HOSTS = $hosts_json;  // [hostname, score, passed, failed, [failed check indexes], error, status]
+var PAGE_SIZE = $page_size;
+var rows = HOSTS, page = 0, sortCol = 1, sortDir = 1;
+
+function esc(s) { var d = document.createElement('div'); d.textContent = s; return d.innerHTML; }
+function render() {
+    var start = page * PAGE_SIZE, out = [];
+    rows.slice(start, start + PAGE_SIZE).forEach(function (h) {
+        var cls = h[6] === 'timeout' ? 'TIMEOUT' : h[5] ? 'ERROR' : (h[3] ? 'FAIL' : 'PASS');
+        var failed = h[5] ? esc(h[5]) : h[4].map(function (i) { return esc(CHECKS[i]); }).join(', ');
+        out.push('<tr class="' + cls + '"><td>' + esc(h[0]) + '</td><td>' + h[1] + '%</td><td>' +
+                 h[2] + '</td><td>' + h[3] + '</td><td>' + failed + '</td></tr>');
+    });
+    document.getElementById('hosts').innerHTML = out.join('');
+    document.getElementById('page').textContent =
+        ' page ' + (page + 1) + ' / ' + Math.max(1, Math.ceil(rows.length / PAGE_SIZE)) + ' ';
+}
+function sortBy(col) {
+    sortDir = (col === sortCol) ? -sortDir : 1; sortCol = col;
+    rows = rows.slice().sort(function (a, b) { return a[col] < b[col] ? -sortDir : a[col] > b[col] ? sortDir : 0; });
+    page = 0; render();
+}
+document.querySelectorAll('th[data-col]').forEach(function (th) {
+    th.onclick = function () { sortBy(+th.dataset.col); };
+});
+document.getElementById('filter').oninput = function (e) {
+    var q = e.target.value.toLowerCase();
+    rows = !q ? HOSTS : HOSTS.filter(function (h) {
+        return h[0].toLowerCase().indexOf(q) >= 0 ||
+               h[4].some(function (i) { return CHECKS[i].toLowerCase().indexOf(q) >= 0; });
+    });
+    page = 0; render();
+};
+document.getElementById('prev').onclick = function () { if (page > 0) { page--; render(); } };
+document.getElementById('next').onclick = function () {
+    if ((page + 1) * PAGE_SIZE < rows.length) { page++; render(); }
+};
+sortBy(1);
+
+new Chart(document.getElementById('scoreChart'), {
+    type: 'bar',
+    data: { labels: $band_labels, datasets: [{ label: 'hosts', data: $distribution,
+            backgroundColor: '#37474f' }] },
+    options: { plugins: { legend: { display: false } } }
+});
+</script>
+</body>
+</html>
+""")
+
+
+def _heat_color(rate):
+    # white -> red as the failure rate goes 0 -> 100%
+    shade = int(255 - rate * 180)
+    return f"rgb(255,{shade},{shade})"
+
+
+def generate_fleet_report(
+    host_summaries,
+    output_path="Reports/fleet_report.html",
+    open_browser=False,
+    page_size=PAGE_SIZE,
+):
+    """
+    One dashboard for N hosts from the scan_single_machine() summaries:
+    score distribution, per-check failure heatmap by score band and a
+    sortable, paginated host table. Headless by default (no browser).
+    host_summaries may also be an already built ResultMatrix.
+    """
+    if isinstance(host_summaries, ResultMatrix):
+        matrix = host_summaries
+    else:
+        matrix = ResultMatrix.from_summaries(host_summaries)
+    hosts = []
+    distribution = [0] * SCORE_BANDS
+    bands = [[] for _ in range(SCORE_BANDS)]
+    scored = 0
+    score_sum = 0.0
+    unreachable = 0
+    timed_out = 0
+
+    passed, failed = matrix.row_counts(PASS), matrix.row_counts(FAIL)
+    for row, (host, score) in enumerate(zip(matrix.hosts, matrix.host_scores())):
+        if row in matrix.errors:
+            # hosts that hit their scan deadline are stragglers, not failed checks
+            status, error = matrix.errors[row]
+            if status == "timeout":
+                timed_out += 1
+            else:
+                unreachable += 1
+            hosts.append([host, 0, 0, 0, [], str(error), status])
+            continue
+
+        score = round(score, 1)
+        band = min(int(score // (100 / SCORE_BANDS)), SCORE_BANDS - 1)
+        distribution[band] += 1
+        bands[band].append(row)
+        scored += 1
+        score_sum += score
+        hosts.append(
+            [host, score, passed[row], failed[row], matrix.failed_checks(row), "", "ok"]
+        )
+
+    check_fail = matrix.column_counts(FAIL)
+    check_total = [len(matrix.hosts) - n for n in matrix.column_counts(NOT_RUN)]
+    band_fail, band_total = matrix.band_counts(bands)
+    names = matrix.checks
+    band_width = 100 // SCORE_BANDS
+    band_labels = [f"{b * band_width}-{(b + 1) * band_width}%" for b in range(SCORE_BANDS)]
+
+    heatmap_rows = []
+    order = sorted(
+        range(len(names)),
+        key=lambda i: check_fail[i] / check_total[i] if check_total[i] else 0,
+        reverse=True,
+    )
+    for idx in order:
+        rate = check_fail[idx] / check_total[idx] if check_total[idx] else 0
+        cells = []
+        for b in range(SCORE_BANDS):
+            total = band_total[idx][b]
+            if not total:
+                cells.append('<td class="cell"></td>')
+                continue
+            band_rate = band_fail[idx][b] / total
+            cells.append(
+                f'<td class="cell" style="background:{_heat_color(band_rate)}" '
+                f'title="{band_fail[idx][b]}/{total}">{band_rate:.0%}</td>'
+            )
+        heatmap_rows.append(
+            f"<tr><td>{html.escape(names[idx])}</td>"
+            f'<td style="background:{_heat_color(rate)}">{rate:.1%}</td>{"".join(cells)}</tr>'
+        )
+
+    def as_js(value):
+        return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+    page = FLEET_TEMPLATE.substitute(
+        generated=datetime.datetime.now().isoformat(timespec="seconds"),
+        host_count=len(hosts),
+        mean_score=round(score_sum / scored, 1) if scored else 0,
+        unreachable=unreachable,
+        timed_out=timed_out,
+        check_count=len(names),
+        band_headers="".join(f"<th>{label}</th>" for label in band_labels),
+        heatmap_rows="".join(heatmap_rows),
+        checks_json=as_js(names),
+        hosts_json=as_js(hosts),
+        page_size=int(page_size),
+        band_labels=as_js(band_labels),
+        distribution=as_js(distribution),
+    )
+    with open(output_path, "w", buffering=1024 * 1024) as f:
+        f.write(page)
+
+    if open_browser:
+        import webbrowser
+
+        webbrowser.open(output_path)
+    return output_path
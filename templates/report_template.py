@@ -1,6 +1,6 @@
-import json, webbrowser
+import json
 
-def generate_html_report(result, host, timestamp, machine,ip=None):
+def generate_html_report(result, host, timestamp, machine,ip=None,output_path="security_audit_report.html",open_browser=True):
     total = len(result)
     passed = sum(1 for r in result if r["status"] == "PASS" or r["status"] == True)
     failed = total - passed
@@ -145,22 +145,23 @@ def generate_html_report(result, host, timestamp, machine,ip=None):
                 <tbody>
     """
 
+    rows = []
     for r in result:
         status = r["status"]
         if status == True:
             status = "PASS"
         elif status == False:
             status = "FAIL"
-        html += f"""
+        rows.append(f"""
             <tr class="{status}">
                 <td>{r['name']}</td>
                 <td><b>{status}</b></td>
                 <td>{r['expected']}</td>
                 <td>{r['actual_value']}</td>
             </tr>
-        """
+        """)
 
-    html += f"""
+    footer = f"""
                 </tbody>
             </table>
 
@@ -195,8 +196,10 @@ def generate_html_report(result, host, timestamp, machine,ip=None):
     </html>
     """
 
-    with open("security_audit_report.html", "w") as f:
-        f.write(html)
+    with open(output_path, "w") as f:
+        f.write("".join([html, *rows, footer]))
 
-    webbrowser.open("security_audit_report.html")
+    if open_browser:
+        import webbrowser
+        webbrowser.open(output_path)
     print("✅ Enhanced HTML report generated with compliance score, chart, and badge!")